@@ -6,5 +6,15 @@ from . import admin_views
 app_name = "wagtailredirectimporter"
 urlpatterns = [
     url(r"^$", admin_views.start, name="start"),
+    url(r"^upload/$", admin_views.start_upload, name="start_upload"),
+    url(r"^upload/([0-9a-f]{32})/$", admin_views.upload_chunk, name="upload_chunk"),
+    url(
+        r"^upload/([0-9a-f]{32})/complete/$",
+        admin_views.complete_upload,
+        name="complete_upload",
+    ),
     url(r"^import/$", admin_views.import_file, name="import"),
+    url(r"^jobs/(\d+)/$", admin_views.import_job, name="job"),
+    url(r"^jobs/(\d+)/cancel/$", admin_views.cancel_import_job, name="cancel_job"),
+    url(r"^export/$", admin_views.export_redirects, name="export"),
 ]
@@ -1,17 +1,46 @@
-from django.shortcuts import render
-from django.http import HttpResponse
+from django.conf import settings
+from django.shortcuts import get_object_or_404, redirect, render
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.urls import reverse
 from django.utils.encoding import force_str
 from django.utils.translation import ugettext as _
 from django.views.decorators.http import require_http_methods
+from wagtail.admin import messages
 from wagtail.core import hooks
-from wagtail.contrib.redirects.forms import RedirectForm
+from wagtail.contrib.redirects.models import Redirect
 from wagtail.contrib.redirects.permissions import permission_policy
 from wagtail.admin.auth import PermissionPolicyChecker, permission_denied
 
 from .base_formats import DEFAULT_FORMATS
-from .tmp_storages import TempFolderStorage
-from .forms import ImportForm, ConfirmImportForm
-from .utils import write_to_tmp_storage, get_import_formats
+from .columns import SAMPLE_SIZE, get_sample, guess_columns
+from .exporters import EXPORTERS, get_redirect_queryset, iter_redirect_rows
+from .forms import CompleteUploadForm, ImportForm, ConfirmImportForm, ExportForm
+from .importer import (
+    COMMIT_FILE,
+    InternalTargetChecker,
+    PageUrlIndex,
+    RedirectWriter,
+    SiteResolver,
+)
+from .jobs import ImportCancelled, start_job
+from .models import ImportJob
+from .rules import parse_rule
+from .sync import sync_redirects
+from .throttle import Throttle
+from .uploads import DEFAULT_CHUNK_SIZE, ChunkedUpload, ChunkTooLarge, OffsetMismatch
+from .validation import RedirectValidator
+from .utils import (
+    cleanup_tmp_storage,
+    get_import_formats,
+    get_tmp_storage_class,
+    write_to_tmp_storage,
+)
 
 
 from_encoding = "utf-8"
@@ -40,92 +69,278 @@ def start(request):
     import_formats = get_import_formats()
     input_format = import_formats[int(form.cleaned_data["input_format"])]()
     import_file = form.cleaned_data["import_file"]
+
+    if getattr(settings, "WAGTAIL_REDIRECT_IMPORTER_CLEANUP_ON_UPLOAD", False):
+        cleanup_tmp_storage()
+
     tmp_storage = write_to_tmp_storage(import_file, input_format)
 
+    return render_confirm_step(
+        request,
+        tmp_storage,
+        input_format,
+        form.cleaned_data["input_format"],
+        import_file.name,
+    )
+
+
+def render_confirm_step(request, tmp_storage, input_format, input_format_value, name):
     try:
-        data = tmp_storage.read(input_format.get_read_mode())
-        if not input_format.is_binary() and from_encoding:
-            data = force_str(data, from_encoding)
-        dataset = input_format.create_dataset(data)
-    except UnicodeDecodeError as e:
-        return HttpResponse(_(u"<h1>Imported file has a wrong encoding: %s</h1>" % e))
-    except Exception as e:  # pragma: no cover
-        return HttpResponse(
-            _(
-                u"<h1>%s encountered while trying to read file: %s</h1>"
-                % (type(e).__name__, import_file.name)
-            )
+        context = get_confirm_context(
+            tmp_storage, input_format, input_format_value, name
         )
+    except Exception as e:
+        return get_read_error_response(e, name)
+
+    return render(request, "wagtail_redirect_importer/confirm_import.html", context)
+
+
+def get_confirm_context(tmp_storage, input_format, input_format_value, name):
+    """
+    Reads a sample of the file and guesses its columns for the confirm step.
+    Doesn't touch the database, so async views can run it in a thread pool.
+    """
+    dataset = get_sample(input_format, read_tmp_storage(tmp_storage, input_format))
 
     initial = {
         "import_file_name": tmp_storage.name,
-        "original_file_name": import_file.name,
-        "input_format": form.cleaned_data["input_format"],
+        "original_file_name": name,
+        "input_format": input_format_value,
     }
 
-    return render(
+    column_guess = guess_columns(dataset)
+    if column_guess:
+        initial["from_index"] = str(column_guess.from_index)
+        initial["to_index"] = str(column_guess.to_index)
+
+    return {
+        "form": ConfirmImportForm(dataset.headers, initial=initial),
+        "dataset": dataset,
+        "column_guess": column_guess,
+        "sample_size": SAMPLE_SIZE,
+    }
+
+
+def get_read_error_response(error, name):
+    if isinstance(error, UnicodeDecodeError):
+        return HttpResponse(
+            _(u"<h1>Imported file has a wrong encoding: %s</h1>" % error)
+        )
+    return HttpResponse(  # pragma: no cover
+        _(
+            u"<h1>%s encountered while trying to read file: %s</h1>"
+            % (type(error).__name__, name)
+        )
+    )
+
+
+def read_tmp_storage(tmp_storage, input_format):
+    data = tmp_storage.read(input_format.get_read_mode())
+    if not input_format.is_binary() and from_encoding:
+        data = force_str(data, from_encoding)
+    return data
+
+
+def read_dataset(tmp_storage, input_format):
+    return input_format.create_dataset(read_tmp_storage(tmp_storage, input_format))
+
+
+@permission_checker.require_any("add")
+@require_http_methods(["POST"])
+def start_upload(request):
+    if getattr(settings, "WAGTAIL_REDIRECT_IMPORTER_CLEANUP_ON_UPLOAD", False):
+        cleanup_tmp_storage()
+
+    upload = ChunkedUpload.create()
+    return JsonResponse(get_upload_state(upload), status=201)
+
+
+@permission_checker.require_any("add")
+@require_http_methods(["GET", "POST"])
+def upload_chunk(request, upload_id):
+    """
+    GET returns the offset to resume from, POST appends the request body
+    at the offset in the query string.
+    """
+    upload = ChunkedUpload(upload_id)
+    if not upload.exists():
+        raise Http404
+
+    if request.method == "GET":
+        return JsonResponse(get_upload_state(upload))
+
+    chunk_size = get_upload_chunk_size()
+    too_large = JsonResponse(
+        {"error": _("Chunks can be at most %d bytes") % chunk_size}, status=413
+    )
+    try:
+        offset = int(request.GET.get("offset", ""))
+        if int(request.META.get("CONTENT_LENGTH") or 0) > chunk_size:
+            return too_large
+        upload.append(offset, request, chunk_size)
+    except ValueError:
+        return HttpResponseBadRequest()
+    except OffsetMismatch:
+        return JsonResponse(get_upload_state(upload), status=409)
+    except ChunkTooLarge:
+        # The Content-Length header is missing or understates the body
+        return too_large
+
+    return JsonResponse(get_upload_state(upload))
+
+
+@permission_checker.require_any("add")
+@require_http_methods(["POST"])
+def complete_upload(request, upload_id):
+    upload = ChunkedUpload(upload_id)
+    if not upload.exists():
+        raise Http404
+
+    form = CompleteUploadForm(DEFAULT_FORMATS, request.POST)
+    if not form.is_valid():
+        upload.remove()
+        errors = [
+            "{}: {}".format(form[field].label, " ".join(messages_))
+            for field, messages_ in form.errors.items()
+        ]
+        messages.error(
+            request,
+            _("The upload could not be completed (%(errors)s), try again.")
+            % {"errors": "; ".join(errors)},
+        )
+        return redirect("wagtailredirectimporter:start")
+
+    if upload.get_checksum() != form.cleaned_data["checksum"].lower():
+        upload.remove()
+        messages.error(request, _("The file was corrupted while uploading, try again."))
+        return redirect("wagtailredirectimporter:start")
+
+    import_formats = get_import_formats()
+    input_format = import_formats[int(form.cleaned_data["input_format"])]()
+
+    return render_confirm_step(
         request,
-        "wagtail_redirect_importer/confirm_import.html",
-        {
-            "form": ConfirmImportForm(dataset.headers, initial=initial),
-            "dataset": dataset,
-        },
+        upload.to_tmp_storage(input_format),
+        input_format,
+        form.cleaned_data["input_format"],
+        form.cleaned_data["file_name"],
+    )
+
+
+def get_upload_chunk_size():
+    return getattr(
+        settings, "WAGTAIL_REDIRECT_IMPORTER_UPLOAD_CHUNK_SIZE", DEFAULT_CHUNK_SIZE
     )
 
 
+def get_upload_state(upload):
+    return {
+        "upload_id": upload.upload_id,
+        "offset": upload.get_offset(),
+        "chunk_size": get_upload_chunk_size(),
+        "chunk_url": reverse(
+            "wagtailredirectimporter:upload_chunk", args=[upload.upload_id]
+        ),
+        "complete_url": reverse(
+            "wagtailredirectimporter:complete_upload", args=[upload.upload_id]
+        ),
+    }
+
+
 @permission_checker.require_any("add")
 @require_http_methods(["POST"])
 def import_file(request):
-    form_kwargs = {}
     form = ConfirmImportForm(
-        DEFAULT_FORMATS, request.POST or None, request.FILES or None, **form_kwargs
+        DEFAULT_FORMATS, request.POST or None, request.FILES or None
     )
-
     is_confirm_form_valid = form.is_valid()
+    input_format, tmp_storage = get_confirmed_file(form)
+
+    if not is_confirm_form_valid:
+        return render_invalid_confirm_step(request, form, tmp_storage, input_format)
 
+    dataset = read_dataset(tmp_storage, input_format)
+    return import_dataset(request, form, tmp_storage, dataset)
+
+
+def get_confirmed_file(form):
     import_formats = get_import_formats()
     input_format = import_formats[int(form.cleaned_data["input_format"])]()
-    tmp_storage = TempFolderStorage(name=form.cleaned_data["import_file_name"])
-
-    if not is_confirm_form_valid:
-        data = tmp_storage.read(input_format.get_read_mode())
-        dataset = input_format.create_dataset(data)
+    tmp_storage = get_tmp_storage_class()(name=form.cleaned_data["import_file_name"])
+    return input_format, tmp_storage
 
-        initial = {
-            "import_file_name": tmp_storage.name,
-            "original_file_name": form.cleaned_data["import_file_name"],
-            "input_format": form.cleaned_data["input_format"],
-        }
 
-        return render(
-            request,
-            "wagtail_redirect_importer/confirm_import.html",
-            {
-                "form": ConfirmImportForm(
-                    dataset.headers,
-                    request.POST or None,
-                    request.FILES or None,
-                    initial=initial,
-                ),
-                "dataset": dataset,
-            },
-        )
+def render_invalid_confirm_step(request, form, tmp_storage, input_format):
+    dataset = get_sample(input_format, read_tmp_storage(tmp_storage, input_format))
 
-    data = tmp_storage.read(input_format.get_read_mode())
-    if not input_format.is_binary() and from_encoding:
-        data = force_str(data, from_encoding)
-    dataset = input_format.create_dataset(data)
+    initial = {
+        "import_file_name": tmp_storage.name,
+        "original_file_name": form.cleaned_data["import_file_name"],
+        "input_format": form.cleaned_data["input_format"],
+    }
 
-    import_summary = create_redirects_from_dataset(
-        dataset,
+    return render(
+        request,
+        "wagtail_redirect_importer/confirm_import.html",
         {
-            "from_index": int(form.cleaned_data["from_index"]),
-            "to_index": int(form.cleaned_data["to_index"]),
-            "permanent": form.cleaned_data["permanent"],
-            "site": form.cleaned_data["site"],
+            "form": ConfirmImportForm(
+                dataset.headers,
+                request.POST or None,
+                request.FILES or None,
+                initial=initial,
+            ),
+            "dataset": dataset,
+            "sample_size": SAMPLE_SIZE,
         },
     )
 
+
+def import_dataset(request, form, tmp_storage, dataset):
+    """
+    Imports (or syncs) the parsed dataset with the options of the valid
+    confirm form and returns the summary response.
+    """
+    config = {
+        "from_index": int(form.cleaned_data["from_index"]),
+        "to_index": int(form.cleaned_data["to_index"]),
+        "permanent": form.cleaned_data["permanent"],
+        "site": form.cleaned_data["site"],
+        "site_column": None,
+        "resolve_pages": form.cleaned_data["resolve_pages"],
+        "rules": form.cleaned_data["rules"],
+        "verify_targets": form.cleaned_data["verify_targets"],
+    }
+
+    if form.cleaned_data["site_column"]:
+        config["site_column"] = int(form.cleaned_data["site_column"])
+
+    if form.cleaned_data["sync"]:
+        dry_run = not form.cleaned_data["sync_confirmed"]
+        import_summary = sync_redirects_from_dataset(dataset, config, dry_run)
+
+        if dry_run:
+            data = request.POST.copy()
+            data["sync_confirmed"] = True
+            return render(
+                request,
+                "wagtail_redirect_importer/sync_preview.html",
+                {
+                    "form": ConfirmImportForm(dataset.headers, data),
+                    "import_summary": import_summary,
+                },
+            )
+    elif getattr(settings, "WAGTAIL_REDIRECT_IMPORTER_BACKGROUND_IMPORTS", False):
+        tmp_storage.remove()
+        job = ImportJob.objects.create(
+            user=request.user,
+            file_name=form.cleaned_data["original_file_name"] or "",
+            total=len(dataset),
+        )
+        start_job(job, create_redirects_from_dataset, dataset, config)
+        return redirect("wagtailredirectimporter:job", job.pk)
+    else:
+        import_summary = create_redirects_from_dataset(dataset, config)
+
     tmp_storage.remove()
 
     return render(
@@ -135,38 +350,215 @@ def import_file(request):
     )
 
 
-def create_redirects_from_dataset(dataset, config):
+@permission_checker.require_any("add")
+def import_job(request, job_id):
+    job = get_object_or_404(ImportJob, pk=job_id)
+
+    if not job.is_finished:
+        return render(
+            request, "wagtail_redirect_importer/import_job.html", {"job": job}
+        )
+
+    return render(
+        request,
+        "wagtail_redirect_importer/import_summary.html",
+        {
+            "form": ImportForm(DEFAULT_FORMATS),
+            "import_summary": job.get_summary(),
+            "job": job,
+        },
+    )
+
+
+@permission_checker.require_any("add")
+@require_http_methods(["POST"])
+def cancel_import_job(request, job_id):
+    job = get_object_or_404(ImportJob, pk=job_id)
+
+    # The job stops at the end of the batch it's importing
+    ImportJob.objects.filter(
+        pk=job.pk, status__in=[ImportJob.PENDING, ImportJob.RUNNING]
+    ).update(cancel_requested=True)
+
+    return redirect("wagtailredirectimporter:job", job.pk)
+
+
+@permission_checker.require_any("add", "change", "delete")
+def export_redirects(request):
+    if "format" not in request.GET:
+        return render(
+            request, "wagtail_redirect_importer/export.html", {"form": ExportForm()},
+        )
+
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return render(request, "wagtail_redirect_importer/export.html", {"form": form},)
+
+    exporter_class = EXPORTERS[form.cleaned_data["format"]]
+    rows = iter_redirect_rows(get_redirect_queryset(form.cleaned_data["site"]))
+
+    response = StreamingHttpResponse(
+        exporter_class(rows), content_type=exporter_class.content_type
+    )
+    response["Content-Disposition"] = 'attachment; filename="redirects.{}"'.format(
+        exporter_class.extension
+    )
+    return response
+
+
+def create_redirects_from_dataset(dataset, config, job=None):
+    """
+    Imports the rows of dataset. A job's progress is saved after every
+    batch, and when it's been cancelled the import stops there: the rows
+    written so far are kept, except in "file" commit mode where they are
+    rolled back.
+    """
     errors = []
     successes = 0
     total = 0
+    cancelled = False
+
+    site_resolver = None
+    if config.get("site_column") is not None:
+        site_resolver = SiteResolver(default=config["site"])
+
+    page_index = None
+    if config.get("resolve_pages") or config.get("verify_targets"):
+        page_index = PageUrlIndex(site_resolver)
 
-    for row in dataset:
-        total += 1
+    validator = RedirectValidator()
+
+    target_checker = None
+    if config.get("verify_targets"):
+        target_checker = InternalTargetChecker(page_index, validator.index)
+    unverified = []
+    writer = RedirectWriter(
+        bulk=getattr(settings, "WAGTAIL_REDIRECT_IMPORTER_BULK_IMPORT", False),
+        batch_size=getattr(settings, "WAGTAIL_REDIRECT_IMPORTER_BATCH_SIZE", 500),
+        commit=getattr(settings, "WAGTAIL_REDIRECT_IMPORTER_COMMIT", "row"),
+        throttle=get_throttle(),
+    )
+
+    try:
+        with writer:
+            for row in dataset:
+                if (
+                    job
+                    and total % writer.batch_size == 0
+                    and job.update_progress(total, successes, len(errors))
+                ):
+                    cancelled = True
+                    if writer.commit == COMMIT_FILE:
+                        raise ImportCancelled
+                    break
 
-        from_link = row[config["from_index"]]
-        to_link = row[config["to_index"]]
+                total += 1
 
-        data = {
-            "old_path": from_link,
-            "redirect_link": to_link,
-            "is_permanent": config["permanent"],
-        }
+                from_link = row[config["from_index"]]
+                to_link = row[config["to_index"]]
 
-        if config["site"]:
-            data["site"] = config["site"].pk
+                site = config["site"]
+                if site_resolver:
+                    site, error = site_resolver.resolve(row[config["site_column"]])
+                    if error:
+                        errors.append([from_link, to_link, error])
+                        continue
 
-        form = RedirectForm(data)
-        if not form.is_valid():
-            error = form.errors.as_text().replace("\n", "")
-            errors.append([from_link, to_link, error])
-            continue
+                if config.get("rules") and parse_rule(from_link):
+                    rule, error = validator.validate_rule(
+                        from_link, to_link, site, config["permanent"]
+                    )
+                    if error:
+                        errors.append([from_link, to_link, error])
+                        continue
 
-        form.save()
-        successes += 1
+                    rule.save()
+                    validator.add_rule(rule)
+                    successes += 1
+                    continue
+
+                page_id = None
+                if config.get("resolve_pages"):
+                    page_id = page_index.resolve(to_link, site)
+
+                old_path, redirect_link, error = validator.validate(
+                    from_link, "" if page_id else to_link, site
+                )
+                if error:
+                    errors.append([from_link, to_link, error])
+                    continue
+
+                writer.add(
+                    Redirect(
+                        old_path=old_path,
+                        site=site,
+                        is_permanent=config["permanent"],
+                        redirect_page_id=page_id,
+                        redirect_link=redirect_link,
+                    ),
+                    (from_link, to_link),
+                )
+                validator.index.add(site, old_path)
+                successes += 1
+
+                if target_checker and not page_id and target_checker.check(to_link):
+                    unverified.append([from_link, to_link])
+    except ImportCancelled:
+        # Everything was rolled back with the file's transaction
+        errors = []
+        successes = 0
+        unverified = []
+        writer.failed = []
+
+    for (from_link, to_link), error in writer.failed:
+        errors.append([from_link, to_link, error])
+    successes -= len(writer.failed)
+
+    # Targets imported after the row pointing to them are valid too
+    warnings = []
+    for from_link, to_link in unverified:
+        warning = target_checker.check(to_link)
+        if warning:
+            warnings.append([from_link, to_link, warning])
+    validator.index.close()
 
     return {
         "errors": errors,
         "errors_count": len(errors),
+        "warnings": warnings,
+        "warnings_count": len(warnings),
         "successes": successes,
         "total": total,
+        "cancelled": cancelled,
+    }
+
+
+def get_throttle():
+    rate = getattr(settings, "WAGTAIL_REDIRECT_IMPORTER_MAX_ROWS_PER_SECOND", None)
+    adaptive = getattr(settings, "WAGTAIL_REDIRECT_IMPORTER_ADAPTIVE_THROTTLE", False)
+    if not rate and not adaptive:
+        return None
+
+    return Throttle(
+        rate=rate,
+        adaptive=adaptive,
+        max_latency=getattr(
+            settings, "WAGTAIL_REDIRECT_IMPORTER_MAX_COMMIT_LATENCY", 0.5
+        ),
+    )
+
+
+def sync_redirects_from_dataset(dataset, config, dry_run):
+    rows = ((row[config["from_index"]], row[config["to_index"]]) for row in dataset)
+    diff, errors = sync_redirects(
+        rows, config["site"], config["permanent"], dry_run=dry_run
+    )
+    counts = diff.get_counts()
+
+    return {
+        "errors": errors,
+        "errors_count": len(errors),
+        "successes": counts["adds"] + counts["updates"],
+        "total": len(dataset),
+        "sync": counts,
     }
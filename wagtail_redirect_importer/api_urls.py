@@ -0,0 +1,10 @@
+from django.conf.urls import url
+
+from . import api_views
+
+
+app_name = "wagtailredirectimporter_api"
+urlpatterns = [
+    url(r"^imports/$", api_views.import_redirects, name="import"),
+    url(r"^imports/(\d+)/$", api_views.import_job, name="job"),
+]
@@ -0,0 +1,196 @@
+"""
+A JSON api for importing redirects from other services. The request body
+(CSV or JSON lines) is read as a stream and imported in a background job,
+whose progress can be polled. Requests authenticate with a token from the
+WAGTAIL_REDIRECT_IMPORTER_API_TOKENS setting or a session, and need the
+same permission as the import views.
+"""
+import codecs
+import csv
+import hmac
+import json
+from functools import wraps
+
+import tablib
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from wagtail.contrib.redirects.permissions import permission_policy
+from wagtail.core.models import Site
+
+from .admin_views import create_redirects_from_dataset
+from .jobs import start_job
+from .models import ImportJob
+
+
+CSV_CONTENT_TYPES = ("text/csv",)
+JSON_LINES_CONTENT_TYPES = (
+    "application/x-ndjson",
+    "application/jsonl",
+    "application/json-lines",
+)
+
+
+def get_token_user(request):
+    """
+    Returns the user of the bearer token in the Authorization header, an
+    anonymous user for unknown tokens, or None if there is no token.
+    """
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    if not header.startswith("Bearer "):
+        return None
+
+    token = header[len("Bearer ") :].strip().encode()
+    tokens = getattr(settings, "WAGTAIL_REDIRECT_IMPORTER_API_TOKENS", {})
+    for api_token, username in tokens.items():
+        if hmac.compare_digest(token, api_token.encode()):
+            user_model = get_user_model()
+            try:
+                return user_model._default_manager.get_by_natural_key(username)
+            except user_model.DoesNotExist:
+                break
+
+    return AnonymousUser()
+
+
+def api_view(view_func):
+    @csrf_exempt
+    @wraps(view_func)
+    def wrapped_view_func(request, *args, **kwargs):
+        user = get_token_user(request)
+        if user is None:
+            # Requests authenticated by the session need a csrf token
+            csrf_middleware = CsrfViewMiddleware(lambda request: None)
+            response = csrf_middleware.process_view(request, None, (), {})
+            if response:
+                return response
+            user = request.user
+
+        if not user.is_authenticated or not user.is_active:
+            return JsonResponse({"error": "Authentication required"}, status=401)
+
+        if not permission_policy.user_has_permission(user, "add"):
+            return JsonResponse({"error": "Permission denied"}, status=403)
+
+        request.user = user
+        return view_func(request, *args, **kwargs)
+
+    return wrapped_view_func
+
+
+def read_csv(stream):
+    rows = csv.reader(codecs.iterdecode(stream, "utf-8-sig"))
+    dataset = tablib.Dataset(headers=next(rows, []))
+    for row in rows:
+        if len(row) != dataset.width:
+            raise ValueError(
+                "Row {} has the wrong number of columns".format(rows.line_num)
+            )
+        dataset.append(row)
+    return dataset
+
+
+def read_json_lines(stream):
+    dataset = tablib.Dataset(headers=["from", "to"])
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+            dataset.append([str(row["from"]), str(row["to"])])
+        except (ValueError, KeyError, TypeError):
+            raise ValueError(
+                "Line {} isn't an object with from and to links".format(number)
+            )
+    return dataset
+
+
+def get_config(params, dataset):
+    """
+    Returns the import config from the query string, raises ValueError if
+    it's invalid.
+    """
+    config = {
+        "from_index": get_int_param(params, "from_index", 0),
+        "to_index": get_int_param(params, "to_index", 1),
+        "permanent": params.get("permanent", "true").lower() not in ("false", "0"),
+        "site": None,
+        "site_column": None,
+    }
+
+    for key in ("from_index", "to_index"):
+        if not 0 <= config[key] < dataset.width:
+            raise ValueError("{} is out of range".format(key))
+
+    if params.get("site"):
+        site_id = get_int_param(params, "site")
+        try:
+            config["site"] = Site.objects.get(pk=site_id)
+        except Site.DoesNotExist:
+            raise ValueError("Unknown site {}".format(site_id))
+
+    return config
+
+
+def get_int_param(params, key, default=None):
+    try:
+        return int(params.get(key, default))
+    except (TypeError, ValueError):
+        raise ValueError("{} must be an integer".format(key))
+
+
+def get_job_state(job):
+    state = {
+        "id": job.pk,
+        "status": job.status,
+        "total": job.total,
+        "processed": job.processed,
+        "successes": job.successes,
+        "errors_count": job.errors_count,
+        "url": reverse("wagtailredirectimporter_api:job", args=[job.pk]),
+    }
+    if job.is_finished:
+        state["summary"] = job.get_summary()
+    return state
+
+
+@api_view
+@require_http_methods(["POST"])
+def import_redirects(request):
+    if request.content_type in CSV_CONTENT_TYPES:
+        reader = read_csv
+    elif request.content_type in JSON_LINES_CONTENT_TYPES:
+        reader = read_json_lines
+    else:
+        return JsonResponse(
+            {"error": "Send text/csv or application/x-ndjson"}, status=415
+        )
+
+    try:
+        dataset = reader(request)
+        config = get_config(request.GET, dataset)
+    except (ValueError, csv.Error) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    job = ImportJob.objects.create(
+        user=request.user,
+        file_name=request.GET.get("name", "")[:255],
+        total=len(dataset),
+    )
+    start_job(job, create_redirects_from_dataset, dataset, config)
+
+    job.refresh_from_db()
+    return JsonResponse(get_job_state(job), status=202)
+
+
+@api_view
+@require_http_methods(["GET"])
+def import_job(request, job_id):
+    job = get_object_or_404(ImportJob, pk=job_id)
+    return JsonResponse(get_job_state(job))
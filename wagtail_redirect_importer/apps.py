@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class WagtailRedirectImporterConfig(AppConfig):
     name = "wagtail_redirect_importer"
+
+    def ready(self):
+        from .signal_handlers import register_signal_handlers
+
+        register_signal_handlers()
@@ -0,0 +1,22 @@
+"""
+Serves the start and import steps with the async views. Wagtail wraps its
+admin urls in a sync decorator, so include these in your urls before
+wagtail's admin urls, at the path of the importer:
+
+    url(r"^admin/redirect-importer/", include(async_urls)),
+    url(r"^admin/", include(wagtailadmin_urls)),
+"""
+import django
+from django.conf.urls import url
+from django.core.exceptions import ImproperlyConfigured
+
+from . import async_views
+
+
+if django.VERSION < (3, 1):
+    raise ImproperlyConfigured("The async views require Django 3.1 or later")
+
+urlpatterns = [
+    url(r"^$", async_views.start),
+    url(r"^import/$", async_views.import_file),
+]
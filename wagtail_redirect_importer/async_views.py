@@ -0,0 +1,125 @@
+"""
+Async versions of the start and import views, for ASGI deployments on
+Django 3.1+. Reading the upload, writing it to the temporary storage and
+parsing the file run in a thread pool, only the permission checks,
+rendering and the import itself run in the thread Django keeps for code
+that uses the database. Include them with `async_urls`.
+
+Every call is explicit about thread_sensitive, since asgiref before 3.3
+runs sync_to_async calls in the pool by default.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponseNotAllowed
+from django.shortcuts import render
+from django.utils.translation import ugettext as _
+from wagtail.admin import messages
+from wagtail.admin.auth import permission_denied, reject_request
+from wagtail.contrib.redirects.permissions import permission_policy
+
+from .admin_views import (
+    get_confirm_context,
+    get_confirmed_file,
+    get_read_error_response,
+    import_dataset,
+    read_dataset,
+    render_invalid_confirm_step,
+)
+from .base_formats import DEFAULT_FORMATS
+from .forms import ConfirmImportForm, ImportForm
+from .utils import cleanup_tmp_storage, get_import_formats, write_to_tmp_storage
+
+
+def check_permission(request):
+    """
+    Makes the checks wagtail's admin urls and permission_checker make for
+    the sync views, returns a response if the request is rejected.
+    """
+    user = request.user
+    if user.is_anonymous:
+        return reject_request(request)
+
+    if not user.has_perms(["wagtailadmin.access_admin"]):
+        if not request.is_ajax():
+            messages.error(request, _("You do not have permission to access the admin"))
+        return reject_request(request)
+
+    if not permission_policy.user_has_any_permission(user, ["add"]):
+        return permission_denied(request)
+
+
+def get_form_data(request):
+    # Parses the request body, which writes large uploads to disk
+    return request.POST or None, request.FILES or None
+
+
+async def start(request):
+    response = await sync_to_async(check_permission, thread_sensitive=True)(request)
+    if response:
+        return response
+
+    data, files = await sync_to_async(get_form_data, thread_sensitive=False)(request)
+    if not data:
+        return await sync_to_async(render, thread_sensitive=True)(
+            request,
+            "wagtail_redirect_importer/choose_file.html",
+            {"form": ImportForm(DEFAULT_FORMATS)},
+        )
+
+    form = ImportForm(DEFAULT_FORMATS, data, files)
+    if not form.is_valid():
+        return await sync_to_async(render, thread_sensitive=True)(
+            request, "wagtail_redirect_importer/choose_file.html", {"form": form}
+        )
+
+    import_formats = get_import_formats()
+    input_format = import_formats[int(form.cleaned_data["input_format"])]()
+    import_file = form.cleaned_data["import_file"]
+
+    if getattr(settings, "WAGTAIL_REDIRECT_IMPORTER_CLEANUP_ON_UPLOAD", False):
+        await sync_to_async(cleanup_tmp_storage, thread_sensitive=False)()
+
+    tmp_storage = await sync_to_async(write_to_tmp_storage, thread_sensitive=False)(
+        import_file, input_format
+    )
+
+    try:
+        context = await sync_to_async(get_confirm_context, thread_sensitive=False)(
+            tmp_storage,
+            input_format,
+            form.cleaned_data["input_format"],
+            import_file.name,
+        )
+    except Exception as e:
+        return get_read_error_response(e, import_file.name)
+
+    return await sync_to_async(render, thread_sensitive=True)(
+        request, "wagtail_redirect_importer/confirm_import.html", context
+    )
+
+
+async def import_file(request):
+    response = await sync_to_async(check_permission, thread_sensitive=True)(request)
+    if response:
+        return response
+
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    data, files = await sync_to_async(get_form_data, thread_sensitive=False)(request)
+    form = ConfirmImportForm(DEFAULT_FORMATS, data, files)
+    # Validating the site field queries the database
+    is_confirm_form_valid = await sync_to_async(form.is_valid, thread_sensitive=True)()
+    input_format, tmp_storage = get_confirmed_file(form)
+
+    if not is_confirm_form_valid:
+        return await sync_to_async(render_invalid_confirm_step, thread_sensitive=True)(
+            request, form, tmp_storage, input_format
+        )
+
+    dataset = await sync_to_async(read_dataset, thread_sensitive=False)(
+        tmp_storage, input_format
+    )
+    return await sync_to_async(import_dataset, thread_sensitive=True)(
+        request, form, tmp_storage, dataset
+    )
@@ -0,0 +1,146 @@
+from urllib.parse import urlsplit
+
+import tablib
+
+from .base_formats import CSV, TSV
+
+
+SAMPLE_SIZE = 200
+
+HIGH = "high"
+MEDIUM = "medium"
+LOW = "low"
+
+FROM_HEADERS = {"from", "from_link", "old", "old_path", "old_url", "source", "src"}
+TO_HEADERS = {
+    "to",
+    "to_link",
+    "new",
+    "new_url",
+    "target",
+    "destination",
+    "redirect",
+    "redirect_link",
+    "url",
+}
+HEADER_BONUS = 0.1
+
+
+def get_sample(input_format, data, size=SAMPLE_SIZE):
+    """
+    Returns a dataset with the headers and the first size rows of data.
+    CSV and TSV only parse the lines they need, other formats are parsed
+    in full.
+    """
+    if isinstance(input_format, (CSV, TSV)):
+        end = -1
+        lines = 0
+        in_quotes = False
+        while lines <= size:
+            start = end + 1
+            end = data.find("\n", start)
+            if end == -1:
+                break
+            # Only the quotes since the previous newline are counted, so
+            # the sample is found in one pass
+            if data.count('"', start, end) % 2:
+                in_quotes = not in_quotes
+            # Don't cut inside a quoted value that spans lines
+            if not in_quotes:
+                lines += 1
+
+        if end != -1:
+            try:
+                return input_format.create_dataset(data[: end + 1])
+            except Exception:
+                pass
+
+    dataset = input_format.create_dataset(data)
+    if len(dataset) <= size:
+        return dataset
+    return tablib.Dataset(*dataset[:size], headers=dataset.headers)
+
+
+def get_path_score(value):
+    value = str(value).strip() if value is not None else ""
+    if not value or " " in value:
+        return 0
+
+    parts = urlsplit(value)
+    if parts.scheme in ("http", "https") and parts.netloc:
+        # Full urls are valid from links, but most files use paths
+        return 0.5
+    if value.startswith("/") and not value.startswith("//"):
+        return 1
+    return 0.25
+
+
+def get_link_score(value):
+    value = str(value).strip() if value is not None else ""
+    parts = urlsplit(value)
+    if parts.scheme in ("http", "https") and parts.netloc and " " not in value:
+        return 1
+    return 0
+
+
+def get_header_bonus(header, names):
+    header = str(header or "").strip().lower().replace(" ", "_").replace("-", "_")
+    return HEADER_BONUS if header in names else 0
+
+
+class ColumnGuess:
+    def __init__(self, from_index, to_index, score, confidence):
+        self.from_index = from_index
+        self.to_index = to_index
+        self.score = score
+        self.confidence = confidence
+
+
+def guess_columns(dataset):
+    """
+    Scores every column of the sample for holding old paths and for
+    holding target urls, and returns the most likely (from, to) pair as a
+    ColumnGuess, or None for datasets with less than two columns.
+    """
+    width = dataset.width
+    if width < 2:
+        return None
+
+    rows = list(dataset)
+    from_scores = []
+    to_scores = []
+    for index in range(width):
+        values = [row[index] for row in rows]
+        header = dataset.headers[index] if dataset.headers else None
+        count = len(values) or 1
+        from_scores.append(
+            sum(map(get_path_score, values)) / count
+            + get_header_bonus(header, FROM_HEADERS)
+        )
+        to_scores.append(
+            sum(map(get_link_score, values)) / count
+            + get_header_bonus(header, TO_HEADERS)
+        )
+
+    pairs = sorted(
+        (
+            ((from_scores[i] + to_scores[j]) / 2, i, j)
+            for i in range(width)
+            for j in range(width)
+            if i != j
+        ),
+        # Highest score first, then the leftmost columns
+        key=lambda pair: (-pair[0], pair[1], pair[2]),
+    )
+    score, from_index, to_index = pairs[0]
+    margin = score - pairs[1][0]
+    score = min(1, score)
+
+    if score >= 0.8 and margin >= 0.15:
+        confidence = HIGH
+    elif score >= 0.5:
+        confidence = MEDIUM
+    else:
+        confidence = LOW
+
+    return ColumnGuess(from_index, to_index, score, confidence)
@@ -0,0 +1,151 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+
+from wagtail.contrib.redirects.models import Redirect
+
+
+EXPORT_HEADERS = ("from", "to", "permanent", "site")
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def get_site_label(site):
+    if site is None:
+        return ""
+    if site.port == 80:
+        return site.hostname
+    return "{}:{}".format(site.hostname, site.port)
+
+
+def get_redirect_queryset(site=None):
+    queryset = Redirect.objects.select_related("site", "redirect_page").order_by("pk")
+    if site:
+        queryset = queryset.filter(site=site)
+    return queryset
+
+
+def iter_redirect_rows(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields one export row per redirect, reading the queryset in chunks so
+    memory use does not depend on the number of redirects.
+    """
+    for redirect in queryset.iterator(chunk_size=chunk_size):
+        if redirect.redirect_page_id:
+            to_link = redirect.redirect_page.full_url or ""
+        else:
+            to_link = redirect.redirect_link
+
+        yield (
+            redirect.old_path,
+            to_link,
+            redirect.is_permanent,
+            get_site_label(redirect.site),
+        )
+
+
+class Exporter:
+    extension = None
+    content_type = None
+    is_binary = False
+
+    # Number of rows written to the buffer before it is flushed
+    rows_per_chunk = 500
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __iter__(self):
+        raise NotImplementedError
+
+
+class DelimitedExporter(Exporter):
+    delimiter = None
+
+    def __iter__(self):
+        buffer = StringIO()
+        writer = csv.writer(buffer, delimiter=self.delimiter)
+        writer.writerow(EXPORT_HEADERS)
+
+        for index, row in enumerate(self.rows, 1):
+            writer.writerow(row)
+            if index % self.rows_per_chunk == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue()
+
+
+class CSVExporter(DelimitedExporter):
+    extension = "csv"
+    content_type = "text/csv"
+    delimiter = ","
+
+
+class TSVExporter(DelimitedExporter):
+    extension = "tsv"
+    content_type = "text/tab-separated-values"
+    delimiter = "\t"
+
+
+class JSONLinesExporter(Exporter):
+    extension = "jsonl"
+    content_type = "application/x-ndjson"
+
+    def __iter__(self):
+        lines = []
+        for row in self.rows:
+            lines.append(json.dumps(dict(zip(EXPORT_HEADERS, row))) + "\n")
+            if len(lines) == self.rows_per_chunk:
+                yield "".join(lines)
+                lines = []
+
+        yield "".join(lines)
+
+
+class XLSXExporter(Exporter):
+    """
+    Unlike the text exporters, xlsx isn't streamed as the rows are read.
+    openpyxl only zips a worksheet into the workbook once every row is
+    appended, so the workbook is assembled in a temporary file and sent
+    after the last row. Memory use stays flat, but the response starts
+    only when the whole export has been written to disk.
+    """
+
+    extension = "xlsx"
+    content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    is_binary = True
+
+    # Size of the chunks the finished workbook is read back in
+    read_size = 64 * 1024
+
+    def __iter__(self):
+        import openpyxl
+
+        # Write-only mode flushes rows to disk as they are appended
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(EXPORT_HEADERS)
+        for row in self.rows:
+            sheet.append(row)
+
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        try:
+            workbook.save(path)
+            with open(path, "rb") as f:
+                while True:
+                    data = f.read(self.read_size)
+                    if not data:
+                        break
+                    yield data
+        finally:
+            os.remove(path)
+
+
+EXPORTERS = {
+    exporter.extension: exporter
+    for exporter in (CSVExporter, TSVExporter, JSONLinesExporter, XLSXExporter)
+}
@@ -4,6 +4,8 @@ from django import forms
 from django.utils.translation import gettext_lazy as _
 from wagtail.core.models import Site
 
+from .exporters import EXPORTERS
+
 
 class ImportForm(forms.Form):
     import_file = forms.FileField(label=_("File to import"))
@@ -21,6 +23,20 @@ class ImportForm(forms.Form):
         self.fields["input_format"].choices = choices
 
 
+class CompleteUploadForm(ImportForm):
+    """
+    Moves a finished chunked upload on to the confirm step, the checksum is
+    the sha256 hex digest of the whole file.
+    """
+
+    checksum = forms.CharField(max_length=64)
+    file_name = forms.CharField(max_length=255)
+
+    def __init__(self, import_formats, *args, **kwargs):
+        super().__init__(import_formats, *args, **kwargs)
+        del self.fields["import_file"]
+
+
 class ConfirmImportForm(forms.Form):
     from_index = forms.ChoiceField(label=_("From field"), choices=(),)
     to_index = forms.ChoiceField(label=_("To field"), choices=(),)
@@ -30,7 +46,49 @@ class ConfirmImportForm(forms.Form):
         required=False,
         empty_label=_("All sites"),
     )
+    site_column = forms.ChoiceField(
+        label=_("Site field"),
+        choices=(),
+        required=False,
+        help_text=_(
+            "Column with the hostname (or hostname:port) of the site of each "
+            "redirect, empty values use the site above"
+        ),
+    )
     permanent = forms.BooleanField(initial=True, required=False)
+    resolve_pages = forms.BooleanField(
+        label=_("Link to pages"),
+        required=False,
+        help_text=_(
+            "Link redirects to pages when the target URL is served by a live page, "
+            "so they keep working when the page is moved"
+        ),
+    )
+    verify_targets = forms.BooleanField(
+        label=_("Verify internal targets"),
+        required=False,
+        help_text=_(
+            "Warn about targets on your sites that don't match a live page "
+            "or a redirect"
+        ),
+    )
+    rules = forms.BooleanField(
+        label=_("Import rules"),
+        required=False,
+        help_text=_(
+            "Import rows like /blog/* (prefix), /blog/*/comments (wildcard) or "
+            "^/news/\\d+$ (regular expression) as rules matching every path"
+        ),
+    )
+    sync = forms.BooleanField(
+        label=_("Sync"),
+        required=False,
+        help_text=_(
+            "Make the redirects of the selected site match the file, "
+            "redirects missing from the file will be deleted"
+        ),
+    )
+    sync_confirmed = forms.BooleanField(required=False, widget=forms.HiddenInput())
     import_file_name = forms.CharField(widget=forms.HiddenInput())
     original_file_name = forms.CharField(widget=forms.HiddenInput())
     input_format = forms.CharField(widget=forms.HiddenInput())
@@ -46,8 +104,39 @@ class ConfirmImportForm(forms.Form):
 
         self.fields["from_index"].choices = choices
         self.fields["to_index"].choices = choices
+        self.fields["site_column"].choices = [("", "---")] + [
+            [str(i), f] for i, f in enumerate(headers)
+        ]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("sync") and cleaned_data.get("site_column"):
+            raise forms.ValidationError(_("Sync can not be combined with a site field"))
+        if cleaned_data.get("sync") and cleaned_data.get("rules"):
+            raise forms.ValidationError(_("Sync can not be combined with rules"))
+        if cleaned_data.get("sync") and cleaned_data.get("resolve_pages"):
+            raise forms.ValidationError(
+                _("Sync can not be combined with linking to pages")
+            )
+        if cleaned_data.get("sync") and cleaned_data.get("verify_targets"):
+            raise forms.ValidationError(
+                _("Sync can not be combined with verifying targets")
+            )
+        return cleaned_data
 
     def clean_import_file_name(self):
         data = self.cleaned_data["import_file_name"]
         data = os.path.basename(data)
         return data
+
+
+class ExportForm(forms.Form):
+    format = forms.ChoiceField(
+        label=_("Format"), choices=[(key, key) for key in EXPORTERS],
+    )
+    site = forms.ModelChoiceField(
+        label=_("Site"),
+        queryset=Site.objects.all(),
+        required=False,
+        empty_label=_("All sites"),
+    )
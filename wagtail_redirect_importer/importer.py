@@ -0,0 +1,633 @@
+import sqlite3
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from itertools import islice
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.core.exceptions import NON_FIELD_ERRORS
+from django.db import DatabaseError, transaction
+from django.forms.utils import ErrorDict, ErrorList
+from django.utils.translation import gettext as _
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.core.models import Page, Site
+
+from .lookup import defer_invalidation
+from .signals import redirects_imported
+from .utils import get_read_database, iter_read_only
+
+
+DEFAULT_DISK_INDEX_THRESHOLD = 1000000
+
+
+class ExistingRedirectIndex:
+    """
+    Normalised old_paths of existing redirects, loaded once per site and
+    shared by everything imported in one run, so duplicates are found
+    across files without a query per row.
+
+    The paths are kept in memory until there are more than max_paths of
+    them, then they are moved to a DiskPathSet.
+    """
+
+    def __init__(self, chunk_size=2000, max_paths=None):
+        if max_paths is None:
+            max_paths = getattr(
+                settings,
+                "WAGTAIL_REDIRECT_IMPORTER_DISK_INDEX_THRESHOLD",
+                DEFAULT_DISK_INDEX_THRESHOLD,
+            )
+
+        self.chunk_size = chunk_size
+        self.max_paths = max_paths
+        self.paths = {}
+        self.count = 0
+        self.loaded = set()
+        self.disk = None
+
+    def load(self, key):
+        if key is not None:
+            queryset = Redirect.objects.filter(site_id=key)
+        else:
+            queryset = Redirect.objects.filter(site__isnull=True)
+        queryset = queryset.using(get_read_database())
+
+        paths = queryset.values_list("old_path", flat=True).iterator(
+            chunk_size=self.chunk_size
+        )
+        self.loaded.add(key)
+
+        if self.disk is None:
+            self.paths[key] = loaded = set()
+            for path in paths:
+                loaded.add(path)
+                self.count += 1
+                if self.count > self.max_paths:
+                    self.move_to_disk()
+                    break
+            else:
+                return
+
+        # Whatever the iterator has left goes straight to disk
+        self.disk.update(key, paths)
+
+    def move_to_disk(self):
+        self.disk = DiskPathSet()
+        for key, paths in self.paths.items():
+            self.disk.update(key, paths)
+        self.paths = {}
+
+    def contains(self, site, old_path):
+        key = site.pk if site else None
+        if key not in self.loaded:
+            self.load(key)
+
+        if self.disk is not None:
+            return self.disk.contains(key, old_path)
+        return old_path in self.paths[key]
+
+    def add(self, site, old_path):
+        if self.contains(site, old_path):
+            return
+
+        key = site.pk if site else None
+        if self.disk is not None:
+            self.disk.add(key, old_path)
+            return
+
+        self.paths[key].add(old_path)
+        self.count += 1
+        if self.count > self.max_paths:
+            self.move_to_disk()
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+
+class DiskPathSet:
+    """
+    Set of (site id, path) pairs in a temporary sqlite database, which is
+    deleted when it's closed. Memory use is bounded by the sqlite page
+    cache, however many paths are added.
+    """
+
+    def __init__(self, cache_size_kb=16384, chunk_size=10000):
+        self.chunk_size = chunk_size
+        # An empty name creates a private database in a temporary file
+        self.connection = sqlite3.connect("", isolation_level=None)
+        self.connection.execute("PRAGMA cache_size = -{}".format(cache_size_kb))
+        self.connection.execute("PRAGMA journal_mode = OFF")
+        self.connection.execute("PRAGMA synchronous = OFF")
+        self.connection.execute(
+            "CREATE TABLE paths (site_id INTEGER NOT NULL, path TEXT NOT NULL, "
+            "PRIMARY KEY (site_id, path)) WITHOUT ROWID"
+        )
+
+    def contains(self, key, path):
+        cursor = self.connection.execute(
+            "SELECT 1 FROM paths WHERE site_id = ? AND path = ?",
+            (get_disk_key(key), path),
+        )
+        return cursor.fetchone() is not None
+
+    def add(self, key, path):
+        self.connection.execute(
+            "INSERT OR IGNORE INTO paths VALUES (?, ?)", (get_disk_key(key), path)
+        )
+
+    def update(self, key, paths):
+        key = get_disk_key(key)
+        paths = iter(paths)
+        while True:
+            chunk = [(key, path) for path in islice(paths, self.chunk_size)]
+            if not chunk:
+                break
+
+            self.connection.execute("BEGIN")
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO paths VALUES (?, ?)", chunk
+            )
+            self.connection.execute("COMMIT")
+
+    def close(self):
+        self.connection.close()
+
+
+def get_disk_key(key):
+    # Site ids start at 1, 0 stands for redirects without a site
+    return 0 if key is None else key
+
+
+COMMIT_ROW = "row"
+COMMIT_BATCH = "batch"
+COMMIT_FILE = "file"
+COMMIT_CHOICES = (COMMIT_ROW, COMMIT_BATCH, COMMIT_FILE)
+
+
+UPDATE_FIELDS = ["redirect_link", "redirect_page", "is_permanent"]
+
+
+class RedirectWriter:
+    """
+    Saves imported redirects, and updates the existing redirects of changed
+    rows, and sends redirects_imported once per batch. In bulk mode a batch
+    is written with bulk_create and bulk_update, so no post_save signals
+    are sent for the redirects.
+
+    The commit mode sets the transactions: "row" commits every redirect
+    (or bulk_create) on its own, "batch" commits once per batch and "file"
+    once when the writer is closed. Redirects that fail to save are rolled
+    back to a savepoint, in bulk mode by bisecting the batch, and collected
+    in failed as (row, error) without failing the rest of the batch.
+
+    A Throttle limits how fast redirects are written and is told how long
+    every commit took.
+
+    Use the writer as a context manager, which flushes the last batch.
+    """
+
+    def __init__(self, bulk=False, batch_size=500, commit=COMMIT_ROW, throttle=None):
+        if commit not in COMMIT_CHOICES:
+            raise ValueError("Unknown commit mode '{}'".format(commit))
+
+        self.bulk = bulk
+        self.batch_size = batch_size
+        self.commit = commit
+        self.pending = []
+        self.updates = []
+        self.failed = []
+        self.deferred = []
+        self.throttle = throttle
+        self.row_time = 0
+
+    def __enter__(self):
+        self.stack = ExitStack()
+        self.stack.enter_context(defer_invalidation())
+        if self.commit == COMMIT_FILE:
+            self.stack.enter_context(transaction.atomic())
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.stack.__exit__(exc_type, exc_value, traceback)
+            return
+
+        with self.stack:
+            self.flush()
+
+        # Receivers are only told about redirects once they are committed
+        deferred, self.deferred = self.deferred, []
+        for created, updated in deferred:
+            self.send(created, updated)
+
+    def add(self, redirect, row=None):
+        """
+        Queues redirect for saving, row is returned with errors in failed.
+        """
+        if self.throttle is not None:
+            self.throttle.acquire()
+
+        if not self.bulk and self.commit == COMMIT_ROW:
+            started = time.monotonic()
+            saved = self.save(redirect, row)
+            self.row_time += time.monotonic() - started
+            if not saved:
+                return
+
+        self.pending.append((redirect, row))
+        if len(self.pending) + len(self.updates) >= self.batch_size:
+            self.flush()
+
+    def update(self, redirect, row=None):
+        """
+        Queues an update of the existing redirect with the site and old_path
+        of redirect, an unsaved Redirect with the new values.
+        """
+        if self.throttle is not None:
+            self.throttle.acquire()
+
+        if not self.bulk and self.commit == COMMIT_ROW:
+            started = time.monotonic()
+            saved = self.resolve_updates([(redirect, row)]) and self.save(
+                redirect, row, UPDATE_FIELDS
+            )
+            self.row_time += time.monotonic() - started
+            if not saved:
+                return
+
+        self.updates.append((redirect, row))
+        if len(self.pending) + len(self.updates) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending and not self.updates:
+            return
+
+        batch, self.pending = self.pending, []
+        updates, self.updates = self.updates, []
+        started = time.monotonic()
+        if self.bulk:
+            with transaction.atomic():
+                saved = self.bulk_write(batch, Redirect.objects.bulk_create)
+                updated = self.bulk_write(
+                    self.resolve_updates(updates),
+                    lambda redirects: Redirect.objects.bulk_update(
+                        redirects, UPDATE_FIELDS
+                    ),
+                )
+        elif self.commit == COMMIT_ROW:
+            saved = [redirect for redirect, row in batch]
+            updated = [redirect for redirect, row in updates]
+        else:
+            with transaction.atomic():
+                saved = [
+                    redirect for redirect, row in batch if self.save(redirect, row)
+                ]
+                updated = [
+                    redirect
+                    for redirect, row in self.resolve_updates(updates)
+                    if self.save(redirect, row, UPDATE_FIELDS)
+                ]
+
+        count = len(batch) + len(updates)
+        if self.throttle is not None:
+            if self.bulk or self.commit != COMMIT_ROW:
+                self.throttle.record_commit(time.monotonic() - started, count)
+            else:
+                self.throttle.record_commit(self.row_time, count, count)
+        self.row_time = 0
+
+        if not saved and not updated:
+            return
+
+        ids = (get_redirect_ids(saved) if saved else [], [r.pk for r in updated])
+        if self.commit == COMMIT_FILE:
+            self.deferred.append(ids)
+        else:
+            self.send(*ids)
+
+    def save(self, redirect, row, update_fields=None):
+        try:
+            with transaction.atomic():
+                redirect.save(update_fields=update_fields)
+        except DatabaseError as e:
+            self.failed.append((row, get_save_error(e)))
+            return False
+        return True
+
+    def resolve_updates(self, updates):
+        """
+        Sets the pk of the redirect to update on the queued updates, with
+        one query per site. Updates of redirects that no longer exist are
+        moved to failed.
+        """
+        paths_by_site = defaultdict(set)
+        for redirect, row in updates:
+            paths_by_site[redirect.site_id].add(redirect.old_path)
+
+        pks = {}
+        for site_id, paths in paths_by_site.items():
+            # Paths aren't unique for redirects without a site, the oldest
+            # redirect is updated
+            existing = Redirect.objects.filter(
+                site_id=site_id, old_path__in=paths
+            ).order_by("-pk")
+            for old_path, pk in existing.values_list("old_path", "pk"):
+                pks[(site_id, old_path)] = pk
+
+        resolved = []
+        for redirect, row in updates:
+            redirect.pk = pks.get((redirect.site_id, redirect.old_path))
+            if redirect.pk is None:
+                self.failed.append((row, _("The redirect no longer exists.")))
+            else:
+                resolved.append((redirect, row))
+        return resolved
+
+    def bulk_write(self, batch, write):
+        """
+        Writes batch with write, splitting it in halves until the failing
+        rows are found if it can't be written at once. Returns the saved
+        redirects.
+        """
+        if not batch:
+            return []
+
+        redirects = [redirect for redirect, row in batch]
+        try:
+            with transaction.atomic():
+                write(redirects)
+            return redirects
+        except DatabaseError as e:
+            if len(batch) == 1:
+                self.failed.append((batch[0][1], get_save_error(e)))
+                return []
+
+        middle = len(batch) // 2
+        return self.bulk_write(batch[:middle], write) + self.bulk_write(
+            batch[middle:], write
+        )
+
+    def send(self, created, updated=()):
+        redirects_imported.send(
+            sender=Redirect, created=created, updated=list(updated), deleted=[]
+        )
+
+
+class SiteResolver:
+    """
+    Maps "hostname" or "hostname:port" values to sites, using a dict of all
+    sites loaded once instead of a query per row. A bare hostname matches
+    the site on port 80, or the only site with that hostname.
+    """
+
+    def __init__(self, default=None):
+        self.default = default
+        self.default_site = None
+        self.sites = {}
+
+        by_hostname = {}
+        for site in iter_read_only(Site.objects.all()):
+            hostname = site.hostname.lower()
+            self.sites["{}:{}".format(hostname, site.port)] = site
+            if site.is_default_site:
+                self.default_site = site
+            by_hostname.setdefault(hostname, []).append(site)
+
+        for hostname, sites in by_hostname.items():
+            if len(sites) == 1:
+                self.sites[hostname] = sites[0]
+            else:
+                for site in sites:
+                    if site.port == 80:
+                        self.sites[hostname] = site
+
+    def resolve(self, value):
+        """
+        Returns (site, error), empty values resolve to the default site.
+        """
+        if value is None:
+            return self.default, None
+
+        value = str(value).strip().lower()
+        if not value:
+            return self.default, None
+
+        try:
+            return self.sites[value], None
+        except KeyError:
+            return (
+                None,
+                format_error("site", _("Unknown site '%(site)s'") % {"site": value}),
+            )
+
+
+def parse_permanent(value, default):
+    """
+    Returns (is_permanent, error) for a value of a permanent column, like
+    the True/False written by the exporters. Empty values use default.
+    """
+    if value is None:
+        return default, None
+    if isinstance(value, bool):
+        return value, None
+
+    value = str(value).strip().lower()
+    if not value:
+        return default, None
+    if value in ("true", "1", "yes"):
+        return True, None
+    if value in ("false", "0", "no"):
+        return False, None
+
+    return (
+        None,
+        format_error(
+            "permanent", _("Invalid permanent value '%(value)s'") % {"value": value}
+        ),
+    )
+
+
+class PageUrlIndex:
+    """
+    Maps (site id, path) to the id of the live page served there, for all
+    live pages on all sites. Built once per import so target URLs can be
+    resolved to pages without a query per row.
+    """
+
+    def __init__(self, site_resolver=None, chunk_size=2000):
+        if site_resolver is None:
+            site_resolver = SiteResolver()
+        self.site_resolver = site_resolver
+        self.pages = {}
+
+        sites_by_root_path = {}
+        sites = Site.objects.using(get_read_database()).values_list(
+            "pk", "root_page__url_path"
+        )
+        for site_id, root_path in sites:
+            sites_by_root_path.setdefault(root_path, []).append(site_id)
+
+        pages = (
+            Page.objects.using(get_read_database()).live().values_list("pk", "url_path")
+        )
+        for page_id, url_path in pages.iterator(chunk_size=chunk_size):
+            # Check every ancestor path of the page for a site root
+            end = 0
+            while True:
+                end = url_path.find("/", end) + 1
+                if not end:
+                    break
+
+                root_path = url_path[:end]
+                for site_id in sites_by_root_path.get(root_path, []):
+                    path = normalise_page_path(url_path[end - 1 :])
+                    self.pages[(site_id, path)] = page_id
+
+    def resolve(self, url, site=None):
+        """
+        Returns the id of the live page url points to, or None. Relative
+        urls are resolved against site, or the default site.
+        """
+        if not isinstance(url, str):
+            return None
+
+        url = urlparse(url.strip())
+        if url.params or url.query or url.fragment:
+            return None
+
+        if url.netloc:
+            site = self.resolve_site(url)
+        elif site is None:
+            site = self.site_resolver.default_site
+
+        if site is None:
+            return None
+
+        return self.pages.get((site.pk, normalise_page_path(unquote(url.path))))
+
+    def resolve_site(self, url):
+        if url.scheme not in ("http", "https"):
+            return None
+
+        try:
+            port = url.port
+        except ValueError:
+            return None
+
+        sites = self.site_resolver.sites
+        hostname = (url.hostname or "").lower()
+        if port:
+            return sites.get("{}:{}".format(hostname, port))
+
+        default_port = 443 if url.scheme == "https" else 80
+        return sites.get("{}:{}".format(hostname, default_port), sites.get(hostname))
+
+
+class InternalTargetChecker:
+    """
+    Checks that links to one of the sites point to a live page or to a
+    redirect, using the PageUrlIndex and ExistingRedirectIndex snapshots
+    instead of routing every link.
+    """
+
+    def __init__(self, page_index, redirect_index):
+        self.page_index = page_index
+        self.redirect_index = redirect_index
+
+    def check(self, link):
+        """
+        Returns a warning if link points to a site but doesn't resolve,
+        otherwise None.
+        """
+        if not isinstance(link, str):
+            return None
+
+        url = urlparse(link.strip())
+        if not url.netloc:
+            return None
+
+        site = self.page_index.resolve_site(url)
+        if site is None:
+            return None
+
+        path = normalise_page_path(unquote(url.path))
+        if (site.pk, path) in self.page_index.pages:
+            return None
+
+        old_paths = {Redirect.normalise_path(link), Redirect.normalise_path(path)}
+        for old_path in old_paths:
+            if self.redirect_index.contains(site, old_path):
+                return None
+            if self.redirect_index.contains(None, old_path):
+                return None
+
+        return _("Target does not match a live page or redirect")
+
+
+def get_redirect_ids(redirects, chunk_size=500):
+    """
+    Returns the ids of saved redirects, looking them up by site and path
+    on databases where bulk_create does not set them.
+    """
+    if all(redirect.pk for redirect in redirects):
+        return [redirect.pk for redirect in redirects]
+
+    keys = {(redirect.site_id, redirect.old_path) for redirect in redirects}
+    paths = sorted({old_path for _site_id, old_path in keys})
+
+    ids = []
+    for offset in range(0, len(paths), chunk_size):
+        rows = Redirect.objects.filter(
+            old_path__in=paths[offset : offset + chunk_size]
+        ).values_list("pk", "site_id", "old_path")
+        ids.extend(pk for pk, site_id, old_path in rows if (site_id, old_path) in keys)
+
+    return ids
+
+
+def normalise_page_path(path):
+    if not path.startswith("/"):
+        path = "/" + path
+    if len(path) > 1 and path.endswith("/"):
+        path = path[:-1]
+    return path
+
+
+def get_duplicate_message(site):
+    """
+    Returns the message RedirectForm reports for an already existing path.
+    """
+    if site is None:
+        return _("A redirect with this path already exists.")
+
+    return Redirect(site=site).unique_error_message(Redirect, ("old_path", "site"))
+
+
+def get_duplicate_error(site):
+    return format_error(NON_FIELD_ERRORS, get_duplicate_message(site))
+
+
+def get_save_error(error):
+    return format_error(
+        NON_FIELD_ERRORS,
+        _("The redirect could not be saved (%(error)s)") % {"error": error},
+    )
+
+
+def format_error(field, message):
+    """
+    Formats an error the same way as form.errors.as_text() on one line.
+    """
+    return format_errors([(field, [message])])
+
+
+def format_errors(errors):
+    """
+    Formats (field, messages) pairs the same way as form.errors.as_text()
+    on one line.
+    """
+    errors = ErrorDict((field, ErrorList(messages)) for field, messages in errors)
+    return errors.as_text().replace("\n", "")
@@ -0,0 +1,96 @@
+import hashlib
+import json
+from collections import defaultdict
+
+from .models import ImportedFile, ImportedRow
+from .utils import get_read_database
+
+
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+
+def get_row_hash(site, old_path, redirect_link, is_permanent, page_id=None):
+    row = [site.pk if site else None, old_path, redirect_link, is_permanent, page_id]
+    return hashlib.sha1(json.dumps(row).encode("utf-8")).hexdigest()
+
+
+def get_file_hash(paths, options, chunk_size=65536):
+    """
+    Hash of the contents of the source files, in order, and the options
+    that change what is imported from them. Paths are left out, so a file
+    is recognised wherever it is imported from.
+    """
+    file_hash = hashlib.sha256(json.dumps(options, sort_keys=True).encode("utf-8"))
+    for path in paths:
+        content_hash = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(chunk_size), b""):
+                content_hash.update(chunk)
+        file_hash.update(content_hash.digest())
+    return file_hash.hexdigest()
+
+
+def is_file_imported(file_hash):
+    return ImportedFile.objects.filter(file_hash=file_hash).exists()
+
+
+def record_file(file_hash):
+    ImportedFile.objects.get_or_create(file_hash=file_hash)
+
+
+class RowHashIndex:
+    """
+    Hashes of previously imported rows by (site id, old_path), loaded once
+    per import. Each path is only matched once, so a path repeated in the
+    file is checked for duplicates like any other new row.
+    """
+
+    def __init__(self, chunk_size=2000):
+        rows = ImportedRow.objects.using(get_read_database()).values_list(
+            "site_id", "old_path", "row_hash"
+        )
+        self.hashes = {
+            (site_id, old_path): row_hash
+            for site_id, old_path, row_hash in rows.iterator(chunk_size=chunk_size)
+        }
+        self.pending = {}
+
+    def get_status(self, site, old_path, row_hash, redirect_index):
+        """
+        Returns UNCHANGED or CHANGED for imported rows whose redirect still
+        exists, NEW otherwise.
+        """
+        previous = self.hashes.pop((site.pk if site else None, old_path), None)
+        if previous is None or not redirect_index.contains(site, old_path):
+            return NEW
+        if previous == row_hash:
+            return UNCHANGED
+        return CHANGED
+
+    def record(self, number, site, old_path, row_hash):
+        self.pending[number] = (site.pk if site else None, old_path, row_hash)
+
+    def discard(self, number):
+        self.pending.pop(number, None)
+
+    def save(self, batch_size=500):
+        paths_by_site = defaultdict(list)
+        for site_id, old_path, row_hash in self.pending.values():
+            paths_by_site[site_id].append(old_path)
+
+        for site_id, paths in paths_by_site.items():
+            for start in range(0, len(paths), batch_size):
+                ImportedRow.objects.filter(
+                    site_id=site_id, old_path__in=paths[start : start + batch_size]
+                ).delete()
+
+        ImportedRow.objects.bulk_create(
+            [
+                ImportedRow(site_id=site_id, old_path=old_path, row_hash=row_hash)
+                for site_id, old_path, row_hash in self.pending.values()
+            ],
+            batch_size=batch_size,
+        )
+        self.pending = {}
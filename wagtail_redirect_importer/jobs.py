@@ -0,0 +1,85 @@
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ImportJob
+
+
+logger = logging.getLogger(__name__)
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+def start_job(job, target, *args):
+    """
+    Runs target(*args, job=job) in a background thread, or right away with
+    the WAGTAIL_REDIRECT_IMPORTER_RUN_JOBS_INLINE setting. target returns
+    the summary of the import. The thread starts once the transaction the
+    job was created in commits, so it can load the job.
+    """
+    if getattr(settings, "WAGTAIL_REDIRECT_IMPORTER_RUN_JOBS_INLINE", False):
+        run_job(job.pk, target, args)
+        return
+
+    thread = threading.Thread(
+        target=run_job, args=(job.pk, target, args, True), daemon=True
+    )
+    transaction.on_commit(thread.start)
+
+
+def run_job(job_id, target, args, close_connection=False):
+    try:
+        _run_job(job_id, target, args)
+    finally:
+        # Threads get their own connection, which Django won't close
+        if close_connection:
+            connection.close()
+
+
+def _run_job(job_id, target, args):
+    job = ImportJob.objects.get(pk=job_id)
+    job.status = ImportJob.RUNNING
+    job.save(update_fields=["status"])
+
+    try:
+        summary = target(*args, job=job)
+    except Exception as e:
+        logger.exception("Import job %s failed", job_id)
+        job.status = ImportJob.FAILED
+        summary = {"error": str(e)}
+    else:
+        if summary.get("cancelled"):
+            job.status = ImportJob.CANCELLED
+        else:
+            job.status = ImportJob.COMPLETED
+        job.processed = summary["total"]
+        job.successes = summary["successes"]
+        job.errors_count = summary["errors_count"]
+
+    job.finished_at = timezone.now()
+    try:
+        # Cells from xlsx files can be dates and other non-JSON values
+        job.summary = json.dumps(summary, default=str)
+        job.save(
+            update_fields=[
+                "status",
+                "processed",
+                "successes",
+                "errors_count",
+                "summary",
+                "finished_at",
+            ]
+        )
+    except Exception as e:
+        logger.exception("Saving the result of import job %s failed", job_id)
+        ImportJob.objects.filter(pk=job_id).update(
+            status=ImportJob.FAILED,
+            summary=json.dumps({"error": str(e)}),
+            finished_at=job.finished_at,
+        )
@@ -0,0 +1,155 @@
+import threading
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from wagtail.contrib.redirects.models import Redirect
+
+from .models import RedirectRule
+from .rules import RuleMatcher
+
+
+VERSION_CACHE_KEY = "wagtail-redirect-importer-lookup-version"
+
+
+def get_version_cache():
+    return caches[
+        getattr(settings, "WAGTAIL_REDIRECT_IMPORTER_LOOKUP_CACHE", "default")
+    ]
+
+
+def get_version():
+    cache = get_version_cache()
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_CACHE_KEY)
+    return version
+
+
+_invalidation = threading.local()
+
+
+def bump_version():
+    """
+    Makes every process rebuild its lookup tables on the next lookup.
+    """
+    _invalidation.pending = False
+    get_version_cache().set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+def request_invalidation():
+    """
+    Bumps the version, or inside defer_invalidation marks it to be bumped
+    once when the block exits.
+    """
+    if getattr(_invalidation, "depth", 0):
+        _invalidation.pending = True
+    else:
+        bump_version()
+
+
+@contextmanager
+def defer_invalidation():
+    """
+    Collects the invalidations requested by the saves and deletes in the
+    block, so importing N rows doesn't bump the version N times. Any bump
+    in the block, like the one for redirects_imported after every batch,
+    takes care of the ones requested before it.
+    """
+    depth = getattr(_invalidation, "depth", 0)
+    _invalidation.depth = depth + 1
+    try:
+        yield
+    finally:
+        _invalidation.depth = depth
+        if not depth and getattr(_invalidation, "pending", False):
+            bump_version()
+
+
+class RedirectLookup:
+    """
+    Maps old_path to the redirect id, one dict per site (and one for the
+    redirects without a site), and compiles a RuleMatcher per site, built on
+    first use. Both are dropped when the version in the cache changes, so a
+    404 costs a cache read instead of a database query.
+    """
+
+    def __init__(self, chunk_size=2000):
+        self.chunk_size = chunk_size
+        self.version = None
+        self.tables = {}
+        self.matchers = {}
+        self.lock = threading.Lock()
+
+    def get_table(self, site_id):
+        try:
+            return self.tables[site_id]
+        except KeyError:
+            pass
+
+        with self.lock:
+            if site_id not in self.tables:
+                queryset = Redirect.objects.filter(site_id=site_id)
+                self.tables[site_id] = dict(
+                    queryset.values_list("old_path", "pk").iterator(
+                        chunk_size=self.chunk_size
+                    )
+                )
+            return self.tables[site_id]
+
+    def get_matcher(self, site_id):
+        try:
+            return self.matchers[site_id]
+        except KeyError:
+            pass
+
+        with self.lock:
+            if site_id not in self.matchers:
+                rules = RedirectRule.objects.filter(site_id=site_id).order_by("pk")
+                self.matchers[site_id] = RuleMatcher(
+                    rules.values_list(
+                        "match_type", "pattern", "redirect_link", "is_permanent"
+                    )
+                )
+            return self.matchers[site_id]
+
+    def check_version(self):
+        version = get_version()
+        if version != self.version:
+            with self.lock:
+                self.tables = {}
+                self.matchers = {}
+                self.version = version
+
+    def get(self, site, path):
+        """
+        Returns the id of the redirect for path, preferring the redirects
+        of site over the ones without a site, or None.
+        """
+        self.check_version()
+
+        if site is not None:
+            pk = self.get_table(site.pk).get(path)
+            if pk is not None:
+                return pk
+
+        return self.get_table(None).get(path)
+
+    def match_rule(self, site, path):
+        """
+        Returns (redirect_link, is_permanent) of the first rule matching
+        path, preferring the rules of site, or None.
+        """
+        self.check_version()
+
+        if site is not None:
+            target = self.get_matcher(site.pk).match(path)
+            if target is not None:
+                return target
+
+        return self.get_matcher(None).match(path)
+
+
+lookup = RedirectLookup()
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from ...utils import cleanup_tmp_storage
+
+
+class Command(BaseCommand):
+    help = "Removes abandoned redirect import files from temporary storage"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max_age", help="Remove files older than this many seconds", type=int,
+        )
+        parser.add_argument(
+            "--max_size",
+            help="Remove the oldest files until the total size is below this many bytes",
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        removed = cleanup_tmp_storage(
+            max_age=options["max_age"], max_size=options["max_size"],
+        )
+
+        if options["verbosity"] > 1:
+            for path in removed:
+                self.stdout.write("Removed: {}".format(path))
+
+        self.stdout.write("Removed {} files".format(len(removed)))
@@ -0,0 +1,80 @@
+import os
+
+from django.core.management.base import BaseCommand
+from wagtail.core.models import Site
+
+from ...exporters import (
+    DEFAULT_CHUNK_SIZE,
+    EXPORTERS,
+    get_redirect_queryset,
+    iter_redirect_rows,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports redirects to .csv, .tsv, .jsonl or .xlsx, import them again with "
+        "import_redirects --permanent_column 2 --site_column 3 --resolve_pages True"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dst", help="Path to file, writes to stdout if omitted", type=str,
+        )
+        parser.add_argument(
+            "--format",
+            help="Destination file format (.csv, .xlsx etc)",
+            choices=list(EXPORTERS),
+            type=str,
+        )
+        parser.add_argument(
+            "--site_id", help="Only export redirects from this site", type=int,
+        )
+        parser.add_argument(
+            "--chunk_size",
+            help="Number of redirects to fetch from the database at a time",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        dst = options["dst"]
+        format_ = options["format"]
+        site_id = options["site_id"]
+        site = None
+
+        if site_id:
+            site = Site.objects.get(id=site_id)
+
+        if not format_ and dst:
+            _, extension = os.path.splitext(dst)
+            format_ = extension.lstrip(".")
+
+        if not format_:
+            format_ = "csv"
+
+        if format_ not in EXPORTERS:
+            raise Exception("Invalid format '{}'".format(format_))
+
+        exporter_class = EXPORTERS[format_]
+        rows = iter_redirect_rows(
+            get_redirect_queryset(site), chunk_size=options["chunk_size"]
+        )
+        exporter = exporter_class(rows)
+
+        if not dst:
+            if exporter_class.is_binary:
+                raise Exception("Format '{}' requires --dst".format(format_))
+
+            for chunk in exporter:
+                self.stdout.write(chunk, ending="")
+            return
+
+        if exporter_class.is_binary:
+            fh = open(dst, "wb")
+        else:
+            fh = open(dst, "w", encoding="utf-8", newline="")
+
+        with fh:
+            for chunk in exporter:
+                fh.write(chunk)
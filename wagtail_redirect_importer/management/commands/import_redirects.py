@@ -1,18 +1,59 @@
+import csv
+import glob
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from itertools import islice
 
 import tablib
 from tablib.formats import registry
-from django.core.management.base import BaseCommand
-from wagtail.contrib.redirects.forms import RedirectForm
+from django.core.management.base import BaseCommand, CommandError
+from wagtail.contrib.redirects.models import Redirect
 from wagtail.core.models import Site
 
+from ...importer import (
+    COMMIT_CHOICES,
+    COMMIT_ROW,
+    get_duplicate_error,
+    InternalTargetChecker,
+    PageUrlIndex,
+    RedirectWriter,
+    SiteResolver,
+    parse_permanent,
+)
+from ...incremental import (
+    CHANGED,
+    UNCHANGED,
+    RowHashIndex,
+    get_file_hash,
+    get_row_hash,
+    is_file_imported,
+    record_file,
+)
+from ...plans import apply_plan, write_plan
+from ...progress import ProgressReporter
+from ...rules import parse_rule
+from ...sync import apply_sync_diff, sync_redirects
+from ...targets import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_TIMEOUT,
+    TargetChecker,
+    get_external_targets,
+)
+from ...throttle import Throttle
+from ...validation import RedirectValidator
+
 
 class Command(BaseCommand):
     help = "Imports redirects from .csv, .xls, .xlsx"
 
     def add_arguments(self, parser):
         parser.add_argument(
-            "--src", help="Path to file", type=str, required=True,
+            "--src",
+            help="Paths to files, directories or glob patterns",
+            type=str,
+            nargs="+",
         )
         parser.add_argument(
             "--site_id", help="The site where redirects will be associated", type=int,
@@ -32,6 +73,91 @@ class Command(BaseCommand):
         parser.add_argument(
             "--to_index", help="The column where to read to link", default=1, type=int,
         )
+        parser.add_argument(
+            "--site_column",
+            help="The column with the hostname (or hostname:port) of the site of each redirect",
+            type=int,
+        )
+        parser.add_argument(
+            "--permanent_column",
+            help="The column with True or False for each redirect, empty values use --permanent",
+            type=int,
+        )
+        parser.add_argument(
+            "--resolve_pages",
+            help="Link redirects to pages when the target URL is served by a live page",
+            default=False,
+            type=bool,
+        )
+        parser.add_argument(
+            "--rules",
+            help="Import rows like /blog/*, /blog/*/comments or ^/news/\\d+$ as redirect rules",
+            default=False,
+            type=bool,
+        )
+        parser.add_argument(
+            "--check_targets",
+            help="Check that external targets respond before importing",
+            default=False,
+            type=bool,
+        )
+        parser.add_argument(
+            "--check_concurrency",
+            help="Number of targets to check at once",
+            type=int,
+            default=DEFAULT_CONCURRENCY,
+        )
+        parser.add_argument(
+            "--check_timeout",
+            help="Seconds to wait for a target to respond",
+            type=float,
+            default=DEFAULT_TIMEOUT,
+        )
+        parser.add_argument(
+            "--verify_targets",
+            help="Warn about targets on the sites that don't match a live page or redirect",
+            default=False,
+            type=bool,
+        )
+        parser.add_argument(
+            "--bulk",
+            help="Insert redirects in batches, without sending post_save for each redirect",
+            default=False,
+            type=bool,
+        )
+        parser.add_argument(
+            "--commit",
+            help="Commit every row, every batch or the whole import at once",
+            choices=COMMIT_CHOICES,
+            type=str,
+            default=COMMIT_ROW,
+        )
+        parser.add_argument(
+            "--batch_size", help="Number of rows per batch", type=int, default=500,
+        )
+        parser.add_argument(
+            "--max_rows_per_second",
+            help="Limit how many redirects are written per second",
+            type=float,
+        )
+        parser.add_argument(
+            "--adaptive_throttle",
+            help="Slow down writes when commits take longer than --max_commit_latency",
+            default=False,
+            type=bool,
+        )
+        parser.add_argument(
+            "--max_commit_latency",
+            help="Seconds a commit may take before the adaptive throttle backs off",
+            type=float,
+            default=0.5,
+        )
+        parser.add_argument(
+            "--incremental",
+            help="Skip files and rows that haven't changed since they were last imported, and update the redirects of changed rows",
+            default=False,
+            type=bool,
+        )
         parser.add_argument(
             "--dry_run",
             default=False,
@@ -41,6 +167,20 @@ class Command(BaseCommand):
         parser.add_argument(
             "--ask", help="Ask before creating", default=False, type=bool,
         )
+        parser.add_argument(
+            "--sync",
+            help="Make the site redirects match the file, deleting redirects missing from it",
+            default=False,
+            type=bool,
+        )
+        parser.add_argument(
+            "--plan",
+            help="Validate the file and write an import plan to this path, without creating redirects",
+            type=str,
+        )
+        parser.add_argument(
+            "--apply", help="Create the redirects from an import plan", type=str,
+        )
 
         available_formats = [key for key in registry._formats]
         parser.add_argument(
@@ -56,8 +196,40 @@ class Command(BaseCommand):
         parser.add_argument(
             "--limit", help="Limit import to num items", type=int, default=-1
         )
+        parser.add_argument(
+            "--error_file",
+            help="Write rows that could not be imported to this csv file",
+            type=str,
+        )
+        parser.add_argument(
+            "--progress_interval",
+            help="Seconds between progress updates",
+            type=float,
+            default=2.0,
+        )
+        parser.add_argument(
+            "--workers",
+            help="Number of files to read in parallel",
+            type=int,
+            default=1,
+        )
 
     def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        self.error_writer = None
+        error_file = options.pop("error_file")
+
+        with ExitStack() as stack:
+            if error_file:
+                fh = stack.enter_context(
+                    open(error_file, "w", encoding="utf-8", newline="")
+                )
+                self.error_writer = csv.writer(fh)
+                self.error_writer.writerow(["row", "from", "to", "error"])
+
+            self.import_redirects(**options)
+
+    def import_redirects(self, **options):
         src = options["src"]
         from_index = options.pop("from_index")
         to_index = options.pop("to_index")
@@ -68,114 +240,483 @@ class Command(BaseCommand):
         ask = options.pop("ask")
         offset = options.pop("offset")
         limit = options.pop("limit")
+        sync = options.pop("sync")
+        plan = options.pop("plan")
+        apply = options.pop("apply")
+        progress_interval = options.pop("progress_interval")
+        workers = options.pop("workers")
+        site_column = options.pop("site_column")
+        permanent_column = options.pop("permanent_column")
+        resolve_pages = options.pop("resolve_pages")
+        rules = options.pop("rules")
+        check_targets = options.pop("check_targets")
+        check_concurrency = options.pop("check_concurrency")
+        check_timeout = options.pop("check_timeout")
+        verify_targets = options.pop("verify_targets")
+        bulk = options.pop("bulk")
+        commit = options.pop("commit")
+        batch_size = options.pop("batch_size")
+        max_rows_per_second = options.pop("max_rows_per_second")
+        adaptive_throttle = options.pop("adaptive_throttle")
+        max_commit_latency = options.pop("max_commit_latency")
+        incremental = options.pop("incremental")
+
+        throttle = None
+        if max_rows_per_second or adaptive_throttle:
+            throttle = Throttle(
+                rate=max_rows_per_second,
+                adaptive=adaptive_throttle,
+                max_latency=max_commit_latency,
+            )
+
+        if apply:
+            created = apply_plan(apply, throttle=throttle)
+            self.stdout.write("Created: {}".format(created))
+            return
+
+        if not src:
+            raise CommandError("One of --src or --apply is required")
+
+        if isinstance(src, str):
+            src = [src]
 
-        errors = []
         successes = 0
         skipped = 0
+        errors = 0
         total = 0
         site = None
 
         if site_id:
             site = Site.objects.get(id=site_id)
 
-        if not os.path.exists(src):
-            raise Exception("Missing file '{0}'".format(src))
+        sources = []
+        for path in get_source_paths(src):
+            if not os.path.getsize(path) > 0:
+                raise Exception("File '{0}' is empty".format(path))
+
+            sources.append((path, get_source_format(path, format_)))
+
+        if sync and (offset != -1 or limit != -1):
+            raise Exception("Sync can not be combined with offset or limit")
+
+        if site_column is not None and (sync or plan):
+            raise Exception("Site column can not be combined with sync or plan")
+
+        if permanent_column is not None and (sync or plan):
+            raise Exception("Permanent column can not be combined with sync or plan")
+
+        if resolve_pages and (sync or plan):
+            raise Exception("Resolve pages can not be combined with sync or plan")
+
+        if rules and (sync or plan):
+            raise Exception("Rules can not be combined with sync or plan")
+
+        if verify_targets and (sync or plan):
+            raise Exception("Verify targets can not be combined with sync or plan")
+
+        if incremental and (sync or plan or rules):
+            raise Exception("Incremental can not be combined with sync, plan or rules")
+
+        file_hash = None
+        if incremental:
+            file_hash = get_file_hash(
+                [path for path, _ in sources],
+                {
+                    "site_id": site.pk if site else None,
+                    "permanent": permament,
+                    "from_index": from_index,
+                    "to_index": to_index,
+                    "site_column": site_column,
+                    "permanent_column": permanent_column,
+                    "resolve_pages": resolve_pages,
+                    "offset": offset,
+                    "limit": limit,
+                    "formats": [source_format for _, source_format in sources],
+                },
+            )
+            if is_file_imported(file_hash):
+                self.stdout.write("Unchanged since the last import, skipping")
+                return
 
-        if not os.path.getsize(src) > 0:
-            raise Exception("File '{0}' is empty".format(src))
+        datasets = self.iter_datasets(sources, workers, offset, limit)
 
-        _, extension = os.path.splitext(src)
-        extension = extension.lstrip(".")
-        available_formats = [key for key in registry._formats]
+        if check_targets:
+            # Every file is needed to report dead targets before importing
+            datasets = list(datasets)
+            links = (
+                row[to_index] for _, imported_data in datasets for row in imported_data
+            )
+            self.check_targets(links, check_concurrency, check_timeout)
+
+        if sync or plan:
+            rows = (
+                (row[from_index], row[to_index])
+                for _, imported_data in datasets
+                for row in imported_data
+            )
+            if sync:
+                self.handle_sync(rows, site, permament, dry_run, ask)
+            else:
+                self.handle_plan(plan, rows, site, permament)
+            return
+
+        # Shared by all files so duplicates are found across them
+        validator = RedirectValidator()
+        writer = RedirectWriter(
+            bulk=bulk, batch_size=batch_size, commit=commit, throttle=throttle
+        )
 
-        if not format_ and extension not in available_formats:
-            raise Exception("Invalid format '{}'".format(extension))
+        site_resolver = None
+        if site_column is not None:
+            site_resolver = SiteResolver(default=site)
+
+        page_index = None
+        if resolve_pages or verify_targets:
+            page_index = PageUrlIndex(site_resolver)
+
+        target_checker = None
+        if verify_targets:
+            target_checker = InternalTargetChecker(page_index, validator.index)
+
+        # Targets may be imported further down, so these are checked again
+        unverified = []
+        warnings = 0
+
+        row_hashes = None
+        if incremental:
+            row_hashes = RowHashIndex()
+        unchanged = 0
+        updated = 0
+        updated_rows = set()
+
+        # Progress updates would get mixed up with the questions
+        if ask or self.verbosity < 1:
+            progress_interval = None
+
+        with writer:
+            for path, imported_data in datasets:
+                self.stdout.write("Importing redirects:")
+
+                progress = ProgressReporter(
+                    self.stdout, total=len(imported_data), interval=progress_interval
+                )
+                for row in progress.track(imported_data):
+                    total += 1
+
+                    from_link = row[from_index]
+                    to_link = row[to_index]
+
+                    row_permanent = permament
+                    if permanent_column is not None:
+                        row_permanent, error = parse_permanent(
+                            row[permanent_column], permament
+                        )
+                        if error:
+                            self.report_error(total, from_link, to_link, error)
+                            progress.add_error()
+                            continue
+
+                    row_site = site
+                    if site_resolver:
+                        row_site, error = site_resolver.resolve(row[site_column])
+                        if error:
+                            self.report_error(total, from_link, to_link, error)
+                            progress.add_error()
+                            continue
+
+                    rule = None
+                    page_id = None
+                    if rules and parse_rule(from_link):
+                        rule, error = validator.validate_rule(
+                            from_link, to_link, row_site, row_permanent
+                        )
+                    else:
+                        if resolve_pages:
+                            page_id = page_index.resolve(to_link, row_site)
+
+                        old_path, redirect_link, error = validator.validate(
+                            from_link,
+                            "" if page_id else to_link,
+                            row_site,
+                            check_duplicates=not incremental,
+                        )
 
-        if not format_:
-            format_ = extension
+                    status = None
+                    if incremental and not error:
+                        row_hash = get_row_hash(
+                            row_site, old_path, redirect_link, row_permanent, page_id
+                        )
+                        status = row_hashes.get_status(
+                            row_site, old_path, row_hash, validator.index
+                        )
+                        if status == UNCHANGED:
+                            unchanged += 1
+                            continue
+                        if status != CHANGED and validator.index.contains(
+                            row_site, old_path
+                        ):
+                            error = get_duplicate_error(row_site)
+
+                    if error:
+                        self.report_error(total, from_link, to_link, error)
+                        progress.add_error()
+                        continue
+
+                    if ask:
+                        answer = get_input(
+                            "{}. Found {} -> {} Create? Y/n: ".format(
+                                total, from_link, to_link,
+                            )
+                        )
+
+                        if answer != "Y":
+                            skipped += 1
+                            continue
+                    elif self.verbosity >= 3:
+                        self.stdout.write(
+                            "{}. {} -> {}".format(total, from_link, to_link,)
+                        )
+
+                    if rule:
+                        validator.add_rule(rule)
+                        if not dry_run:
+                            rule.save()
+                        successes += 1
+                        continue
+
+                    validator.index.add(row_site, old_path)
+
+                    if target_checker and not page_id and target_checker.check(to_link):
+                        unverified.append((total, from_link, to_link))
+
+                    if status == CHANGED:
+                        updated += 1
+                    else:
+                        successes += 1
+
+                    if dry_run:
+                        continue
+
+                    if incremental:
+                        row_hashes.record(total, row_site, old_path, row_hash)
+
+                    redirect = Redirect(
+                        old_path=old_path,
+                        site=row_site,
+                        is_permanent=row_permanent,
+                        redirect_page_id=page_id,
+                        redirect_link=redirect_link,
+                    )
+                    if status == CHANGED:
+                        updated_rows.add(total)
+                        writer.update(redirect, (total, from_link, to_link))
+                    else:
+                        writer.add(redirect, (total, from_link, to_link))
+
+                errors += progress.errors
+
+        for (number, from_link, to_link), error in writer.failed:
+            self.report_error(number, from_link, to_link, error)
+            if incremental:
+                row_hashes.discard(number)
+            if number in updated_rows:
+                updated -= 1
+            else:
+                successes -= 1
+        errors += len(writer.failed)
+
+        for number, from_link, to_link in unverified:
+            warning = target_checker.check(to_link)
+            if warning:
+                warnings += 1
+                self.stdout.write(
+                    "{}. Warning: {} -> {} (Reason: {})".format(
+                        number, from_link, to_link, warning
+                    )
+                )
+        validator.index.close()
 
-        if extension in ["xls", "xlsx"]:
-            mode = "rb"
+        self.stdout.write("\n")
+        self.stdout.write("Found: {}".format(total))
+        self.stdout.write("Created: {}".format(successes))
+        self.stdout.write("Skipped : {}".format(skipped))
+        self.stdout.write("Errors: {}".format(errors))
+        if verify_targets:
+            self.stdout.write("Warnings: {}".format(warnings))
+        if incremental:
+            self.stdout.write("Updated: {}".format(updated))
+            self.stdout.write("Unchanged: {}".format(unchanged))
+
+            if not dry_run:
+                row_hashes.save()
+                # Rows that failed or were skipped are tried again next time
+                if not errors and not skipped:
+                    record_file(file_hash)
+
+    def iter_datasets(self, sources, workers, offset, limit):
+        """
+        Yields (path, rows) for each source in order. With several workers
+        the next files are read while the current one is being imported.
+        """
+        if workers > 1:
+            executor = ThreadPoolExecutor(max_workers=workers)
+            pending = deque()
+            remaining = iter(sources)
+            for source in islice(remaining, workers):
+                pending.append(executor.submit(load_dataset, *source))
+
+            def load_all():
+                while pending:
+                    future = pending.popleft()
+                    source = next(remaining, None)
+                    if source:
+                        pending.append(executor.submit(load_dataset, *source))
+                    yield future.result()
+
+            datasets = load_all()
         else:
-            mode = "r"
+            executor = None
+            datasets = (load_dataset(*source) for source in sources)
 
-        with open(src, mode) as fh:
-            imported_data = tablib.Dataset().load(fh.read(), format=format_)
+        try:
+            for (path, _), imported_data in zip(sources, datasets):
+                if len(sources) > 1:
+                    self.stdout.write("File: {}".format(path))
 
-            sample_data = tablib.Dataset(
-                *imported_data[: min(len(imported_data), 4)],
-                headers=imported_data.headers
+                self.write_sample(imported_data)
+
+                if offset != -1:
+                    imported_data = imported_data[offset:]
+                if limit != -1:
+                    imported_data = imported_data[:limit]
+
+                yield path, imported_data
+        finally:
+            if executor:
+                executor.shutdown(wait=False)
+
+    def write_sample(self, imported_data):
+        sample_data = tablib.Dataset(
+            *imported_data[: min(len(imported_data), 4)], headers=imported_data.headers
+        )
+
+        try:
+            self.stdout.write("Sample data:")
+            self.stdout.write(str(sample_data))
+        except:
+            self.stdout.write("Warning: Cannot display sample data")
+
+        self.stdout.write("--------------")
+
+    def report_error(self, number, from_link, to_link, error):
+        if self.verbosity >= 3:
+            self.stdout.write(
+                "{}. Error: {} -> {} (Reason: {})".format(
+                    number, from_link, to_link, error,
+                )
             )
 
-            try:
-                self.stdout.write("Sample data:")
-                self.stdout.write(str(sample_data))
-            except:
-                self.stdout.write("Warning: Cannot display sample data")
+        if self.error_writer:
+            self.error_writer.writerow([number, from_link, to_link, error])
 
-            self.stdout.write("--------------")
+    def check_targets(self, links, concurrency, timeout):
+        targets = get_external_targets(links)
+        self.stdout.write("Checking {} targets".format(len(targets)))
 
-            if site:
-                self.stdout.write("Using site: {}".format(site.hostname))
+        checker = TargetChecker(concurrency=concurrency, timeout=timeout)
+        dead = 0
+        for url, error in checker.check(targets).items():
+            if error:
+                dead += 1
+                self.stdout.write("Dead target: {} ({})".format(url, error))
 
-            self.stdout.write("Importing redirects:")
+        self.stdout.write("Dead targets: {}".format(dead))
+        self.stdout.write("--------------")
 
-            if offset != -1:
-                imported_data = imported_data[offset:]
-            if limit != -1:
-                imported_data = imported_data[:limit]
+    def handle_sync(self, rows, site, permanent, dry_run, ask):
+        diff, errors = sync_redirects(rows, site, permanent, dry_run=True)
 
-            for row in imported_data:
-                total += 1
+        for from_link, to_link, error in errors:
+            self.report_error("", from_link, to_link, error)
 
-                from_link = row[from_index]
-                to_link = row[to_index]
+        counts = diff.get_counts()
+        self.stdout.write("Sync preview:")
+        self.stdout.write("Add: {}".format(counts["adds"]))
+        self.stdout.write("Update: {}".format(counts["updates"]))
+        self.stdout.write("Delete: {}".format(counts["deletes"]))
+        self.stdout.write("Unchanged: {}".format(counts["unchanged"]))
+        self.stdout.write("Errors: {}".format(len(errors)))
 
-                data = {
-                    "old_path": from_link,
-                    "redirect_link": to_link,
-                    "is_permanent": permament,
-                }
+        if dry_run:
+            return
 
-                if site:
-                    data["site"] = site.pk
+        if ask and get_input("Apply changes? Y/n: ") != "Y":
+            return
 
-                form = RedirectForm(data)
-                if not form.is_valid():
-                    error = form.errors.as_text().replace("\n", "")
-                    self.stdout.write(
-                        "{}. Error: {} -> {} (Reason: {})".format(
-                            total, from_link, to_link, error,
-                        )
-                    )
-                    errors.append(error)
-                    continue
+        apply_sync_diff(diff, site)
+        self.stdout.write("Sync applied")
 
-                if ask:
-                    answer = get_input(
-                        "{}. Found {} -> {} Create? Y/n: ".format(
-                            total, from_link, to_link,
-                        )
-                    )
+    def handle_plan(self, path, rows, site, permanent):
+        counts = write_plan(path, rows, site, permanent)
 
-                    if answer != "Y":
-                        skipped += 1
-                        continue
-                else:
-                    self.stdout.write("{}. {} -> {}".format(total, from_link, to_link,))
+        self.stdout.write("Plan written to: {}".format(path))
+        self.stdout.write("Create: {}".format(counts["create"]))
+        self.stdout.write("Duplicates: {}".format(counts["duplicate"]))
+        self.stdout.write("Errors: {}".format(counts["error"]))
 
-                if dry_run:
-                    successes += 1
-                    continue
 
-                form.save()
-                successes += 1
+def get_source_paths(src):
+    """
+    Expands the --src values, which can be files, directories or glob
+    patterns, to a list of files.
+    """
+    available_formats = [key for key in registry._formats]
+    paths = []
+    for value in src:
+        if os.path.isdir(value):
+            for name in sorted(os.listdir(value)):
+                path = os.path.join(value, name)
+                _, extension = os.path.splitext(name)
+                if os.path.isfile(path) and extension.lstrip(".") in available_formats:
+                    paths.append(path)
+            continue
 
-        self.stdout.write("\n")
-        self.stdout.write("Found: {}".format(total))
-        self.stdout.write("Created: {}".format(successes))
-        self.stdout.write("Skipped : {}".format(skipped))
-        self.stdout.write("Errors: {}".format(len(errors)))
+        if glob.has_magic(value):
+            matches = sorted(glob.glob(value))
+            if not matches:
+                raise Exception("Missing file '{0}'".format(value))
+            paths.extend(matches)
+            continue
+
+        if not os.path.exists(value):
+            raise Exception("Missing file '{0}'".format(value))
+        paths.append(value)
+
+    return paths
+
+
+def get_source_format(path, format_):
+    if format_:
+        return format_
+
+    _, extension = os.path.splitext(path)
+    extension = extension.lstrip(".")
+    available_formats = [key for key in registry._formats]
+
+    if extension not in available_formats:
+        raise Exception("Invalid format '{}'".format(extension))
+
+    return extension
+
+
+def load_dataset(path, format_):
+    if format_ in ["xls", "xlsx"]:
+        mode = "rb"
+    else:
+        mode = "r"
+
+    with open(path, mode) as fh:
+        return tablib.Dataset().load(fh.read(), format=format_)
 
 
 def get_input(msg):  # pragma: no cover
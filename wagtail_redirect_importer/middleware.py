@@ -0,0 +1,66 @@
+from urllib.parse import urlparse
+
+from django import http
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.encoding import uri_to_iri
+from wagtail.contrib.redirects.models import Redirect
+
+from .lookup import lookup
+
+
+def _get_redirect(request, path):
+    if "\0" in path:
+        return None
+
+    pk = lookup.get(request.site, path)
+    if pk is None:
+        return None
+
+    return Redirect.objects.select_related("redirect_page").filter(pk=pk).first()
+
+
+def get_redirect(request, path):
+    redirect = _get_redirect(request, path)
+    if not redirect:
+        # try unencoding the path
+        redirect = _get_redirect(request, uri_to_iri(path))
+    return redirect
+
+
+class RedirectMiddleware(MiddlewareMixin):
+    """
+    Replacement for wagtail.contrib.redirects.middleware.RedirectMiddleware
+    that looks paths up in the in-process RedirectLookup, so only requests
+    that match a redirect query the database. Paths without a redirect are
+    matched against the redirect rules.
+    """
+
+    def process_response(self, request, response):
+        if response.status_code != 404:
+            return response
+
+        if not hasattr(request, "site"):
+            return response
+
+        path = Redirect.normalise_path(request.get_full_path())
+
+        redirect = get_redirect(request, path)
+        if redirect is None:
+            path_without_query = urlparse(path).path
+            if path != path_without_query:
+                redirect = get_redirect(request, path_without_query)
+
+        if redirect is None:
+            target = lookup.match_rule(request.site, path_without_query)
+            if target is None:
+                return response
+            link, is_permanent = target
+        else:
+            if redirect.link is None:
+                return response
+            link, is_permanent = redirect.link, redirect.is_permanent
+
+        if is_permanent:
+            return http.HttpResponsePermanentRedirect(link)
+        else:
+            return http.HttpResponseRedirect(link)
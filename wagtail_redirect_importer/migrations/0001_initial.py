@@ -0,0 +1,31 @@
+# Generated by Django 3.0.14 on 2026-10-19 14:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('wagtailcore', '0040_page_draft_title'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RedirectRule',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pattern', models.CharField(max_length=255, verbose_name='pattern')),
+                ('match_type', models.CharField(choices=[('prefix', 'Prefix'), ('wildcard', 'Wildcard'), ('regex', 'Regular expression')], max_length=10, verbose_name='match type')),
+                ('redirect_link', models.URLField(max_length=255, verbose_name='redirect to')),
+                ('is_permanent', models.BooleanField(default=True, verbose_name='permanent')),
+                ('site', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.Site', verbose_name='site')),
+            ],
+            options={
+                'verbose_name': 'redirect rule',
+                'unique_together': {('pattern', 'match_type', 'site')},
+            },
+        ),
+    ]
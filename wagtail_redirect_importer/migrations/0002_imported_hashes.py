@@ -0,0 +1,39 @@
+# Generated by Django 3.0.14 on 2026-10-19 14:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0040_page_draft_title'),
+        ('wagtail_redirect_importer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedFile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_hash', models.CharField(max_length=64, unique=True, verbose_name='file hash')),
+                ('imported_at', models.DateTimeField(auto_now_add=True, verbose_name='imported at')),
+            ],
+            options={
+                'verbose_name': 'imported file',
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportedRow',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_path', models.CharField(max_length=255, verbose_name='redirect from')),
+                ('row_hash', models.CharField(max_length=40, verbose_name='row hash')),
+                ('site', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.Site', verbose_name='site')),
+            ],
+            options={
+                'verbose_name': 'imported row',
+                'unique_together': {('old_path', 'site')},
+            },
+        ),
+    ]
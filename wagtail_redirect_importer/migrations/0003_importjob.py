@@ -0,0 +1,36 @@
+# Generated by Django 3.0.14 on 2026-10-19 14:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('wagtail_redirect_importer', '0002_imported_hashes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255, verbose_name='file name')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='status')),
+                ('cancel_requested', models.BooleanField(default=False, verbose_name='cancel requested')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='total')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='processed')),
+                ('successes', models.PositiveIntegerField(default=0, verbose_name='successes')),
+                ('errors_count', models.PositiveIntegerField(default=0, verbose_name='errors')),
+                ('summary', models.TextField(blank=True, verbose_name='summary')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='finished at')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'import job',
+            },
+        ),
+    ]
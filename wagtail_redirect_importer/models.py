@@ -0,0 +1,161 @@
+import json
+
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class RedirectRule(models.Model):
+    """
+    A redirect for every path matching a pattern, imported from rows like
+    "/blog/2015/*" (prefix), "/blog/*/comments" (wildcard) or
+    "^/news/(\\d+)$" (regex).
+    """
+
+    PREFIX = "prefix"
+    WILDCARD = "wildcard"
+    REGEX = "regex"
+    MATCH_TYPE_CHOICES = (
+        (PREFIX, _("Prefix")),
+        (WILDCARD, _("Wildcard")),
+        (REGEX, _("Regular expression")),
+    )
+
+    pattern = models.CharField(verbose_name=_("pattern"), max_length=255)
+    match_type = models.CharField(
+        verbose_name=_("match type"), max_length=10, choices=MATCH_TYPE_CHOICES
+    )
+    site = models.ForeignKey(
+        "wagtailcore.Site",
+        verbose_name=_("site"),
+        null=True,
+        blank=True,
+        related_name="+",
+        on_delete=models.CASCADE,
+    )
+    redirect_link = models.URLField(verbose_name=_("redirect to"), max_length=255)
+    is_permanent = models.BooleanField(verbose_name=_("permanent"), default=True)
+
+    class Meta:
+        verbose_name = _("redirect rule")
+        unique_together = [("pattern", "match_type", "site")]
+
+    def __str__(self):
+        return self.pattern
+
+
+class ImportedRow(models.Model):
+    """
+    Content hash of the row a redirect was last imported from, used by
+    incremental imports to skip rows that haven't changed.
+    """
+
+    site = models.ForeignKey(
+        "wagtailcore.Site",
+        verbose_name=_("site"),
+        null=True,
+        blank=True,
+        related_name="+",
+        on_delete=models.CASCADE,
+    )
+    old_path = models.CharField(verbose_name=_("redirect from"), max_length=255)
+    row_hash = models.CharField(verbose_name=_("row hash"), max_length=40)
+
+    class Meta:
+        verbose_name = _("imported row")
+        unique_together = [("old_path", "site")]
+
+    def __str__(self):
+        return self.old_path
+
+
+class ImportedFile(models.Model):
+    """
+    Hash of a source file, and the import options, that was imported
+    without errors.
+    """
+
+    file_hash = models.CharField(
+        verbose_name=_("file hash"), max_length=64, unique=True
+    )
+    imported_at = models.DateTimeField(verbose_name=_("imported at"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("imported file")
+
+    def __str__(self):
+        return self.file_hash
+
+
+class ImportJob(models.Model):
+    """
+    An import started from the admin and run in the background, with its
+    progress, a flag to cancel it and the summary once it's finished.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, _("Pending")),
+        (RUNNING, _("Running")),
+        (COMPLETED, _("Completed")),
+        (CANCELLED, _("Cancelled")),
+        (FAILED, _("Failed")),
+    )
+    FINISHED_STATUSES = (COMPLETED, CANCELLED, FAILED)
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name=_("user"),
+        null=True,
+        blank=True,
+        related_name="+",
+        on_delete=models.SET_NULL,
+    )
+    file_name = models.CharField(verbose_name=_("file name"), max_length=255)
+    status = models.CharField(
+        verbose_name=_("status"),
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    cancel_requested = models.BooleanField(
+        verbose_name=_("cancel requested"), default=False
+    )
+    total = models.PositiveIntegerField(verbose_name=_("total"), default=0)
+    processed = models.PositiveIntegerField(verbose_name=_("processed"), default=0)
+    successes = models.PositiveIntegerField(verbose_name=_("successes"), default=0)
+    errors_count = models.PositiveIntegerField(verbose_name=_("errors"), default=0)
+    summary = models.TextField(verbose_name=_("summary"), blank=True)
+    created_at = models.DateTimeField(verbose_name=_("created at"), auto_now_add=True)
+    finished_at = models.DateTimeField(
+        verbose_name=_("finished at"), null=True, blank=True
+    )
+
+    class Meta:
+        verbose_name = _("import job")
+
+    def __str__(self):
+        return self.file_name
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+    def get_summary(self):
+        if not self.summary:
+            return None
+        return json.loads(self.summary)
+
+    def update_progress(self, processed, successes, errors_count):
+        """
+        Saves the counts and returns whether the job should be cancelled.
+        """
+        ImportJob.objects.filter(pk=self.pk).update(
+            processed=processed, successes=successes, errors_count=errors_count
+        )
+        self.refresh_from_db(fields=["cancel_requested"])
+        return self.cancel_requested
@@ -0,0 +1,185 @@
+"""
+An import plan is a gzipped file with one JSON document per line. The first
+line is a header with the import options, every following line is a row:
+
+    [row number, from link, to link, old path, redirect link, decision, message]
+"""
+import gzip
+import json
+import time
+
+from django.db import IntegrityError, transaction
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.core.models import Site
+
+from .importer import ExistingRedirectIndex, get_duplicate_message, get_redirect_ids
+from .signals import redirects_imported
+from .validation import RedirectValidator
+
+
+PLAN_VERSION = 1
+DEFAULT_BATCH_SIZE = 500
+
+CREATE = "create"
+DUPLICATE = "duplicate"
+ERROR = "error"
+
+
+class InvalidPlan(Exception):
+    pass
+
+
+def iter_plan_rows(rows, site, index=None):
+    """
+    Validates, normalises and deduplicates (from_link, to_link) rows against
+    each other and the existing redirects, yielding plan rows.
+    """
+    if index is None:
+        index = ExistingRedirectIndex()
+    validator = RedirectValidator(index)
+
+    for number, (from_link, to_link) in enumerate(rows, 1):
+        old_path, redirect_link, error = validator.validate(
+            from_link, to_link, site, check_duplicates=False
+        )
+        if error:
+            yield [number, from_link, to_link, None, None, ERROR, error]
+            continue
+
+        if index.contains(site, old_path):
+            message = get_duplicate_message(site)
+            yield [
+                number,
+                from_link,
+                to_link,
+                old_path,
+                redirect_link,
+                DUPLICATE,
+                message,
+            ]
+            continue
+
+        index.add(site, old_path)
+        yield [number, from_link, to_link, old_path, redirect_link, CREATE, None]
+
+
+def write_plan(path, rows, site, is_permanent):
+    counts = {CREATE: 0, DUPLICATE: 0, ERROR: 0}
+    header = {
+        "version": PLAN_VERSION,
+        "site_id": site.pk if site else None,
+        "permanent": is_permanent,
+    }
+
+    with gzip.open(path, "wt", encoding="utf-8") as fh:
+        fh.write(json.dumps(header) + "\n")
+        for plan_row in iter_plan_rows(rows, site):
+            counts[plan_row[5]] += 1
+            fh.write(json.dumps(plan_row, separators=(",", ":")) + "\n")
+
+    return counts
+
+
+def read_plan(path):
+    """
+    Returns the plan header and an iterator over its rows.
+    """
+    fh = gzip.open(path, "rt", encoding="utf-8")
+    try:
+        header = json.loads(fh.readline())
+    except (OSError, ValueError):
+        fh.close()
+        raise InvalidPlan("'{}' is not a valid import plan".format(path))
+
+    if not isinstance(header, dict) or header.get("version") != PLAN_VERSION:
+        fh.close()
+        raise InvalidPlan("'{}' has an unsupported plan version".format(path))
+
+    def rows():
+        with fh:
+            for line in fh:
+                yield json.loads(line)
+
+    return header, rows()
+
+
+def apply_plan(path, batch_size=DEFAULT_BATCH_SIZE, throttle=None):
+    """
+    Creates the redirects marked for creation in the plan, without parsing
+    or validating the source file again. Every batch is committed on its
+    own, and a Throttle limits how fast the batches are inserted.
+
+    The plan is rejected before anything is created if one of its paths was
+    taken since it was written.
+    """
+    header, rows = read_plan(path)
+    site = None
+    if header["site_id"]:
+        site = Site.objects.get(id=header["site_id"])
+
+    check_conflicts(path, site, rows)
+
+    header, rows = read_plan(path)
+    is_permanent = header["permanent"]
+    created = 0
+    batch = []
+
+    for row in rows:
+        if row[5] != CREATE:
+            continue
+
+        batch.append(
+            Redirect(
+                old_path=row[3],
+                redirect_link=row[4],
+                is_permanent=is_permanent,
+                site=site,
+            )
+        )
+        if len(batch) == batch_size:
+            created += commit_batch(path, batch, throttle, created)
+            batch = []
+
+    if batch:
+        created += commit_batch(path, batch, throttle, created)
+
+    return created
+
+
+def check_conflicts(path, site, rows):
+    """
+    Raises InvalidPlan if a path the plan creates already has a redirect.
+    Unique constraints don't catch this for redirects without a site.
+    """
+    index = ExistingRedirectIndex()
+    for row in rows:
+        if row[5] == CREATE and index.contains(site, row[3]):
+            raise InvalidPlan(
+                "'{}' conflicts with existing redirects, create a new plan".format(path)
+            )
+
+
+def commit_batch(path, batch, throttle, created):
+    try:
+        with transaction.atomic():
+            ids = insert_batch(batch, throttle)
+    except IntegrityError:
+        raise InvalidPlan(
+            "'{}' conflicts with existing redirects after creating {}, "
+            "create a new plan".format(path, created)
+        )
+
+    redirects_imported.send(sender=Redirect, created=ids, updated=[], deleted=[])
+    return len(batch)
+
+
+def insert_batch(batch, throttle=None):
+    if throttle is None:
+        Redirect.objects.bulk_create(batch)
+        return get_redirect_ids(batch)
+
+    throttle.acquire(len(batch))
+    started = time.monotonic()
+    Redirect.objects.bulk_create(batch)
+    throttle.record_commit(time.monotonic() - started, len(batch))
+    return get_redirect_ids(batch)
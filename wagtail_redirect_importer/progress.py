@@ -0,0 +1,64 @@
+import time
+
+
+class ProgressReporter:
+    """
+    Writes rate limited progress updates, at most one per interval seconds.
+    Updates are disabled if interval is None.
+    """
+
+    def __init__(self, stdout, total=None, interval=2.0, clock=time.monotonic):
+        self.stdout = stdout
+        self.total = total
+        self.interval = interval
+        self.clock = clock
+        self.done = 0
+        self.errors = 0
+        self.started_at = clock()
+        self.reported_at = self.started_at
+
+    def track(self, iterable):
+        for item in iterable:
+            yield item
+            self.done += 1
+            if self.interval is None:
+                continue
+
+            now = self.clock()
+            if now - self.reported_at >= self.interval:
+                self.reported_at = now
+                self.report(now)
+
+    def add_error(self):
+        self.errors += 1
+
+    def report(self, now=None):
+        if now is None:
+            now = self.clock()
+
+        elapsed = now - self.started_at
+        rate = self.done / elapsed if elapsed > 0 else 0
+
+        if self.total is None:
+            message = "Processed {} rows".format(self.done)
+        else:
+            message = "Processed {}/{} rows".format(self.done, self.total)
+
+        message += " ({:.0f} rows/s".format(rate)
+        if self.total is not None and rate:
+            message += ", ETA {}".format(
+                format_duration((self.total - self.done) / rate)
+            )
+        message += "), {} errors".format(self.errors)
+
+        self.stdout.write(message + "\n")
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return "{}h{:02d}m{:02d}s".format(hours, minutes, seconds)
+    if minutes:
+        return "{}m{:02d}s".format(minutes, seconds)
+    return "{}s".format(seconds)
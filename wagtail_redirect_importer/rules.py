@@ -0,0 +1,148 @@
+import logging
+import re
+import warnings
+
+from .models import RedirectRule
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_rule(value):
+    """
+    Returns (match_type, pattern) if value is a rule pattern, or None for
+    plain paths. Values starting with ^ are regular expressions, a single
+    trailing * makes a prefix and any other * is a wildcard.
+    """
+    if not isinstance(value, str):
+        return None
+
+    value = value.strip()
+    if value.startswith("^"):
+        return RedirectRule.REGEX, value
+
+    if "*" not in value:
+        return None
+
+    if not value.startswith("/"):
+        value = "/" + value
+
+    if value.endswith("*") and value.count("*") == 1:
+        return RedirectRule.PREFIX, value[:-1]
+
+    # Request paths are matched without their trailing slash
+    if len(value) > 1 and value.endswith("/"):
+        value = value[:-1]
+
+    return RedirectRule.WILDCARD, value
+
+
+def requires_trailing_slash(pattern):
+    """
+    Returns True for regular expressions that only match paths ending in a
+    slash, like ^/(\\d+)/$. Request paths are matched without their
+    trailing slash, so these never match.
+    """
+    pattern = pattern.rstrip("$")
+    if pattern.endswith("\\Z"):
+        pattern = pattern[:-2]
+    return pattern.endswith("/") and pattern.lstrip("^") != "/"
+
+
+def get_rule_regex(match_type, pattern):
+    if match_type == RedirectRule.REGEX:
+        return pattern
+
+    return "".join(
+        ".*" if part == "*" else re.escape(part) for part in re.split(r"(\*)", pattern)
+    )
+
+
+def compile_rule(match_type, pattern):
+    """
+    Compiles a wildcard or regular expression rule exactly as RuleMatcher
+    matches it, so validating a rule with this catches every error.
+    """
+    with warnings.catch_warnings():
+        # Python 3.11+ rejects global flags that aren't at the start of the
+        # pattern, older versions only warn
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            return re.compile(get_rule_regex(match_type, pattern))
+        except DeprecationWarning as e:
+            raise re.error(str(e))
+
+
+class RuleMatcher:
+    """
+    Matches a path against all rules of a site at once. Prefixes are looked
+    up in a character trie, where the longest prefix wins. Runs of
+    wildcards are combined into one alternation, regular expressions are
+    compiled on their own so their inline flags, groups and backreferences
+    keep working. Patterns are tried in order, the first rule wins.
+    Prefixes are tried before patterns.
+    """
+
+    def __init__(self, rules):
+        self.trie = {}
+        # (regex, target) pairs, or (regex, {group name: target}) for wildcards
+        self.patterns = []
+        wildcards = {}
+
+        for match_type, pattern, redirect_link, is_permanent in rules:
+            target = (redirect_link, is_permanent)
+            if match_type == RedirectRule.PREFIX:
+                node = self.trie
+                for char in pattern:
+                    node = node.setdefault(char, {})
+                node.setdefault(None, target)
+            elif match_type == RedirectRule.WILDCARD:
+                wildcards["_rule{}".format(len(wildcards))] = (pattern, target)
+            else:
+                self.add_wildcards(wildcards)
+                wildcards = {}
+                try:
+                    self.patterns.append((compile_rule(match_type, pattern), target))
+                except re.error:
+                    logger.warning("Skipping invalid rule pattern %r", pattern)
+
+        self.add_wildcards(wildcards)
+
+    def add_wildcards(self, wildcards):
+        if not wildcards:
+            return
+
+        regex = re.compile(
+            "|".join(
+                "(?P<{}>{})".format(
+                    name, get_rule_regex(RedirectRule.WILDCARD, pattern)
+                )
+                for name, (pattern, _) in wildcards.items()
+            )
+        )
+        targets = {name: target for name, (_, target) in wildcards.items()}
+        self.patterns.append((regex, targets))
+
+    def match(self, path):
+        """
+        Returns (redirect_link, is_permanent) of the matching rule, or None.
+        """
+        node = self.trie
+        target = node.get(None)
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                break
+            target = node.get(None, target)
+
+        if target is not None:
+            return target
+
+        for regex, target in self.patterns:
+            match = regex.fullmatch(path)
+            if match:
+                if isinstance(target, dict):
+                    return target[match.lastgroup]
+                return target
+
+        return None
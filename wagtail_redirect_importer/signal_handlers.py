@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+from wagtail.contrib.redirects.models import Redirect
+
+from .lookup import bump_version, request_invalidation
+from .models import RedirectRule
+from .signals import redirects_imported
+
+
+def invalidate_lookup(sender, **kwargs):
+    # Deferred to the end of the batch while importing
+    request_invalidation()
+
+
+def invalidate_imported_lookup(sender, **kwargs):
+    bump_version()
+
+
+def register_signal_handlers():
+    post_save.connect(invalidate_lookup, sender=Redirect)
+    post_delete.connect(invalidate_lookup, sender=Redirect)
+    redirects_imported.connect(invalidate_imported_lookup, sender=Redirect)
+    post_save.connect(invalidate_lookup, sender=RedirectRule)
+    post_delete.connect(invalidate_lookup, sender=RedirectRule)
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+
+# Sent with sender=Redirect once per batch of imported redirects. Receivers
+# get the keyword arguments created, updated and deleted, lists of ids.
+redirects_imported = Signal()
@@ -0,0 +1,253 @@
+/*
+ * Uploads the import file in chunks, resuming from the offset the server
+ * reports when a chunk fails, then posts the sha256 checksum of the file
+ * to move on to the confirm step. Browsers without fetch or
+ * Blob.arrayBuffer submit the form as a single upload.
+ */
+(function() {
+    var MAX_RETRIES = 5;
+    var CHECKSUM_CHUNK_SIZE = 1024 * 1024;
+    var csrfToken = "";
+
+    // crypto.subtle can only digest a whole buffer, so the file is hashed
+    // slice by slice with this SHA-256 instead of being read into memory.
+    // The constants are the fractional parts of the roots of the primes.
+    var K = [];
+    var H = [];
+    (function() {
+        function fraction(x) {
+            return (x - Math.floor(x)) * 4294967296 | 0;
+        }
+
+        for (var n = 2; K.length < 64; n++) {
+            var isPrime = true;
+            for (var d = 2; d * d <= n; d++) {
+                if (n % d === 0) {
+                    isPrime = false;
+                    break;
+                }
+            }
+            if (isPrime) {
+                if (H.length < 8) {
+                    H.push(fraction(Math.sqrt(n)));
+                }
+                K.push(fraction(Math.cbrt(n)));
+            }
+        }
+    })();
+
+    function Sha256() {
+        this.hash = H.slice();
+        this.block = new Uint8Array(64);
+        this.used = 0;
+        this.length = 0;
+        this.words = new Array(64);
+    }
+
+    Sha256.prototype.compress = function(bytes, start) {
+        var w = this.words;
+        var h = this.hash;
+        var i;
+
+        for (i = 0; i < 16; i++) {
+            var j = start + i * 4;
+            w[i] = bytes[j] << 24 | bytes[j + 1] << 16 | bytes[j + 2] << 8 | bytes[j + 3];
+        }
+        for (i = 16; i < 64; i++) {
+            var x = w[i - 15];
+            var y = w[i - 2];
+            var s0 = (x >>> 7 | x << 25) ^ (x >>> 18 | x << 14) ^ (x >>> 3);
+            var s1 = (y >>> 17 | y << 15) ^ (y >>> 19 | y << 13) ^ (y >>> 10);
+            w[i] = w[i - 16] + s0 + w[i - 7] + s1 | 0;
+        }
+
+        var a = h[0], b = h[1], c = h[2], d = h[3];
+        var e = h[4], f = h[5], g = h[6], k = h[7];
+        for (i = 0; i < 64; i++) {
+            var t1 = k + ((e >>> 6 | e << 26) ^ (e >>> 11 | e << 21) ^ (e >>> 25 | e << 7)) +
+                (e & f ^ ~e & g) + K[i] + w[i] | 0;
+            var t2 = ((a >>> 2 | a << 30) ^ (a >>> 13 | a << 19) ^ (a >>> 22 | a << 10)) +
+                (a & b ^ a & c ^ b & c) | 0;
+            k = g;
+            g = f;
+            f = e;
+            e = d + t1 | 0;
+            d = c;
+            c = b;
+            b = a;
+            a = t1 + t2 | 0;
+        }
+
+        h[0] = h[0] + a | 0;
+        h[1] = h[1] + b | 0;
+        h[2] = h[2] + c | 0;
+        h[3] = h[3] + d | 0;
+        h[4] = h[4] + e | 0;
+        h[5] = h[5] + f | 0;
+        h[6] = h[6] + g | 0;
+        h[7] = h[7] + k | 0;
+    };
+
+    Sha256.prototype.update = function(bytes) {
+        var offset = 0;
+        this.length += bytes.length;
+
+        if (this.used) {
+            offset = Math.min(64 - this.used, bytes.length);
+            this.block.set(bytes.subarray(0, offset), this.used);
+            this.used += offset;
+            if (this.used < 64) {
+                return;
+            }
+            this.compress(this.block, 0);
+            this.used = 0;
+        }
+
+        for (; offset + 64 <= bytes.length; offset += 64) {
+            this.compress(bytes, offset);
+        }
+        this.block.set(bytes.subarray(offset), 0);
+        this.used = bytes.length - offset;
+    };
+
+    Sha256.prototype.hexdigest = function() {
+        var bits = this.length * 8;
+        var padding = new Uint8Array((this.used < 56 ? 64 : 128) - this.used);
+        var end = padding.length;
+        var high = Math.floor(bits / 4294967296);
+
+        padding[0] = 0x80;
+        for (var i = 0; i < 4; i++) {
+            padding[end - 5 - i] = high >>> (i * 8) & 0xff;
+            padding[end - 1 - i] = bits >>> (i * 8) & 0xff;
+        }
+        this.update(padding);
+
+        return this.hash.map(function(word) {
+            return ("0000000" + (word >>> 0).toString(16)).slice(-8);
+        }).join("");
+    };
+
+    function request(method, url, body) {
+        return fetch(url, {
+            method: method,
+            body: body,
+            credentials: "same-origin",
+            headers: {"X-CSRFToken": csrfToken}
+        }).then(function(response) {
+            // 409 means the server has a different offset, which it returns
+            if (!response.ok && response.status !== 409) {
+                throw new Error("HTTP " + response.status);
+            }
+            return response.json();
+        });
+    }
+
+    function wait(seconds) {
+        return new Promise(function(resolve) {
+            setTimeout(resolve, seconds * 1000);
+        });
+    }
+
+    function sendChunks(file, state, onProgress, retries) {
+        if (state.offset >= file.size) {
+            return Promise.resolve(state);
+        }
+
+        var chunk = file.slice(state.offset, state.offset + state.chunk_size);
+        var url = state.chunk_url + "?offset=" + state.offset;
+
+        return request("POST", url, chunk).then(function(newState) {
+            onProgress(newState.offset / file.size);
+            return sendChunks(file, newState, onProgress, 0);
+        }, function(error) {
+            if (retries >= MAX_RETRIES) {
+                throw error;
+            }
+            // Ask the server how much of the chunk arrived and resume there
+            return wait(Math.pow(2, retries)).then(function() {
+                return request("GET", state.chunk_url);
+            }).then(function(newState) {
+                return sendChunks(file, newState, onProgress, retries + 1);
+            }, function() {
+                return sendChunks(file, state, onProgress, retries + 1);
+            });
+        });
+    }
+
+    function getChecksum(file) {
+        var checksum = new Sha256();
+
+        function read(offset) {
+            if (offset >= file.size) {
+                return Promise.resolve(checksum.hexdigest());
+            }
+            var slice = file.slice(offset, offset + CHECKSUM_CHUNK_SIZE);
+            return slice.arrayBuffer().then(function(buffer) {
+                checksum.update(new Uint8Array(buffer));
+                return read(offset + CHECKSUM_CHUNK_SIZE);
+            });
+        }
+
+        return read(0);
+    }
+
+    function complete(form, state, file, checksum) {
+        var completeForm = document.createElement("form");
+        completeForm.method = "POST";
+        completeForm.action = state.complete_url;
+
+        var values = {
+            csrfmiddlewaretoken: csrfToken,
+            input_format: form.elements.input_format.value,
+            file_name: file.name,
+            checksum: checksum
+        };
+        Object.keys(values).forEach(function(name) {
+            var input = document.createElement("input");
+            input.type = "hidden";
+            input.name = name;
+            input.value = values[name];
+            completeForm.appendChild(input);
+        });
+
+        document.body.appendChild(completeForm);
+        completeForm.submit();
+    }
+
+    document.addEventListener("DOMContentLoaded", function() {
+        var form = document.querySelector("form[data-chunked-upload-url]");
+        if (!form || !window.fetch || !Blob.prototype.arrayBuffer) {
+            return;
+        }
+
+        // The CSRF cookie is HttpOnly or renamed on some sites, the form
+        // always has the token
+        csrfToken = form.elements.csrfmiddlewaretoken.value;
+
+        var status = form.querySelector("[data-chunked-upload-status]");
+
+        form.addEventListener("submit", function(event) {
+            var file = form.elements.import_file.files[0];
+            if (!file) {
+                return;
+            }
+            event.preventDefault();
+
+            function onProgress(done) {
+                status.textContent = Math.floor(done * 100) + "%";
+            }
+
+            var uploaded = request("POST", form.getAttribute("data-chunked-upload-url"))
+                .then(function(state) {
+                    return sendChunks(file, state, onProgress, 0);
+                });
+
+            Promise.all([uploaded, getChecksum(file)]).then(function(results) {
+                complete(form, results[0], file, results[1]);
+            }, function(error) {
+                status.textContent = error.message;
+            });
+        });
+    });
+})();
@@ -0,0 +1,219 @@
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Func
+from django.utils.translation import gettext as _
+from wagtail.contrib.redirects.models import Redirect
+
+from .importer import get_redirect_ids
+from .lookup import defer_invalidation
+from .signals import redirects_imported
+from .validation import RedirectValidator
+
+
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_BATCH_SIZE = 500
+
+
+class ByteOrder(Func):
+    """
+    Orders a text column by code point, the same order Python compares
+    strings in, regardless of the database collation.
+    """
+
+    template = "%(expressions)s"
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template='%(expressions)s COLLATE "C"',
+            **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, template="BINARY %(expressions)s", **extra_context
+        )
+
+    def as_oracle(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="NLSSORT(%(expressions)s, 'NLS_SORT=BINARY')",
+            **extra_context
+        )
+
+
+class SyncDiff:
+    def __init__(self):
+        self.adds = []
+        self.updates = []
+        self.deletes = []
+        self.unchanged = 0
+
+    def get_counts(self):
+        return {
+            "adds": len(self.adds),
+            "updates": len(self.updates),
+            "deletes": len(self.deletes),
+            "unchanged": self.unchanged,
+        }
+
+
+def build_sync_entries(rows, is_permanent):
+    """
+    Validates and normalises (from_link, to_link) rows, returning entries
+    sorted by old_path, a list of errors and the set of paths of invalid
+    rows. Only the first row of each old_path is kept.
+    """
+    validator = RedirectValidator()
+    entries = []
+    errors = []
+    invalid_paths = set()
+    for from_link, to_link in rows:
+        old_path, redirect_link, error = validator.validate(
+            from_link, to_link, check_duplicates=False
+        )
+        if error:
+            errors.append([from_link, to_link, error])
+            if old_path is not None:
+                invalid_paths.add(old_path)
+            continue
+        entries.append((old_path, redirect_link, is_permanent))
+
+    # Sorting is stable, so the first occurrence of a path stays first
+    entries.sort(key=itemgetter(0))
+
+    unique_entries = []
+    for entry in entries:
+        if unique_entries and unique_entries[-1][0] == entry[0]:
+            errors.append([entry[0], entry[1], _("Duplicate path in file.")])
+            continue
+        unique_entries.append(entry)
+
+    return unique_entries, errors, invalid_paths
+
+
+def iter_existing_redirects(site, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streams (pk, old_path, redirect_link, is_permanent, redirect_page_id)
+    for the redirects belonging to site, ordered by old_path.
+    """
+    if site:
+        queryset = Redirect.objects.filter(site=site)
+    else:
+        queryset = Redirect.objects.filter(site__isnull=True)
+
+    return (
+        queryset.order_by(ByteOrder("old_path").asc(), "pk")
+        .values_list(
+            "pk", "old_path", "redirect_link", "is_permanent", "redirect_page_id"
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _check_sorted(existing):
+    previous = None
+    for row in existing:
+        if previous is not None and row[1] < previous:
+            raise ValueError("Existing redirects are not sorted by path")
+        previous = row[1]
+        yield row
+
+
+def compute_sync_diff(entries, existing, keep_paths=frozenset()):
+    """
+    Merge-joins the sorted file entries with the sorted existing redirects.
+    Redirects with a path in keep_paths, like the paths of invalid rows, are
+    never deleted.
+    """
+    diff = SyncDiff()
+    existing = _check_sorted(existing)
+    current = next(existing, None)
+
+    def delete(row):
+        if row[1] not in keep_paths:
+            diff.deletes.append(row[0])
+
+    for entry in entries:
+        old_path, redirect_link, is_permanent = entry
+
+        while current is not None and current[1] < old_path:
+            delete(current)
+            current = next(existing, None)
+
+        if current is None or current[1] != old_path:
+            diff.adds.append(entry)
+            continue
+
+        pk, current_path, current_link, current_permanent, current_page_id = current
+        if (
+            current_link == redirect_link
+            and current_permanent == is_permanent
+            and current_page_id is None
+        ):
+            diff.unchanged += 1
+        else:
+            diff.updates.append((pk, entry))
+        current = next(existing, None)
+
+    while current is not None:
+        delete(current)
+        current = next(existing, None)
+
+    return diff
+
+
+def apply_sync_diff(diff, site, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Applies the diff in one transaction, then sends redirects_imported once
+    for all changes.
+    """
+    with defer_invalidation(), transaction.atomic():
+        for offset in range(0, len(diff.deletes), batch_size):
+            pks = diff.deletes[offset : offset + batch_size]
+            Redirect.objects.filter(pk__in=pks).delete()
+
+        Redirect.objects.bulk_update(
+            [
+                Redirect(
+                    pk=pk,
+                    redirect_link=redirect_link,
+                    is_permanent=is_permanent,
+                    redirect_page=None,
+                )
+                for pk, (old_path, redirect_link, is_permanent) in diff.updates
+            ],
+            ["redirect_link", "is_permanent", "redirect_page"],
+            batch_size=batch_size,
+        )
+
+        added = [
+            Redirect(
+                old_path=old_path,
+                redirect_link=redirect_link,
+                is_permanent=is_permanent,
+                site=site,
+            )
+            for old_path, redirect_link, is_permanent in diff.adds
+        ]
+        Redirect.objects.bulk_create(added, batch_size=batch_size)
+        created_ids = get_redirect_ids(added)
+
+    if diff.adds or diff.updates or diff.deletes:
+        redirects_imported.send(
+            sender=Redirect,
+            created=created_ids,
+            updated=[pk for pk, entry in diff.updates],
+            deleted=list(diff.deletes),
+        )
+
+
+def sync_redirects(rows, site, is_permanent, dry_run=False):
+    entries, errors, invalid_paths = build_sync_entries(rows, is_permanent)
+    diff = compute_sync_diff(entries, iter_existing_redirects(site), invalid_paths)
+    if not dry_run:
+        apply_sync_diff(diff, site)
+    return diff, errors
@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import ssl
+from collections import deque
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.encoding import iri_to_uri
+from wagtail.core.models import Site
+
+from .utils import get_read_database
+
+
+DEFAULT_CONCURRENCY = 20
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_HOST_INTERVAL = 0.1
+CACHE_KEY_PREFIX = "wagtail-redirect-importer-target-"
+
+
+def get_external_targets(links):
+    """
+    Returns the distinct http(s) links that don't point to one of the sites.
+    """
+    hostnames = {
+        hostname.lower()
+        for hostname in Site.objects.using(get_read_database()).values_list(
+            "hostname", flat=True
+        )
+    }
+
+    targets = set()
+    for link in links:
+        if not isinstance(link, str):
+            continue
+
+        link = link.strip()
+        parts = urlsplit(link)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            continue
+        if parts.hostname.lower() in hostnames:
+            continue
+        targets.add(link)
+
+    return sorted(targets)
+
+
+class TargetChecker:
+    """
+    Checks urls concurrently with HEAD requests (GET if HEAD isn't allowed)
+    on an asyncio event loop. At most concurrency requests run at once and
+    requests to the same host are at least host_interval seconds apart.
+    Results are cached by url, in the checker and in the Django cache.
+    """
+
+    def __init__(
+        self,
+        concurrency=DEFAULT_CONCURRENCY,
+        timeout=DEFAULT_TIMEOUT,
+        host_interval=DEFAULT_HOST_INTERVAL,
+        cache_timeout=None,
+    ):
+        if cache_timeout is None:
+            cache_timeout = getattr(
+                settings, "WAGTAIL_REDIRECT_IMPORTER_TARGET_CACHE_TIMEOUT", 3600
+            )
+
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.host_interval = host_interval
+        self.cache_timeout = cache_timeout
+        self.results = {}
+
+    def check(self, urls):
+        """
+        Returns a dict of url to error, where error is None for urls that
+        respond with a status below 400.
+        """
+        pending = deque()
+        for url in urls:
+            if url in self.results:
+                continue
+
+            result = cache.get(get_cache_key(url))
+            if result is not None:
+                self.results[url] = result["error"]
+            else:
+                pending.append(url)
+
+        if pending:
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self.check_all(pending))
+            finally:
+                loop.close()
+
+        return {url: self.results[url] for url in urls}
+
+    async def check_all(self, pending):
+        self.host_locks = {}
+        self.host_times = {}
+        workers = [
+            self.worker(pending) for _ in range(min(self.concurrency, len(pending)))
+        ]
+        await asyncio.gather(*workers)
+
+    async def worker(self, pending):
+        while pending:
+            url = pending.popleft()
+            error = await self.check_url(url)
+            self.results[url] = error
+            cache.set(get_cache_key(url), {"error": error}, self.cache_timeout)
+
+    async def check_url(self, url):
+        try:
+            status = await self.request(url, "HEAD")
+            if status in (405, 501):
+                status = await self.request(url, "GET")
+        except asyncio.TimeoutError:
+            return "Timed out"
+        except (OSError, ValueError) as e:
+            return "Connection failed ({})".format(e)
+
+        if status >= 400:
+            return "HTTP {}".format(status)
+        return None
+
+    async def request(self, url, method):
+        # Waiting for the host doesn't count towards the timeout
+        await self.wait_for_host(urlsplit(url).hostname)
+        return await asyncio.wait_for(self.get_status(url, method), self.timeout)
+
+    async def wait_for_host(self, host):
+        loop = asyncio.get_event_loop()
+        if host not in self.host_locks:
+            self.host_locks[host] = asyncio.Lock()
+
+        async with self.host_locks[host]:
+            delay = self.host_times.get(host, 0) + self.host_interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.host_times[host] = loop.time()
+
+    async def get_status(self, url, method):
+        parts = urlsplit(url)
+        secure = parts.scheme == "https"
+        port = parts.port or (443 if secure else 80)
+
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, port, ssl=ssl.create_default_context() if secure else None
+        )
+        try:
+            path = parts.path or "/"
+            if parts.query:
+                path += "?" + parts.query
+
+            host = parts.hostname.encode("idna").decode("ascii")
+            if parts.port:
+                host += ":{}".format(parts.port)
+
+            request = (
+                "{} {} HTTP/1.1\r\n"
+                "Host: {}\r\n"
+                "User-Agent: wagtail-redirect-importer\r\n"
+                "Connection: close\r\n\r\n"
+            ).format(method, iri_to_uri(path), host)
+            writer.write(request.encode("ascii"))
+
+            status_line = await reader.readline()
+            try:
+                return int(status_line.split()[1])
+            except (IndexError, ValueError):
+                raise ValueError("invalid response")
+        finally:
+            writer.close()
+
+
+def get_cache_key(url):
+    return CACHE_KEY_PREFIX + hashlib.md5(url.encode("utf-8")).hexdigest()
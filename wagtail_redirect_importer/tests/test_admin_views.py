@@ -1,4 +1,5 @@
 import os
+from unittest.mock import patch
 
 from django.test import TestCase, override_settings
 from django.urls import reverse
@@ -9,6 +10,7 @@ from wagtail.tests.utils import WagtailTestUtils
 
 from ..base_formats import DEFAULT_FORMATS
 from ..admin_views import write_to_tmp_storage
+from ..models import RedirectRule
 from ..utils import get_import_formats
 
 
@@ -94,6 +96,59 @@ class TestRedirectImporterAdminView(TestCase, WagtailTestUtils):
 
             self.assertEqual(Redirect.objects.all().count(), 2)
 
+    @override_settings(
+        WAGTAIL_REDIRECT_IMPORTER_TMP_STORAGE_CLASS=(
+            "wagtail_redirect_importer.tmp_storages.ChunkedCacheStorage"
+        )
+    )
+    def test_import_step_with_cache_storage(self):
+        f = "{}/files/example.csv".format(TEST_ROOT)
+        (_, filename) = os.path.split(f)
+
+        with open(f, "rb") as infile:
+            upload_file = SimpleUploadedFile(filename, infile.read())
+
+            response = self.post(
+                {
+                    "import_file": upload_file,
+                    "input_format": get_input_format_index_by_name("CSV"),
+                }
+            )
+
+            import_response = self.post_import(
+                {
+                    **response.context["form"].initial,
+                    "from_index": 0,
+                    "to_index": 1,
+                    "permanent": True,
+                }
+            )
+
+            self.assertEqual(
+                import_response.templates[0].name,
+                "wagtail_redirect_importer/import_summary.html",
+            )
+
+            self.assertEqual(Redirect.objects.all().count(), 2)
+
+    @override_settings(WAGTAIL_REDIRECT_IMPORTER_CLEANUP_ON_UPLOAD=True)
+    @patch("wagtail_redirect_importer.admin_views.cleanup_tmp_storage")
+    def test_upload_triggers_cleanup_when_enabled(self, cleanup_tmp_storage):
+        f = "{}/files/example.csv".format(TEST_ROOT)
+        (_, filename) = os.path.split(f)
+
+        with open(f, "rb") as infile:
+            upload_file = SimpleUploadedFile(filename, infile.read())
+
+            self.post(
+                {
+                    "import_file": upload_file,
+                    "input_format": get_input_format_index_by_name("CSV"),
+                }
+            )
+
+        cleanup_tmp_storage.assert_called_once_with()
+
     def test_permanent_setting(self):
         f = "{}/files/example.csv".format(TEST_ROOT)
         (_, filename) = os.path.split(f)
@@ -165,6 +220,105 @@ class TestRedirectImporterAdminView(TestCase, WagtailTestUtils):
             self.assertEqual(Redirect.objects.count(), 2)
             self.assertEqual(Redirect.objects.first().site, new_site)
 
+    def test_site_column_setting(self):
+        default_site = Site.objects.first()
+        new_site = Site.objects.create(
+            hostname="hello.dev", root_page=default_site.root_page,
+        )
+        upload_file = SimpleUploadedFile(
+            "sites.csv",
+            b"from,to,site\n/alpha,http://a.test/,hello.dev\n/beta,http://b.test/,\n",
+        )
+
+        response = self.post(
+            {
+                "import_file": upload_file,
+                "input_format": get_input_format_index_by_name("CSV"),
+            }
+        )
+
+        self.post_import(
+            {
+                **response.context["form"].initial,
+                "from_index": 0,
+                "to_index": 1,
+                "site_column": 2,
+                "site": default_site.pk,
+                "permanent": True,
+            }
+        )
+
+        self.assertEqual(
+            set(Redirect.objects.values_list("old_path", "site")),
+            {("/alpha", new_site.pk), ("/beta", default_site.pk)},
+        )
+
+    def test_rules_setting(self):
+        upload_file = SimpleUploadedFile(
+            "rules.csv",
+            b"from,to\n/alpha,http://a.test/\n/blog/*/old,http://b.test/\n",
+        )
+
+        response = self.post(
+            {
+                "import_file": upload_file,
+                "input_format": get_input_format_index_by_name("CSV"),
+            }
+        )
+
+        response = self.post_import(
+            {
+                **response.context["form"].initial,
+                "from_index": 0,
+                "to_index": 1,
+                "permanent": True,
+                "rules": True,
+            }
+        )
+
+        self.assertEqual(response.context["import_summary"]["successes"], 2)
+        self.assertEqual(Redirect.objects.get().old_path, "/alpha")
+        self.assertEqual(
+            list(RedirectRule.objects.values_list("pattern", "match_type")),
+            [("/blog/*/old", RedirectRule.WILDCARD)],
+        )
+
+    def test_verify_targets_setting(self):
+        upload_file = SimpleUploadedFile(
+            "targets.csv",
+            b"from,to\n/alpha,http://localhost/\n/beta,http://localhost/missing/\n",
+        )
+
+        response = self.post(
+            {
+                "import_file": upload_file,
+                "input_format": get_input_format_index_by_name("CSV"),
+            }
+        )
+
+        response = self.post_import(
+            {
+                **response.context["form"].initial,
+                "from_index": 0,
+                "to_index": 1,
+                "permanent": True,
+                "verify_targets": True,
+            }
+        )
+
+        self.assertEqual(Redirect.objects.count(), 2)
+        self.assertEqual(
+            response.context["import_summary"]["warnings"],
+            [
+                [
+                    "/beta",
+                    "http://localhost/missing/",
+                    "Target does not match a live page or redirect",
+                ]
+            ],
+        )
+        self.assertContains(response, "Found 1 warnings")
+
     def test_import_xls(self):
         f = "{}/files/example.xls".format(TEST_ROOT)
         (_, filename) = os.path.split(f)
@@ -364,6 +518,96 @@ class TestRedirectImporterAdminView(TestCase, WagtailTestUtils):
 
             self.assertEqual(Redirect.objects.all().count(), 2)
 
+    def test_sync_shows_preview_before_applying(self):
+        Redirect.objects.create(old_path="/stale", redirect_link="http://stale.test/")
+
+        f = "{}/files/example.csv".format(TEST_ROOT)
+        (_, filename) = os.path.split(f)
+
+        with open(f, "rb") as infile:
+            upload_file = SimpleUploadedFile(filename, infile.read())
+
+            response = self.post(
+                {
+                    "import_file": upload_file,
+                    "input_format": get_input_format_index_by_name("CSV"),
+                }
+            )
+
+            preview_response = self.post_import(
+                {
+                    **response.context["form"].initial,
+                    "from_index": 0,
+                    "to_index": 1,
+                    "permanent": True,
+                    "sync": True,
+                }
+            )
+
+            self.assertEqual(
+                preview_response.templates[0].name,
+                "wagtail_redirect_importer/sync_preview.html",
+            )
+            self.assertEqual(
+                preview_response.context["import_summary"]["sync"],
+                {"adds": 2, "updates": 0, "deletes": 1, "unchanged": 0},
+            )
+            self.assertEqual(Redirect.objects.count(), 1)
+
+            preview_form = preview_response.context["form"]
+            import_response = self.post_import(
+                {
+                    name: preview_form[name].value()
+                    for name in preview_form.fields
+                    if preview_form[name].value() is not None
+                }
+            )
+
+            self.assertEqual(
+                import_response.templates[0].name,
+                "wagtail_redirect_importer/import_summary.html",
+            )
+            self.assertEqual(
+                sorted(Redirect.objects.values_list("old_path", flat=True)),
+                ["/goodbye", "/hello"],
+            )
+
+
+class TestRedirectExportAdminView(TestCase, WagtailTestUtils):
+    def setUp(self):
+        self.login()
+        Redirect.objects.create(old_path="/alpha", redirect_link="http://omega.test/")
+
+    def get(self, params={}):
+        return self.client.get(reverse("wagtailredirectimporter:export"), params)
+
+    def test_request_without_format_returns_form(self):
+        response = self.get()
+        self.assertEqual(
+            response.templates[0].name, "wagtail_redirect_importer/export.html",
+        )
+
+    def test_invalid_format_returns_form(self):
+        response = self.get({"format": "numbers"})
+        self.assertTrue("format" in response.context["form"].errors)
+
+    def test_csv_export_is_streamed(self):
+        response = self.get({"format": "csv"})
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(
+            b"".join(response.streaming_content).decode().splitlines(),
+            ["from,to,permanent,site", "/alpha,http://omega.test/,True,"],
+        )
+
+    def test_xlsx_export(self):
+        response = self.get({"format": "xlsx"})
+        content = b"".join(response.streaming_content)
+
+        self.assertIn('filename="redirects.xlsx"', response["Content-Disposition"])
+        self.assertTrue(content.startswith(b"PK"))
+
 
 def get_input_format_index_by_name(name):
     import_formats = get_import_formats()
@@ -0,0 +1,142 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.core.models import Site
+from wagtail.tests.utils import WagtailTestUtils
+
+from ..models import ImportJob
+
+
+CSV_DATA = b"from,to\n/alpha,http://alpha.test/\n/beta,http://beta.test/\n"
+
+
+@override_settings(
+    WAGTAIL_REDIRECT_IMPORTER_RUN_JOBS_INLINE=True,
+    WAGTAIL_REDIRECT_IMPORTER_API_TOKENS={"secret": "importer"},
+)
+class ImportApiTest(TestCase, WagtailTestUtils):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "importer", "importer@example.com", "password"
+        )
+        self.user.user_permissions.add(
+            Permission.objects.get(
+                content_type__app_label="wagtailredirects", codename="add_redirect"
+            )
+        )
+
+    def post(self, data, content_type="text/csv", token="secret", params=""):
+        return self.client.post(
+            reverse("wagtailredirectimporter_api:import") + params,
+            data,
+            content_type=content_type,
+            HTTP_AUTHORIZATION="Bearer {}".format(token),
+        )
+
+    def test_csv_import_returns_job(self):
+        response = self.post(CSV_DATA)
+
+        self.assertEqual(response.status_code, 202)
+        state = response.json()
+        self.assertEqual(state["status"], ImportJob.COMPLETED)
+        self.assertEqual(state["successes"], 2)
+        self.assertEqual(Redirect.objects.count(), 2)
+
+        job = ImportJob.objects.get(pk=state["id"])
+        self.assertEqual(job.user, self.user)
+
+        response = self.client.get(state["url"], HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.json()["summary"]["total"], 2)
+
+    def test_json_lines_import(self):
+        data = (
+            b'{"from": "/alpha", "to": "http://alpha.test/"}\n'
+            b"\n"
+            b'{"from": "/beta", "to": "http://beta.test/"}\n'
+        )
+
+        response = self.post(
+            data, content_type="application/x-ndjson", params="?permanent=false"
+        )
+
+        self.assertEqual(response.json()["successes"], 2)
+        self.assertFalse(Redirect.objects.get(old_path="/alpha").is_permanent)
+
+    def test_columns_and_site_from_query_string(self):
+        site = Site.objects.first()
+        data = b"to,from\nhttp://alpha.test/,/alpha\n"
+
+        response = self.post(
+            data, params="?from_index=1&to_index=0&site={}".format(site.pk)
+        )
+
+        self.assertEqual(response.json()["successes"], 1)
+        self.assertEqual(Redirect.objects.get(old_path="/alpha").site, site)
+
+    def test_invalid_body_is_rejected(self):
+        response = self.post(b"not json\n", content_type="application/x-ndjson")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Line 1", response.json()["error"])
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_out_of_range_column_is_rejected(self):
+        response = self.post(CSV_DATA, params="?to_index=2")
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_integer_params_are_rejected(self):
+        for params, error in [
+            ("?from_index=a", "from_index must be an integer"),
+            ("?site=a", "site must be an integer"),
+        ]:
+            response = self.post(CSV_DATA, params=params)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["error"], error)
+
+    def test_unsupported_content_type(self):
+        self.assertEqual(
+            self.post(b"{}", content_type="application/json").status_code, 415
+        )
+
+    def test_unknown_token_is_rejected(self):
+        response = self.post(CSV_DATA, token="wrong")
+
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Redirect.objects.exists())
+
+    def test_user_needs_add_permission(self):
+        self.user.user_permissions.clear()
+
+        self.assertEqual(self.post(CSV_DATA).status_code, 403)
+
+    def test_session_requests_need_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+
+        response = client.post(
+            reverse("wagtailredirectimporter_api:import"),
+            CSV_DATA,
+            content_type="text/csv",
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Redirect.objects.exists())
+
+    def test_session_requests_with_csrf_token_are_accepted(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        token = "a" * 64
+        client.cookies["csrftoken"] = token
+
+        response = client.post(
+            reverse("wagtailredirectimporter_api:import"),
+            CSV_DATA,
+            content_type="text/csv",
+            HTTP_X_CSRFTOKEN=token,
+        )
+
+        self.assertEqual(response.status_code, 202)
@@ -0,0 +1,121 @@
+import os
+import unittest
+
+import django
+from asgiref.sync import async_to_sync
+from django.conf.urls import include, url
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser, Permission
+from django.core.exceptions import PermissionDenied
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.tests.utils import WagtailTestUtils
+
+from .. import async_views
+from ..utils import get_import_formats
+from .demosite import urls as demosite_urls
+
+
+TEST_ROOT = os.path.abspath(os.path.dirname(__file__))
+
+if django.VERSION >= (3, 1):
+    urlpatterns = [
+        url(
+            r"^admin/redirect-importer/",
+            include("wagtail_redirect_importer.async_urls"),
+        )
+    ] + demosite_urls.urlpatterns
+
+
+def get_csv_post_data():
+    with open("{}/files/example.csv".format(TEST_ROOT), "rb") as infile:
+        upload_file = SimpleUploadedFile("example.csv", infile.read())
+
+    return {
+        "import_file": upload_file,
+        "input_format": [f.__name__ for f in get_import_formats()].index("CSV"),
+    }
+
+
+class AsyncViewsTest(TestCase, WagtailTestUtils):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = self.create_test_user()
+
+    def call(self, view, request, user=None):
+        request.user = user or self.user
+        return async_to_sync(view)(request)
+
+    def test_start_renders_choose_file(self):
+        response = self.call(async_views.start, self.factory.get("/"))
+
+        self.assertContains(response, 'name="import_file"')
+
+    def test_upload_and_import(self):
+        response = self.call(
+            async_views.start, self.factory.post("/", get_csv_post_data())
+        )
+
+        self.assertContains(response, "/hello")
+        self.assertContains(response, 'name="import_file_name"')
+
+        import_file_name = response.content.decode().split(
+            'name="import_file_name" value="'
+        )[1]
+        import_file_name = import_file_name.split('"')[0]
+
+        response = self.call(
+            async_views.import_file,
+            self.factory.post(
+                "/",
+                {
+                    "import_file_name": import_file_name,
+                    "original_file_name": "example.csv",
+                    "input_format": get_csv_post_data()["input_format"],
+                    "from_index": 0,
+                    "to_index": 1,
+                    "permanent": True,
+                },
+            ),
+        )
+
+        self.assertContains(response, "Summary")
+        self.assertEqual(Redirect.objects.count(), 2)
+
+    def test_anonymous_user_is_redirected_to_login(self):
+        response = self.call(
+            async_views.start, self.factory.get("/"), user=AnonymousUser()
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("login", response.url)
+
+    def test_user_without_add_permission_is_denied(self):
+        user = get_user_model().objects.create_user(
+            "editor", "editor@example.com", "password"
+        )
+        user.user_permissions.add(Permission.objects.get(codename="access_admin"))
+        request = self.factory.get("/", HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+
+        with self.assertRaises(PermissionDenied):
+            self.call(async_views.start, request, user=user)
+
+    def test_import_requires_post(self):
+        response = self.call(async_views.import_file, self.factory.get("/"))
+
+        self.assertEqual(response.status_code, 405)
+
+
+@unittest.skipUnless(django.VERSION >= (3, 1), "Async views require Django 3.1+")
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncUrlsTest(TestCase, WagtailTestUtils):
+    def setUp(self):
+        self.login()
+
+    def test_async_view_shadows_start(self):
+        response = self.client.post("/admin/redirect-importer/", get_csv_post_data())
+
+        self.assertEqual(
+            response.templates[0].name, "wagtail_redirect_importer/confirm_import.html"
+        )
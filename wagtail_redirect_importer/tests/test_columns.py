@@ -0,0 +1,116 @@
+import tablib
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from wagtail.tests.utils import WagtailTestUtils
+
+from ..base_formats import CSV, JSON
+from ..columns import HIGH, LOW, MEDIUM, get_sample, guess_columns
+from ..utils import get_import_formats
+
+
+class GuessColumnsTest(SimpleTestCase):
+    def guess(self, headers, rows):
+        return guess_columns(tablib.Dataset(*rows, headers=headers))
+
+    def test_paths_and_urls_are_picked(self):
+        guess = self.guess(
+            ["notes", "target", "path"],
+            [
+                ["moved", "http://a.test/new/", "/old/"],
+                ["gone", "https://b.test/", "/older/"],
+            ],
+        )
+
+        self.assertEqual((guess.from_index, guess.to_index), (2, 1))
+        self.assertEqual(guess.confidence, HIGH)
+
+    def test_headers_break_ties(self):
+        guess = self.guess(
+            ["a", "to", "from"],
+            [["/x/", "http://a.test/", "/y/"], ["/z/", "http://b.test/", "/w/"]],
+        )
+
+        self.assertEqual((guess.from_index, guess.to_index), (2, 1))
+
+    def test_similar_columns_lower_confidence(self):
+        guess = self.guess(
+            ["a", "b", "c"],
+            [["/x/", "http://a.test/", "/y/"], ["/z/", "http://b.test/", "/w/"]],
+        )
+
+        self.assertEqual((guess.from_index, guess.to_index), (0, 1))
+        self.assertEqual(guess.confidence, MEDIUM)
+
+    def test_unrecognised_values_have_low_confidence(self):
+        guess = self.guess(["a", "b"], [["one two", "three four"]])
+
+        self.assertEqual(guess.confidence, LOW)
+
+    def test_single_column_is_not_guessed(self):
+        self.assertIsNone(self.guess(["a"], [["/x/"]]))
+
+
+class GetSampleTest(SimpleTestCase):
+    def test_csv_parses_only_sample_lines(self):
+        data = "from,to\n" + "".join(
+            "/{},http://a.test/\n".format(i) for i in range(10)
+        )
+
+        sample = get_sample(CSV(), data, size=3)
+
+        self.assertEqual(sample.headers, ["from", "to"])
+        self.assertEqual([row[0] for row in sample], ["/0", "/1", "/2"])
+
+    def test_cut_inside_quoted_value_falls_back_to_full_parse(self):
+        data = 'from,to\n"/a\n/b",http://a.test/\n/c,http://c.test/\n'
+
+        sample = get_sample(CSV(), data, size=1)
+
+        self.assertEqual(sample[0], ("/a\n/b", "http://a.test/"))
+
+    def test_escaped_quotes_in_multiline_values(self):
+        data = (
+            'from,to\n"/a ""x""\n/b\n/c",http://a.test/\n'
+            '/d,"http://d.test/"\n/e,http://e.test/\n'
+        )
+
+        sample = get_sample(CSV(), data, size=2)
+
+        self.assertEqual(
+            list(sample),
+            [('/a "x"\n/b\n/c', "http://a.test/"), ("/d", "http://d.test/")],
+        )
+
+    def test_other_formats_are_sliced(self):
+        data = '[{"from": "/a", "to": "http://a.test/"}, {"from": "/b", "to": "x"}]'
+
+        sample = get_sample(JSON(), data, size=1)
+
+        self.assertEqual(len(sample), 1)
+        self.assertEqual(sample.headers, ["from", "to"])
+
+
+class ConfirmColumnsTest(TestCase, WagtailTestUtils):
+    def setUp(self):
+        self.login()
+
+    def test_guessed_columns_are_preselected(self):
+        upload_file = SimpleUploadedFile(
+            "redirects.csv", b"target,path\nhttp://a.test/,/a/\nhttp://b.test/,/b/\n",
+        )
+
+        response = self.client.post(
+            reverse("wagtailredirectimporter:start"),
+            {
+                "import_file": upload_file,
+                "input_format": [f.__name__ for f in get_import_formats()].index("CSV"),
+            },
+        )
+
+        form = response.context["form"]
+        self.assertEqual(
+            (form.initial["from_index"], form.initial["to_index"]), ("1", "0")
+        )
+        self.assertEqual(response.context["column_guess"].confidence, HIGH)
+        self.assertContains(response, "rows, confidence: high.")
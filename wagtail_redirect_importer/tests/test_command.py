@@ -1,14 +1,20 @@
 from io import StringIO
+import csv
+import json
 import os
 import tempfile
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.core.management import call_command
+from django.db.models.signals import post_save
 from django.core.management.base import CommandError
-from wagtail.core.models import Site
+from wagtail.core.models import Page, Site
 from wagtail.contrib.redirects.models import Redirect
 
+from ..models import RedirectRule
+from ..plans import apply_plan
+from ..signals import redirects_imported
 
 TEST_ROOT = os.path.abspath(os.path.dirname(__file__))
 
@@ -166,6 +172,24 @@ class ImportRedirectsCommandTest(TestCase):
 
         self.assertEqual(Redirect.objects.count(), 1)
 
+    @override_settings(WAGTAIL_REDIRECT_IMPORTER_DISK_INDEX_THRESHOLD=1)
+    def test_duplicates_are_found_with_disk_index(self):
+        Redirect.objects.create(old_path="/alpha")
+        source = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        source.write("from,to\n")
+        source.write("/alpha/,http://omega.test/\n")
+        source.write("/beta/,http://omega.test/\n")
+        source.write("/gamma/,http://omega.test/\n")
+        source.write("/beta/,http://omega2.test/\n")
+        source.seek(0)
+
+        out = StringIO()
+        call_command("import_redirects", src=source.name, format="csv", stdout=out)
+
+        self.assertIn("Created: 2", out.getvalue())
+        self.assertIn("Errors: 2", out.getvalue())
+        self.assertEqual(Redirect.objects.count(), 3)
+
     def test_non_absolute_to_links_get_skipped(self):
         invalid_file = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
         invalid_file.write("from,to\n")
@@ -332,3 +356,570 @@ class ImportRedirectsCommandTest(TestCase):
         self.assertEqual(redirects[0].old_path, "/one")
         self.assertEqual(redirects[0].redirect_link, "http://one.test/")
         self.assertEqual(redirects[0].is_permanent, True)
+
+    def test_sync_replaces_site_redirects(self):
+        Redirect.objects.create(old_path="/stale", redirect_link="http://stale.test/")
+        Redirect.objects.create(old_path="/one", redirect_link="http://one.test/")
+
+        invalid_file = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        invalid_file.write("from,to\n")
+        invalid_file.write("/one,http://one.test/\n")
+        invalid_file.write("/two,http://two.test/")
+        invalid_file.seek(0)
+
+        out = StringIO()
+        call_command(
+            "import_redirects",
+            src=invalid_file.name,
+            format="csv",
+            sync=True,
+            stdout=out,
+        )
+
+        self.assertEqual(
+            sorted(Redirect.objects.values_list("old_path", flat=True)),
+            ["/one", "/two"],
+        )
+        self.assertIn("Add: 1", out.getvalue())
+        self.assertIn("Delete: 1", out.getvalue())
+        self.assertIn("Unchanged: 1", out.getvalue())
+
+    def test_sync_dry_run_only_shows_preview(self):
+        Redirect.objects.create(old_path="/stale", redirect_link="http://stale.test/")
+
+        invalid_file = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        invalid_file.write("from,to\n")
+        invalid_file.write("/one,http://one.test/")
+        invalid_file.seek(0)
+
+        out = StringIO()
+        call_command(
+            "import_redirects",
+            src=invalid_file.name,
+            format="csv",
+            sync=True,
+            dry_run=True,
+            stdout=out,
+        )
+
+        self.assertEqual(Redirect.objects.get().old_path, "/stale")
+        self.assertIn("Delete: 1", out.getvalue())
+
+    def test_sync_can_not_be_combined_with_limit(self):
+        f = "{}/files/example.csv".format(TEST_ROOT)
+
+        with self.assertRaisesMessage(
+            Exception, "Sync can not be combined with offset or limit"
+        ):
+            call_command(
+                "import_redirects", src=f, sync=True, limit=1, stdout=StringIO()
+            )
+
+    def test_plan_does_not_create_redirects(self):
+        invalid_file = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        invalid_file.write("from,to\n")
+        invalid_file.write("/alpha,http://omega.test/\n")
+        invalid_file.write("/alpha/,http://omega2.test/\n")
+        invalid_file.write("/beta,/omega/")
+        invalid_file.seek(0)
+        plan_file = tempfile.NamedTemporaryFile(suffix=".plan")
+
+        out = StringIO()
+        call_command(
+            "import_redirects",
+            src=invalid_file.name,
+            format="csv",
+            plan=plan_file.name,
+            stdout=out,
+        )
+
+        self.assertEqual(Redirect.objects.count(), 0)
+        self.assertIn("Create: 1", out.getvalue())
+        self.assertIn("Duplicates: 1", out.getvalue())
+        self.assertIn("Errors: 1", out.getvalue())
+
+    def test_apply_creates_planned_redirects(self):
+        Redirect.objects.create(old_path="/existing", redirect_link="http://e.test/")
+
+        invalid_file = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        invalid_file.write("from,to\n")
+        invalid_file.write("/alpha/,http://omega.test/\n")
+        invalid_file.write("/existing,http://omega.test/")
+        invalid_file.seek(0)
+        plan_file = tempfile.NamedTemporaryFile(suffix=".plan")
+
+        call_command(
+            "import_redirects",
+            src=invalid_file.name,
+            format="csv",
+            permanent=False,
+            plan=plan_file.name,
+            stdout=StringIO(),
+        )
+
+        out = StringIO()
+        call_command("import_redirects", apply=plan_file.name, stdout=out)
+
+        self.assertIn("Created: 1", out.getvalue())
+        redirect = Redirect.objects.get(old_path="/alpha")
+        self.assertEqual(redirect.redirect_link, "http://omega.test/")
+        self.assertFalse(redirect.is_permanent)
+
+    def test_apply_rejects_paths_taken_since_planning(self):
+        source = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        source.write("from,to\n/alpha,http://omega.test/\n/beta,http://beta.test/")
+        source.seek(0)
+        plan_file = tempfile.NamedTemporaryFile(suffix=".plan")
+        call_command(
+            "import_redirects",
+            src=source.name,
+            format="csv",
+            plan=plan_file.name,
+            stdout=StringIO(),
+        )
+        Redirect.objects.create(old_path="/beta", redirect_link="http://b.test/")
+
+        with self.assertRaisesMessage(Exception, "conflicts with existing redirects"):
+            call_command("import_redirects", apply=plan_file.name, stdout=StringIO())
+
+        self.assertEqual(Redirect.objects.get().old_path, "/beta")
+
+    def test_apply_commits_every_batch(self):
+        source = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        source.write("from,to\n/alpha,http://omega.test/\n/beta,http://beta.test/")
+        source.seek(0)
+        plan_file = tempfile.NamedTemporaryFile(suffix=".plan")
+        call_command(
+            "import_redirects",
+            src=source.name,
+            format="csv",
+            plan=plan_file.name,
+            stdout=StringIO(),
+        )
+
+        calls = []
+
+        def on_import(sender, created, **kwargs):
+            calls.append(Redirect.objects.filter(pk__in=created).count())
+
+        redirects_imported.connect(on_import, weak=False)
+        self.addCleanup(redirects_imported.disconnect, on_import)
+
+        self.assertEqual(apply_plan(plan_file.name, batch_size=1), 2)
+        self.assertEqual(calls, [1, 1])
+
+    def test_apply_rejects_invalid_plan(self):
+        invalid_file = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        invalid_file.write("from,to\n")
+        invalid_file.seek(0)
+
+        with self.assertRaisesMessage(Exception, "is not a valid import plan"):
+            call_command("import_redirects", apply=invalid_file.name, stdout=StringIO())
+
+    def test_rows_are_only_written_with_high_verbosity(self):
+        invalid_file = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        invalid_file.write("from,to\n")
+        invalid_file.write("/alpha,http://omega.test/")
+        invalid_file.seek(0)
+
+        out = StringIO()
+        call_command(
+            "import_redirects", src=invalid_file.name, format="csv", stdout=out
+        )
+        self.assertNotIn("1. /alpha -> http://omega.test/", out.getvalue())
+
+        Redirect.objects.all().delete()
+        out = StringIO()
+        call_command(
+            "import_redirects",
+            src=invalid_file.name,
+            format="csv",
+            verbosity=3,
+            stdout=out,
+        )
+        self.assertIn("1. /alpha -> http://omega.test/", out.getvalue())
+
+    def test_progress_is_written(self):
+        f = "{}/files/example.csv".format(TEST_ROOT)
+
+        out = StringIO()
+        call_command("import_redirects", src=f, progress_interval=0, stdout=out)
+
+        self.assertIn("Processed 3/3 rows", out.getvalue())
+        self.assertIn("1 errors", out.getvalue())
+
+    def test_errors_are_written_to_error_file(self):
+        f = "{}/files/example.csv".format(TEST_ROOT)
+        error_file = tempfile.NamedTemporaryFile(suffix=".csv")
+
+        call_command(
+            "import_redirects", src=f, error_file=error_file.name, stdout=StringIO()
+        )
+
+        with open(error_file.name) as fh:
+            rows = list(csv.reader(fh))
+        self.assertEqual(rows[0], ["row", "from", "to", "error"])
+        self.assertEqual(rows[1][:3], ["3", "/goodbye", "/cake/"])
+        self.assertEqual(len(rows), 2)
+
+    def write_files(self, directory, files):
+        for name, content in files.items():
+            with open(os.path.join(directory, name), "w") as f:
+                f.write(content)
+
+    def test_multiple_files_are_imported(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_files(
+                directory,
+                {
+                    "one.csv": "from,to\n/alpha,http://alpha.test/",
+                    "two.csv": "from,to\n/beta,http://beta.test/",
+                },
+            )
+
+            call_command(
+                "import_redirects",
+                src=[
+                    os.path.join(directory, "one.csv"),
+                    os.path.join(directory, "two.csv"),
+                ],
+                stdout=StringIO(),
+            )
+
+        self.assertEqual(Redirect.objects.count(), 2)
+
+    def test_duplicates_are_found_across_files_on_dry_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_files(
+                directory,
+                {
+                    "one.csv": "from,to\n/alpha,http://alpha.test/",
+                    "two.csv": "from,to\n/alpha/,http://beta.test/",
+                },
+            )
+
+            out = StringIO()
+            call_command(
+                "import_redirects", src=[directory], dry_run=True, stdout=out,
+            )
+
+        self.assertIn("Created: 1", out.getvalue())
+        self.assertIn("Errors: 1", out.getvalue())
+
+    def test_directory_and_glob_sources(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_files(
+                directory,
+                {
+                    "one.csv": "from,to\n/alpha,http://alpha.test/",
+                    "two.tsv": "from\tto\n/beta\thttp://beta.test/",
+                    "notes.txt": "not a redirect file",
+                },
+            )
+
+            call_command("import_redirects", src=[directory], stdout=StringIO())
+            self.assertEqual(Redirect.objects.count(), 2)
+
+            Redirect.objects.all().delete()
+            call_command(
+                "import_redirects",
+                src=[os.path.join(directory, "*.csv")],
+                stdout=StringIO(),
+            )
+            self.assertEqual(Redirect.objects.count(), 1)
+
+    def test_files_can_be_read_in_parallel(self):
+        files = {
+            "{}.csv".format(i): "from,to\n/{},http://{}.test/".format(i, i)
+            for i in range(5)
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_files(directory, files)
+
+            call_command(
+                "import_redirects", src=[directory], workers=2, stdout=StringIO()
+            )
+
+        self.assertEqual(
+            sorted(Redirect.objects.values_list("old_path", flat=True)),
+            ["/0", "/1", "/2", "/3", "/4"],
+        )
+
+    def test_missing_glob_raises_error(self):
+        with self.assertRaisesMessage(Exception, "Missing file 'random*.csv'"):
+            call_command("import_redirects", src=["random*.csv"], stdout=StringIO())
+
+    def test_site_column_is_used(self):
+        current_site = Site.objects.first()
+        site = Site.objects.create(
+            hostname="random.test", port=8080, root_page=current_site.root_page
+        )
+
+        invalid_file = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        invalid_file.write("from,to,site\n")
+        invalid_file.write("/alpha,http://omega.test/,random.test:8080\n")
+        invalid_file.write("/alpha,http://omega.test/,localhost\n")
+        invalid_file.write("/beta,http://omega.test/,\n")
+        invalid_file.write("/gamma,http://omega.test/,unknown.test")
+        invalid_file.seek(0)
+
+        out = StringIO()
+        call_command(
+            "import_redirects",
+            src=invalid_file.name,
+            format="csv",
+            site_column=2,
+            stdout=out,
+        )
+
+        self.assertEqual(
+            set(Redirect.objects.values_list("old_path", "site")),
+            {("/alpha", site.pk), ("/alpha", current_site.pk), ("/beta", None)},
+        )
+        self.assertIn("Errors: 1", out.getvalue())
+
+    def test_targets_are_resolved_to_pages(self):
+        home = Site.objects.get(is_default_site=True).root_page
+        about = home.add_child(instance=Page(title="About", slug="about"))
+
+        invalid_file = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        invalid_file.write("from,to\n")
+        invalid_file.write("/alpha,http://localhost/about/\n")
+        invalid_file.write("/beta,/about/\n")
+        invalid_file.write("/gamma,http://omega.test/")
+        invalid_file.seek(0)
+
+        call_command(
+            "import_redirects",
+            src=invalid_file.name,
+            format="csv",
+            resolve_pages=True,
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(
+            set(
+                Redirect.objects.values_list(
+                    "old_path", "redirect_page", "redirect_link"
+                )
+            ),
+            {
+                ("/alpha", about.pk, ""),
+                ("/beta", about.pk, ""),
+                ("/gamma", None, "http://omega.test/"),
+            },
+        )
+
+    def test_bulk_import_sends_redirects_imported(self):
+        source = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        source.write("from,to\n")
+        source.write("/alpha,http://omega.test/\n")
+        source.write("/beta,http://omega.test/\n")
+        source.seek(0)
+
+        saved = []
+        created = []
+
+        def on_save(sender, **kwargs):
+            saved.append(kwargs["instance"])
+
+        def on_import(sender, **kwargs):
+            created.extend(kwargs["created"])
+
+        post_save.connect(on_save, sender=Redirect, weak=False)
+        redirects_imported.connect(on_import, weak=False)
+        self.addCleanup(post_save.disconnect, on_save, sender=Redirect)
+        self.addCleanup(redirects_imported.disconnect, on_import)
+
+        call_command(
+            "import_redirects",
+            src=source.name,
+            format="csv",
+            bulk=True,
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(saved, [])
+        self.assertEqual(
+            sorted(created), sorted(Redirect.objects.values_list("pk", flat=True))
+        )
+        self.assertEqual(len(created), 2)
+
+    def test_broken_internal_targets_are_reported(self):
+        source = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        source.write("from,to\n")
+        source.write("/alpha,http://localhost/beta/\n")
+        source.write("/beta,http://localhost/\n")
+        source.write("/gamma,http://localhost/missing/\n")
+        source.write("/delta,http://omega.test/missing/\n")
+        source.seek(0)
+
+        out = StringIO()
+        call_command(
+            "import_redirects",
+            src=source.name,
+            format="csv",
+            verify_targets=True,
+            stdout=out,
+        )
+
+        self.assertIn("3. Warning: /gamma -> http://localhost/missing/", out.getvalue())
+        self.assertIn("Warnings: 1", out.getvalue())
+        self.assertEqual(Redirect.objects.count(), 4)
+
+    def test_commit_modes(self):
+        source = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        source.write("from,to\n")
+        for i in range(5):
+            source.write("/{},http://omega.test/\n".format(i))
+        source.seek(0)
+
+        for commit in ["batch", "file"]:
+            Redirect.objects.all().delete()
+            out = StringIO()
+            call_command(
+                "import_redirects",
+                src=source.name,
+                format="csv",
+                commit=commit,
+                batch_size=2,
+                stdout=out,
+            )
+
+            self.assertIn("Created: 5", out.getvalue())
+            self.assertEqual(Redirect.objects.count(), 5)
+
+    def test_invalid_permanent_value_is_reported(self):
+        source = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        source.write("from,to,permanent\n")
+        source.write("/one,http://one.test/,maybe\n/two,http://two.test/,\n")
+        source.seek(0)
+
+        out = StringIO()
+        call_command(
+            "import_redirects",
+            src=source.name,
+            format="csv",
+            permanent=False,
+            permanent_column=2,
+            verbosity=3,
+            stdout=out,
+        )
+
+        self.assertIn("Invalid permanent value 'maybe'", out.getvalue())
+        self.assertFalse(Redirect.objects.get().is_permanent)
+
+    def test_rule_rows_are_imported_as_rules(self):
+        source = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        source.write("from,to\n")
+        source.write("/alpha,http://omega.test/\n")
+        source.write("/blog/2015/*,http://archive.test/\n")
+        source.write("^/news/(\\d+$,http://news.test/\n")
+        source.seek(0)
+
+        out = StringIO()
+        call_command(
+            "import_redirects", src=source.name, format="csv", rules=True, stdout=out
+        )
+
+        self.assertIn("Created: 2", out.getvalue())
+        self.assertIn("Errors: 1", out.getvalue())
+        self.assertEqual(Redirect.objects.get().old_path, "/alpha")
+        rule = RedirectRule.objects.get()
+        self.assertEqual(rule.pattern, "/blog/2015/")
+        self.assertEqual(rule.match_type, RedirectRule.PREFIX)
+        self.assertEqual(rule.redirect_link, "http://archive.test/")
+
+    def test_rules_can_not_be_combined_with_sync(self):
+        source = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        source.write("from,to\n/alpha,http://omega.test/\n")
+        source.seek(0)
+
+        with self.assertRaisesMessage(Exception, "Rules can not be combined"):
+            call_command(
+                "import_redirects",
+                src=source.name,
+                format="csv",
+                rules=True,
+                sync=True,
+                stdout=StringIO(),
+            )
+
+
+class ExportRedirectsCommandTest(TestCase):
+    def setUp(self):
+        self.site = Site.objects.first()
+        Redirect.objects.create(
+            old_path="/alpha", redirect_link="http://omega.test/", site=self.site
+        )
+        Redirect.objects.create(
+            old_path="/beta", redirect_page=self.site.root_page, is_permanent=False
+        )
+
+    def test_csv_gets_written_to_stdout(self):
+        out = StringIO()
+        call_command("export_redirects", stdout=out, chunk_size=1)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], "from,to,permanent,site")
+        self.assertEqual(lines[1], "/alpha,http://omega.test/,True,localhost")
+        self.assertEqual(lines[2], "/beta,http://localhost/,False,")
+
+    def test_site_filter(self):
+        out = StringIO()
+        call_command("export_redirects", site_id=self.site.pk, stdout=out)
+
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+    def test_format_gets_picked_up_from_file_extension(self):
+        dst = tempfile.NamedTemporaryFile(suffix=".jsonl")
+
+        call_command("export_redirects", dst=dst.name, stdout=StringIO())
+
+        with open(dst.name) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(
+            rows[0],
+            {
+                "from": "/alpha",
+                "to": "http://omega.test/",
+                "permanent": True,
+                "site": "localhost",
+            },
+        )
+
+    def test_exported_file_can_be_imported(self):
+        Redirect.objects.create(
+            old_path="/gamma",
+            redirect_link="http://gamma.test/",
+            is_permanent=False,
+            site=self.site,
+        )
+        fields = (
+            "old_path",
+            "redirect_link",
+            "is_permanent",
+            "site_id",
+            "redirect_page_id",
+        )
+        exported = set(Redirect.objects.values_list(*fields))
+
+        for extension in ["csv", "tsv", "xlsx"]:
+            dst = tempfile.NamedTemporaryFile(suffix="." + extension)
+            call_command("export_redirects", dst=dst.name, stdout=StringIO())
+
+            Redirect.objects.all().delete()
+            call_command(
+                "import_redirects",
+                src=dst.name,
+                permanent_column=2,
+                site_column=3,
+                resolve_pages=True,
+                stdout=StringIO(),
+            )
+
+            self.assertEqual(set(Redirect.objects.values_list(*fields)), exported)
+
+    def test_binary_format_requires_dst(self):
+        with self.assertRaisesMessage(Exception, "Format 'xlsx' requires --dst"):
+            call_command("export_redirects", format="xlsx", stdout=StringIO())
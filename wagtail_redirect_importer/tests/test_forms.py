@@ -30,3 +30,22 @@ class ConfirmImportFormTest(TestCase):
         first_choice = form.fields["from_index"].choices[0]
         self.assertNotEqual(first_choice[0], "")
         self.assertNotEqual(first_choice[1], "---")
+
+    def test_sync_can_not_be_combined_with_linking_to_pages(self):
+        form = ConfirmImportForm(
+            headers=["from", "to"],
+            data={
+                "from_index": "0",
+                "to_index": "1",
+                "sync": True,
+                "resolve_pages": True,
+                "import_file_name": "redirects.csv",
+                "original_file_name": "redirects.csv",
+                "input_format": "0",
+            },
+        )
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(
+            form.non_field_errors(), ["Sync can not be combined with linking to pages"]
+        )
@@ -0,0 +1,356 @@
+from django.db import router
+from django.db.models.signals import post_save
+from django.test import SimpleTestCase, TestCase, override_settings
+from wagtail.contrib.redirects.forms import RedirectForm
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.core.models import Page, Site
+
+from ..importer import (
+    DiskPathSet,
+    ExistingRedirectIndex,
+    InternalTargetChecker,
+    PageUrlIndex,
+    RedirectWriter,
+    SiteResolver,
+    get_duplicate_error,
+)
+from ..signals import redirects_imported
+
+
+class ExistingRedirectIndexTest(TestCase):
+    def test_paths_are_loaded_per_site(self):
+        site = Site.objects.first()
+        Redirect.objects.create(old_path="/alpha")
+        Redirect.objects.create(old_path="/beta", site=site)
+
+        index = ExistingRedirectIndex()
+
+        self.assertTrue(index.contains(None, "/alpha"))
+        self.assertFalse(index.contains(None, "/beta"))
+        self.assertTrue(index.contains(site, "/beta"))
+
+    def test_paths_are_only_loaded_once(self):
+        index = ExistingRedirectIndex()
+        index.add(None, "/alpha")
+
+        with self.assertNumQueries(0):
+            self.assertTrue(index.contains(None, "/alpha"))
+
+    def test_paths_move_to_disk_above_threshold(self):
+        site = Site.objects.first()
+        for path in ["/alpha", "/beta", "/gamma"]:
+            Redirect.objects.create(old_path=path)
+        Redirect.objects.create(old_path="/delta", site=site)
+
+        index = ExistingRedirectIndex(chunk_size=1, max_paths=2)
+
+        self.assertTrue(index.contains(None, "/gamma"))
+        self.assertIsNotNone(index.disk)
+        self.assertEqual(index.paths, {})
+
+        self.assertFalse(index.contains(None, "/delta"))
+        self.assertTrue(index.contains(site, "/delta"))
+        self.assertFalse(index.contains(site, "/alpha"))
+
+        index.add(None, "/epsilon")
+        self.assertTrue(index.contains(None, "/epsilon"))
+        index.close()
+
+    def test_added_paths_move_to_disk_above_threshold(self):
+        index = ExistingRedirectIndex(max_paths=1)
+        index.add(None, "/alpha")
+        self.assertIsNone(index.disk)
+
+        index.add(None, "/beta")
+
+        self.assertIsNotNone(index.disk)
+        self.assertTrue(index.contains(None, "/alpha"))
+        self.assertTrue(index.contains(None, "/beta"))
+
+
+class DiskPathSetTest(SimpleTestCase):
+    def test_paths_are_kept_per_site(self):
+        paths = DiskPathSet(chunk_size=2)
+        paths.update(None, ["/alpha", "/beta", "/gamma", "/alpha"])
+        paths.add(1, "/alpha")
+
+        self.assertTrue(paths.contains(None, "/gamma"))
+        self.assertTrue(paths.contains(1, "/alpha"))
+        self.assertFalse(paths.contains(1, "/beta"))
+        self.assertFalse(paths.contains(2, "/alpha"))
+        paths.close()
+
+
+class RedirectWriterTest(TestCase):
+    def setUp(self):
+        self.saved = []
+        self.batches = []
+
+        def on_save(sender, instance, **kwargs):
+            self.saved.append(instance.pk)
+
+        def on_import(sender, created, updated, deleted, **kwargs):
+            self.batches.append(sorted(created))
+
+        post_save.connect(on_save, sender=Redirect, weak=False)
+        redirects_imported.connect(on_import, weak=False)
+        self.addCleanup(post_save.disconnect, on_save, sender=Redirect)
+        self.addCleanup(redirects_imported.disconnect, on_import)
+
+    def write(self, writer, paths):
+        for path in paths:
+            writer.add(Redirect(old_path=path, redirect_link="http://a.test/"))
+        writer.flush()
+
+    def get_ids(self, paths):
+        return sorted(
+            Redirect.objects.filter(old_path__in=paths).values_list("pk", flat=True)
+        )
+
+    def test_bulk_mode_sends_one_signal_per_batch(self):
+        self.write(RedirectWriter(bulk=True, batch_size=2), ["/a", "/b", "/c"])
+
+        self.assertEqual(self.saved, [])
+        self.assertEqual(
+            self.batches, [self.get_ids(["/a", "/b"]), self.get_ids(["/c"])]
+        )
+
+    def test_default_mode_also_sends_post_save(self):
+        self.write(RedirectWriter(batch_size=2), ["/a", "/b", "/c"])
+
+        self.assertEqual(sorted(self.saved), self.get_ids(["/a", "/b", "/c"]))
+        self.assertEqual(
+            self.batches, [self.get_ids(["/a", "/b"]), self.get_ids(["/c"])]
+        )
+
+
+class RedirectWriterCommitTest(TestCase):
+    def setUp(self):
+        self.site = Site.objects.first()
+        Redirect.objects.create(old_path="/taken", site=self.site)
+
+    def write(self, writer, paths):
+        with writer:
+            for path in paths:
+                writer.add(
+                    Redirect(old_path=path, site=self.site, redirect_link="http://a/"),
+                    path,
+                )
+
+    def assertFailedRowsAreIsolated(self, writer):
+        self.write(writer, ["/a", "/taken", "/b", "/c", "/taken", "/d"])
+
+        self.assertEqual([row for row, error in writer.failed], ["/taken", "/taken"])
+        self.assertIn("could not be saved", writer.failed[0][1])
+        self.assertEqual(
+            set(Redirect.objects.values_list("old_path", flat=True)),
+            {"/taken", "/a", "/b", "/c", "/d"},
+        )
+
+    def test_row_commit(self):
+        self.assertFailedRowsAreIsolated(RedirectWriter(batch_size=4))
+
+    def test_batch_commit(self):
+        self.assertFailedRowsAreIsolated(RedirectWriter(batch_size=4, commit="batch"))
+
+    def test_bulk_batches_are_bisected(self):
+        self.assertFailedRowsAreIsolated(
+            RedirectWriter(bulk=True, batch_size=4, commit="batch")
+        )
+
+    def test_file_commit_is_rolled_back_on_errors(self):
+        writer = RedirectWriter(bulk=True, batch_size=2, commit="file")
+
+        with self.assertRaises(KeyError):
+            with writer:
+                writer.add(Redirect(old_path="/a", redirect_link="http://a/"))
+                writer.add(Redirect(old_path="/b", redirect_link="http://a/"))
+                raise KeyError
+
+        self.assertEqual(Redirect.objects.count(), 1)
+
+    def test_file_commit_sends_signals_after_commit(self):
+        batches = []
+
+        def on_import(sender, created, **kwargs):
+            batches.append(len(created))
+
+        redirects_imported.connect(on_import, weak=False)
+        self.addCleanup(redirects_imported.disconnect, on_import)
+
+        writer = RedirectWriter(bulk=True, batch_size=2, commit="file")
+        with writer:
+            for path in ["/a", "/b", "/c"]:
+                writer.add(Redirect(old_path=path, redirect_link="http://a/"))
+            self.assertEqual(batches, [])
+
+        self.assertEqual(batches, [2, 1])
+
+    def test_unknown_commit_mode(self):
+        with self.assertRaises(ValueError):
+            RedirectWriter(commit="never")
+
+    def test_updates_are_written_per_batch(self):
+        taken = Redirect.objects.get()
+        reported = []
+
+        def on_import(sender, updated, **kwargs):
+            reported.append(list(updated))
+
+        redirects_imported.connect(on_import, weak=False)
+        self.addCleanup(redirects_imported.disconnect, on_import)
+
+        for mode in [{"commit": "batch"}, {"bulk": True}, {}]:
+            reported.clear()
+            with RedirectWriter(**mode) as writer:
+                writer.update(
+                    Redirect(
+                        old_path="/taken",
+                        site=self.site,
+                        redirect_link="http://{}/".format(len(mode)),
+                        is_permanent=False,
+                    ),
+                    "/taken",
+                )
+                writer.update(Redirect(old_path="/gone", site=self.site), "/gone")
+
+            taken.refresh_from_db()
+            self.assertEqual(taken.redirect_link, "http://{}/".format(len(mode)))
+            self.assertFalse(taken.is_permanent)
+            self.assertEqual(reported, [[taken.pk]])
+            self.assertEqual(
+                writer.failed, [("/gone", "The redirect no longer exists.")]
+            )
+
+
+class SiteResolverTest(TestCase):
+    def setUp(self):
+        root_page = Site.objects.first().root_page
+        self.a = Site.objects.create(hostname="a.test", root_page=root_page)
+        self.a_8080 = Site.objects.create(
+            hostname="a.test", port=8080, root_page=root_page
+        )
+        self.b_8000 = Site.objects.create(
+            hostname="b.test", port=8000, root_page=root_page
+        )
+
+    def test_sites_are_resolved_without_queries(self):
+        resolver = SiteResolver()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver.resolve("a.test"), (self.a, None))
+            self.assertEqual(resolver.resolve(" A.test:8080 "), (self.a_8080, None))
+            self.assertEqual(resolver.resolve("b.test"), (self.b_8000, None))
+            self.assertEqual(resolver.resolve("b.test:8000"), (self.b_8000, None))
+
+    def test_empty_value_resolves_to_default(self):
+        resolver = SiteResolver(default=self.a)
+
+        self.assertEqual(resolver.resolve(""), (self.a, None))
+        self.assertEqual(resolver.resolve(None), (self.a, None))
+
+    def test_unknown_site_returns_error(self):
+        site, error = SiteResolver().resolve("c.test")
+
+        self.assertIsNone(site)
+        self.assertIn("Unknown site 'c.test'", error)
+
+
+class PageUrlIndexTest(TestCase):
+    def setUp(self):
+        self.site = Site.objects.get(is_default_site=True)
+        self.home = self.site.root_page
+        self.about = self.home.add_child(instance=Page(title="About", slug="about"))
+        self.draft = self.home.add_child(
+            instance=Page(title="Draft", slug="draft", live=False)
+        )
+        self.other_site = Site.objects.create(
+            hostname="other.test", port=8080, root_page=self.about
+        )
+
+    def test_absolute_urls_are_resolved(self):
+        index = PageUrlIndex()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(index.resolve("http://localhost/"), self.home.pk)
+            self.assertEqual(index.resolve("http://localhost/about/"), self.about.pk)
+            self.assertEqual(index.resolve("https://localhost/about"), self.about.pk)
+            self.assertEqual(index.resolve("http://other.test:8080/"), self.about.pk)
+
+    def test_relative_urls_are_resolved_against_site(self):
+        index = PageUrlIndex()
+
+        self.assertEqual(index.resolve("/about/"), self.about.pk)
+        self.assertEqual(index.resolve("/", self.other_site), self.about.pk)
+
+    def test_unknown_urls_are_not_resolved(self):
+        index = PageUrlIndex()
+
+        self.assertIsNone(index.resolve("http://localhost/missing/"))
+        self.assertIsNone(index.resolve("http://localhost/draft/"))
+        self.assertIsNone(index.resolve("http://localhost/about/?page=2"))
+        self.assertIsNone(index.resolve("http://unknown.test/about/"))
+        self.assertIsNone(index.resolve(None))
+
+
+class InternalTargetCheckerTest(TestCase):
+    def setUp(self):
+        site = Site.objects.get(is_default_site=True)
+        site.root_page.add_child(instance=Page(title="About", slug="about"))
+        Redirect.objects.create(old_path="/old-about")
+        self.checker = InternalTargetChecker(PageUrlIndex(), ExistingRedirectIndex())
+
+    def test_pages_and_redirects_resolve(self):
+        with self.assertNumQueries(2):
+            self.assertIsNone(self.checker.check("http://localhost/about/"))
+            self.assertIsNone(self.checker.check("http://localhost/old-about/"))
+            self.assertIsNone(self.checker.check("http://localhost/old-about?a=1"))
+
+    def test_external_links_are_not_checked(self):
+        self.assertIsNone(self.checker.check("http://external.test/missing/"))
+        self.assertIsNone(self.checker.check(None))
+
+    def test_broken_targets_get_a_warning(self):
+        self.assertEqual(
+            self.checker.check("http://localhost/missing/"),
+            "Target does not match a live page or redirect",
+        )
+
+
+class DuplicateErrorTest(TestCase):
+    def assertSameAsForm(self, site):
+        Redirect.objects.create(old_path="/alpha", site=site)
+        data = {"old_path": "/alpha", "redirect_link": "http://a.test/"}
+        if site:
+            data["site"] = site.pk
+
+        form = RedirectForm(data)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(
+            get_duplicate_error(site), form.errors.as_text().replace("\n", "")
+        )
+
+    def test_error_without_site(self):
+        self.assertSameAsForm(None)
+
+    def test_error_with_site(self):
+        self.assertSameAsForm(Site.objects.first())
+
+
+@override_settings(WAGTAIL_REDIRECT_IMPORTER_READ_DATABASE="replica")
+class ReadDatabaseTest(TestCase):
+    databases = {"default", "replica"}
+
+    def test_indexes_are_loaded_from_read_database(self):
+        with self.assertNumQueries(0, using="default"):
+            with self.assertNumQueries(4, using="replica"):
+                index = ExistingRedirectIndex()
+                index.contains(None, "/alpha")
+                PageUrlIndex()
+
+    def test_sites_are_written_to_default_database(self):
+        site = SiteResolver().resolve("localhost")[0]
+
+        redirect = Redirect(old_path="/alpha", site=site)
+
+        self.assertEqual(router.db_for_write(Redirect, instance=redirect), "default")
@@ -0,0 +1,176 @@
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models.signals import post_save
+from django.test import TestCase
+from wagtail.contrib.redirects.models import Redirect
+
+from ..models import ImportedFile, ImportedRow
+from ..signals import redirects_imported
+
+
+class IncrementalImportTest(TestCase):
+    def setUp(self):
+        self.source = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+
+    def write(self, rows):
+        self.source.seek(0)
+        self.source.truncate()
+        self.source.write("from,to\n")
+        for row in rows:
+            self.source.write("{},{}\n".format(*row))
+        self.source.flush()
+
+    def run_import(self, **options):
+        out = StringIO()
+        call_command(
+            "import_redirects",
+            src=self.source.name,
+            format="csv",
+            incremental=True,
+            stdout=out,
+            **options
+        )
+        return out.getvalue()
+
+    def test_unchanged_file_is_skipped(self):
+        self.write([("/alpha", "http://a.test/"), ("/beta", "http://b.test/")])
+        output = self.run_import()
+
+        self.assertIn("Created: 2", output)
+        self.assertEqual(ImportedRow.objects.count(), 2)
+        self.assertEqual(ImportedFile.objects.count(), 1)
+
+        with self.assertNumQueries(1):
+            output = self.run_import()
+
+        self.assertIn("Unchanged since the last import", output)
+
+    def test_only_changed_rows_are_touched(self):
+        self.write([("/alpha", "http://a.test/"), ("/beta", "http://b.test/")])
+        self.run_import()
+        beta = Redirect.objects.get(old_path="/beta")
+
+        self.write(
+            [
+                ("/alpha", "http://a.test/"),
+                ("/beta", "http://b2.test/"),
+                ("/gamma", "http://c.test/"),
+            ]
+        )
+        output = self.run_import()
+
+        self.assertIn("Created: 1", output)
+        self.assertIn("Updated: 1", output)
+        self.assertIn("Unchanged: 1", output)
+        self.assertIn("Errors: 0", output)
+        beta.refresh_from_db()
+        self.assertEqual(beta.redirect_link, "http://b2.test/")
+        self.assertEqual(Redirect.objects.count(), 3)
+
+        output = self.run_import(permanent=False)
+
+        self.assertIn("Updated: 3", output)
+        self.assertFalse(Redirect.objects.filter(is_permanent=True).exists())
+
+    def test_redirects_not_imported_before_are_duplicates(self):
+        Redirect.objects.create(old_path="/alpha", redirect_link="http://x.test/")
+        self.write([("/alpha", "http://a.test/"), ("/beta", "http://b.test/")])
+
+        output = self.run_import()
+
+        self.assertIn("Created: 1", output)
+        self.assertIn("Errors: 1", output)
+        self.assertEqual(
+            Redirect.objects.get(old_path="/alpha").redirect_link, "http://x.test/"
+        )
+        # Files with errors aren't skipped on the next run
+        self.assertEqual(ImportedFile.objects.count(), 0)
+
+    def test_repeated_paths_are_duplicates(self):
+        self.write([("/alpha", "http://a.test/")])
+        self.run_import()
+
+        self.write([("/alpha", "http://a.test/"), ("/alpha", "http://b.test/")])
+        output = self.run_import()
+
+        self.assertIn("Unchanged: 1", output)
+        self.assertIn("Errors: 1", output)
+
+    def test_deleted_redirects_are_created_again(self):
+        self.write([("/alpha", "http://a.test/")])
+        self.run_import()
+        Redirect.objects.all().delete()
+        ImportedFile.objects.all().delete()
+
+        output = self.run_import()
+
+        self.assertIn("Created: 1", output)
+        self.assertEqual(Redirect.objects.count(), 1)
+
+    def test_dry_run_does_not_store_hashes(self):
+        self.write([("/alpha", "http://a.test/")])
+
+        self.run_import(dry_run=True)
+
+        self.assertEqual(ImportedRow.objects.count(), 0)
+        self.assertEqual(ImportedFile.objects.count(), 0)
+
+    def test_copied_file_is_skipped(self):
+        self.write([("/alpha", "http://a.test/")])
+        self.run_import()
+
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".csv") as copy:
+            self.source.seek(0)
+            copy.write(self.source.read())
+            copy.flush()
+            self.source = copy
+
+            output = self.run_import()
+
+        self.assertIn("Unchanged since the last import", output)
+
+    def test_bulk_updates_are_batched_and_reported(self):
+        self.write([("/alpha", "http://a.test/"), ("/beta", "http://b.test/")])
+        self.run_import()
+        pks = set(Redirect.objects.values_list("pk", flat=True))
+        self.write([("/alpha", "http://a2.test/"), ("/beta", "http://b2.test/")])
+
+        updated = []
+        saves = []
+
+        def on_imported(sender, **kwargs):
+            updated.extend(kwargs["updated"])
+
+        def on_save(sender, **kwargs):
+            saves.append(kwargs["instance"])
+
+        redirects_imported.connect(on_imported, sender=Redirect)
+        post_save.connect(on_save, sender=Redirect)
+        try:
+            output = self.run_import(bulk=True)
+        finally:
+            redirects_imported.disconnect(on_imported, sender=Redirect)
+            post_save.disconnect(on_save, sender=Redirect)
+
+        self.assertIn("Updated: 2", output)
+        self.assertEqual(set(updated), pks)
+        self.assertEqual(saves, [])
+        self.assertEqual(
+            Redirect.objects.get(old_path="/alpha").redirect_link, "http://a2.test/"
+        )
+
+    def test_repeated_paths_without_site_are_updated(self):
+        self.write([("/alpha", "http://a.test/")])
+        self.run_import()
+        first = Redirect.objects.get()
+        Redirect.objects.create(old_path="/alpha", redirect_link="http://x.test/")
+
+        self.write([("/alpha", "http://a2.test/")])
+        output = self.run_import()
+
+        self.assertIn("Updated: 1", output)
+        self.assertIn("Errors: 0", output)
+        first.refresh_from_db()
+        self.assertEqual(first.redirect_link, "http://a2.test/")
@@ -0,0 +1,207 @@
+import datetime
+import os
+from unittest.mock import patch
+
+import tablib
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.tests.utils import WagtailTestUtils
+
+from ..admin_views import create_redirects_from_dataset
+from ..jobs import run_job, start_job
+from ..models import ImportJob
+from ..utils import get_import_formats
+
+
+TEST_ROOT = os.path.abspath(os.path.dirname(__file__))
+
+
+def get_dataset(count):
+    dataset = tablib.Dataset(headers=["from", "to"])
+    for i in range(count):
+        dataset.append(["/{}".format(i), "http://omega.test/"])
+    return dataset
+
+
+CONFIG = {
+    "from_index": 0,
+    "to_index": 1,
+    "permanent": True,
+    "site": None,
+    "site_column": None,
+}
+
+
+@override_settings(
+    WAGTAIL_REDIRECT_IMPORTER_BACKGROUND_IMPORTS=True,
+    WAGTAIL_REDIRECT_IMPORTER_RUN_JOBS_INLINE=True,
+)
+class ImportJobViewTest(TestCase, WagtailTestUtils):
+    def setUp(self):
+        self.login()
+
+    def test_import_runs_as_job(self):
+        with open("{}/files/example.csv".format(TEST_ROOT), "rb") as infile:
+            upload_file = SimpleUploadedFile("example.csv", infile.read())
+
+        input_format = [f.__name__ for f in get_import_formats()].index("CSV")
+        response = self.client.post(
+            reverse("wagtailredirectimporter:start"),
+            {"import_file": upload_file, "input_format": input_format},
+        )
+        response = self.client.post(
+            reverse("wagtailredirectimporter:import"),
+            {
+                **response.context["form"].initial,
+                "from_index": 0,
+                "to_index": 1,
+                "permanent": True,
+            },
+            follow=True,
+        )
+
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJob.COMPLETED)
+        self.assertEqual(job.file_name, "example.csv")
+        self.assertEqual((job.processed, job.successes), (3, 2))
+        self.assertEqual(
+            response.templates[0].name, "wagtail_redirect_importer/import_summary.html"
+        )
+        self.assertEqual(Redirect.objects.count(), 2)
+
+    def test_running_job_shows_progress(self):
+        job = ImportJob.objects.create(file_name="a.csv", total=10)
+
+        response = self.client.get(
+            reverse("wagtailredirectimporter:job", args=[job.pk])
+        )
+
+        self.assertEqual(
+            response.templates[0].name, "wagtail_redirect_importer/import_job.html"
+        )
+        self.assertContains(response, "Cancel import")
+        head = response.content.decode().split("</head>")[0]
+        self.assertIn('<meta http-equiv="refresh" content="2">', head)
+
+    def test_cancel_sets_flag(self):
+        job = ImportJob.objects.create(file_name="a.csv", status=ImportJob.RUNNING)
+        done = ImportJob.objects.create(file_name="b.csv", status=ImportJob.COMPLETED)
+
+        for pk in [job.pk, done.pk]:
+            response = self.client.post(
+                reverse("wagtailredirectimporter:cancel_job", args=[pk])
+            )
+            self.assertRedirects(
+                response, reverse("wagtailredirectimporter:job", args=[pk])
+            )
+
+        job.refresh_from_db()
+        done.refresh_from_db()
+        self.assertTrue(job.cancel_requested)
+        self.assertFalse(done.cancel_requested)
+
+
+class ImportJobCancelTest(TestCase):
+    def cancel_after_first_batch(self, commit):
+        job = ImportJob.objects.create(file_name="a.csv", total=5)
+        update_progress = job.update_progress
+
+        def cancel_later(processed, successes, errors_count):
+            if processed:
+                ImportJob.objects.filter(pk=job.pk).update(cancel_requested=True)
+            return update_progress(processed, successes, errors_count)
+
+        job.update_progress = cancel_later
+
+        with self.settings(
+            WAGTAIL_REDIRECT_IMPORTER_BATCH_SIZE=2,
+            WAGTAIL_REDIRECT_IMPORTER_COMMIT=commit,
+        ):
+            return job, create_redirects_from_dataset(get_dataset(5), CONFIG, job=job)
+
+    def test_batches_are_committed_before_stopping(self):
+        job, summary = self.cancel_after_first_batch("batch")
+
+        self.assertTrue(summary["cancelled"])
+        self.assertEqual((summary["total"], summary["successes"]), (2, 2))
+        self.assertEqual(Redirect.objects.count(), 2)
+        job.refresh_from_db()
+        self.assertEqual(job.processed, 2)
+
+    def test_file_commit_is_rolled_back(self):
+        job, summary = self.cancel_after_first_batch("file")
+
+        self.assertTrue(summary["cancelled"])
+        self.assertEqual(summary["successes"], 0)
+        self.assertEqual(Redirect.objects.count(), 0)
+
+    def test_cancelled_job_is_recorded(self):
+        job = ImportJob.objects.create(file_name="a.csv", cancel_requested=True)
+
+        run_job(job.pk, create_redirects_from_dataset, (get_dataset(3), CONFIG))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.CANCELLED)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(job.get_summary()["total"], 0)
+        self.assertEqual(Redirect.objects.count(), 0)
+
+    def test_failed_job_is_recorded(self):
+        job = ImportJob.objects.create(file_name="a.csv")
+
+        with self.assertLogs("wagtail_redirect_importer.jobs", "ERROR"):
+            run_job(job.pk, create_redirects_from_dataset, (get_dataset(3), {}))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertIn("error", job.get_summary())
+
+    def test_summary_with_dates_is_saved(self):
+        job = ImportJob.objects.create(file_name="a.xlsx")
+        date = datetime.datetime(2020, 1, 2)
+
+        def target(job):
+            return {
+                "errors": [[date, "/to/", "Invalid"]],
+                "errors_count": 1,
+                "successes": 0,
+                "total": 1,
+            }
+
+        run_job(job.pk, target, ())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.COMPLETED)
+        self.assertEqual(job.get_summary()["errors"][0][0], str(date))
+
+    def test_unsaveable_summary_fails_job(self):
+        job = ImportJob.objects.create(file_name="a.csv")
+
+        def target(job):
+            summary = {"errors_count": 0, "successes": 0, "total": 0}
+            summary["errors"] = [summary]
+            return summary
+
+        with self.assertLogs("wagtail_redirect_importer.jobs", "ERROR"):
+            run_job(job.pk, target, ())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertIn("error", job.get_summary())
+        self.assertIsNotNone(job.finished_at)
+
+
+class StartJobTest(TransactionTestCase):
+    @patch("wagtail_redirect_importer.jobs.threading.Thread")
+    def test_thread_starts_after_commit(self, thread_class):
+        with transaction.atomic():
+            job = ImportJob.objects.create(file_name="a.csv")
+            start_job(job, create_redirects_from_dataset, get_dataset(1), CONFIG)
+
+            thread_class.assert_called_once()
+            thread_class.return_value.start.assert_not_called()
+
+        thread_class.return_value.start.assert_called_once_with()
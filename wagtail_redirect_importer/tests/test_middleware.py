@@ -0,0 +1,145 @@
+from unittest.mock import patch
+
+from django.http import HttpResponse, HttpResponseNotFound
+from django.test import RequestFactory, TestCase
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.core.models import Site
+
+from ..importer import RedirectWriter
+from .. import lookup
+from ..lookup import RedirectLookup, bump_version, defer_invalidation
+from ..middleware import RedirectMiddleware
+from ..models import RedirectRule
+
+
+class RedirectLookupTest(TestCase):
+    def setUp(self):
+        bump_version()
+        self.site = Site.objects.first()
+        self.lookup = RedirectLookup()
+
+    def test_site_redirects_are_preferred(self):
+        any_site = Redirect.objects.create(old_path="/alpha")
+        site = Redirect.objects.create(old_path="/alpha", site=self.site)
+        other = Redirect.objects.create(old_path="/beta")
+
+        self.assertEqual(self.lookup.get(self.site, "/alpha"), site.pk)
+        self.assertEqual(self.lookup.get(None, "/alpha"), any_site.pk)
+        self.assertEqual(self.lookup.get(self.site, "/beta"), other.pk)
+        self.assertIsNone(self.lookup.get(self.site, "/gamma"))
+
+    def test_lookups_do_not_query_once_built(self):
+        Redirect.objects.create(old_path="/alpha")
+        self.lookup.get(self.site, "/alpha")
+
+        with self.assertNumQueries(0):
+            self.lookup.get(self.site, "/alpha")
+            self.lookup.get(self.site, "/missing")
+
+    def test_tables_are_rebuilt_after_changes(self):
+        self.assertIsNone(self.lookup.get(self.site, "/alpha"))
+
+        redirect = Redirect.objects.create(old_path="/alpha")
+        self.assertEqual(self.lookup.get(self.site, "/alpha"), redirect.pk)
+
+        redirect.delete()
+        self.assertIsNone(self.lookup.get(self.site, "/alpha"))
+
+    def test_tables_are_rebuilt_after_bulk_imports(self):
+        self.assertIsNone(self.lookup.get(self.site, "/alpha"))
+
+        writer = RedirectWriter(bulk=True)
+        writer.add(Redirect(old_path="/alpha", redirect_link="http://a.test/"))
+        writer.flush()
+
+        self.assertIsNotNone(self.lookup.get(self.site, "/alpha"))
+
+    def test_row_imports_bump_version_once_per_batch(self):
+        with patch.object(lookup, "get_version_cache") as get_version_cache:
+            with RedirectWriter(batch_size=2) as writer:
+                for i in range(4):
+                    writer.add(Redirect(old_path="/{}".format(i), redirect_link="/to/"))
+
+        self.assertEqual(get_version_cache.return_value.set.call_count, 2)
+
+    def test_deferred_changes_bump_version_once(self):
+        with patch.object(lookup, "get_version_cache") as get_version_cache:
+            with defer_invalidation():
+                for i in range(3):
+                    RedirectRule.objects.create(
+                        pattern="/{}/".format(i),
+                        match_type=RedirectRule.PREFIX,
+                        redirect_link="http://a.test/",
+                    )
+                with defer_invalidation():
+                    Redirect.objects.create(old_path="/alpha")
+
+                get_version_cache.return_value.set.assert_not_called()
+
+        self.assertEqual(get_version_cache.return_value.set.call_count, 1)
+
+
+class RedirectMiddlewareTest(TestCase):
+    def setUp(self):
+        bump_version()
+        self.site = Site.objects.first()
+        self.factory = RequestFactory()
+
+    def get_response(self, path, response=None):
+        request = self.factory.get(path)
+        request.site = self.site
+        return RedirectMiddleware().process_response(
+            request, response or HttpResponseNotFound()
+        )
+
+    def test_permanent_redirect(self):
+        Redirect.objects.create(old_path="/alpha", redirect_link="http://a.test/")
+
+        response = self.get_response("/alpha/")
+
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response["Location"], "http://a.test/")
+
+    def test_temporary_redirect_without_query(self):
+        Redirect.objects.create(
+            old_path="/alpha", redirect_link="http://a.test/", is_permanent=False
+        )
+
+        response = self.get_response("/alpha/?page=2")
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_missing_path_does_not_query_database(self):
+        Redirect.objects.create(old_path="/alpha", redirect_link="http://a.test/")
+        self.get_response("/beta/")
+
+        with self.assertNumQueries(0):
+            response = self.get_response("/missing/?page=2")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_rules_match_paths_without_redirects(self):
+        Redirect.objects.create(
+            old_path="/blog/2015/kept", redirect_link="http://k.test/"
+        )
+        RedirectRule.objects.create(
+            pattern="/blog/2015/",
+            match_type=RedirectRule.PREFIX,
+            redirect_link="http://archive.test/",
+            is_permanent=False,
+        )
+
+        self.assertEqual(
+            self.get_response("/blog/2015/kept/")["Location"], "http://k.test/"
+        )
+
+        response = self.get_response("/blog/2015/other/?page=2")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], "http://archive.test/")
+
+    def test_other_responses_are_left_alone(self):
+        Redirect.objects.create(old_path="/alpha", redirect_link="http://a.test/")
+
+        response = self.get_response("/alpha/", HttpResponse())
+
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,54 @@
+from io import StringIO
+
+from django.test import SimpleTestCase
+
+from ..progress import ProgressReporter, format_duration
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class ProgressReporterTest(SimpleTestCase):
+    def test_updates_are_rate_limited(self):
+        clock = FakeClock()
+        out = StringIO()
+        progress = ProgressReporter(out, total=100, interval=10, clock=clock)
+
+        for index in progress.track(range(100)):
+            clock.now = index + 1
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(
+            lines[0], "Processed 10/100 rows (1 rows/s, ETA 1m30s), 0 errors"
+        )
+        self.assertEqual(
+            lines[-1], "Processed 100/100 rows (1 rows/s, ETA 0s), 0 errors"
+        )
+
+    def test_errors_are_reported(self):
+        out = StringIO()
+        progress = ProgressReporter(out, interval=0)
+
+        for _ in progress.track(range(1)):
+            progress.add_error()
+
+        self.assertIn("Processed 1 rows", out.getvalue())
+        self.assertIn("1 errors", out.getvalue())
+
+    def test_no_updates_without_interval(self):
+        out = StringIO()
+        progress = ProgressReporter(out, interval=None)
+
+        list(progress.track(range(10)))
+
+        self.assertEqual(out.getvalue(), "")
+        self.assertEqual(progress.done, 10)
+
+    def test_format_duration(self):
+        self.assertEqual(format_duration(3725), "1h02m05s")
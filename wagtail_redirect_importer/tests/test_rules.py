@@ -0,0 +1,144 @@
+from django.test import TestCase
+
+from ..models import RedirectRule
+from ..rules import RuleMatcher, parse_rule
+from ..validation import RedirectValidator
+
+
+class ParseRuleTest(TestCase):
+    def test_plain_paths_are_not_rules(self):
+        self.assertIsNone(parse_rule("/blog/2015/"))
+        self.assertIsNone(parse_rule(None))
+
+    def test_rule_types(self):
+        self.assertEqual(parse_rule("/blog/*"), (RedirectRule.PREFIX, "/blog/"))
+        self.assertEqual(parse_rule("blog*"), (RedirectRule.PREFIX, "/blog"))
+        self.assertEqual(
+            parse_rule("/blog/*/comments/"), (RedirectRule.WILDCARD, "/blog/*/comments")
+        )
+        self.assertEqual(
+            parse_rule("^/news/\\d+$"), (RedirectRule.REGEX, "^/news/\\d+$")
+        )
+
+
+class RuleMatcherTest(TestCase):
+    def setUp(self):
+        self.matcher = RuleMatcher(
+            [
+                (RedirectRule.PREFIX, "/blog/", "http://blog.test/", True),
+                (RedirectRule.PREFIX, "/blog/2015/", "http://2015.test/", False),
+                (RedirectRule.WILDCARD, "/shop/*/item.php", "http://shop.test/", True),
+                (RedirectRule.REGEX, "^/news/\\d+$", "http://news.test/", True),
+                (RedirectRule.REGEX, "^/news/.*$", "http://all-news.test/", True),
+            ]
+        )
+
+    def test_longest_prefix_wins(self):
+        self.assertEqual(
+            self.matcher.match("/blog/2015/a"), ("http://2015.test/", False)
+        )
+        self.assertEqual(
+            self.matcher.match("/blog/2016/a"), ("http://blog.test/", True)
+        )
+        self.assertIsNone(self.matcher.match("/blog"))
+
+    def test_first_pattern_wins(self):
+        self.assertEqual(
+            self.matcher.match("/shop/a/b/item.php"), ("http://shop.test/", True)
+        )
+        self.assertEqual(self.matcher.match("/news/12"), ("http://news.test/", True))
+        self.assertEqual(
+            self.matcher.match("/news/latest"), ("http://all-news.test/", True)
+        )
+        self.assertIsNone(self.matcher.match("/shop/a/item.php5"))
+
+    def test_empty_matcher(self):
+        self.assertIsNone(RuleMatcher([]).match("/blog/"))
+
+    def test_inline_flags_only_apply_to_their_rule(self):
+        matcher = RuleMatcher(
+            [
+                (RedirectRule.REGEX, "^/shop/x$", "http://shop.test/", True),
+                (RedirectRule.REGEX, "(?i)^/news/\\d+$", "http://news.test/", True),
+            ]
+        )
+
+        self.assertEqual(matcher.match("/NEWS/12"), ("http://news.test/", True))
+        self.assertIsNone(matcher.match("/SHOP/X"))
+
+    def test_groups_and_backreferences(self):
+        matcher = RuleMatcher(
+            [
+                (RedirectRule.REGEX, "^/(a)/\\1$", "http://a.test/", True),
+                (RedirectRule.REGEX, "^/(?P<id>\\d+)$", "http://id.test/", True),
+                (RedirectRule.REGEX, "^/x/(?P<id>\\d+)$", "http://x.test/", True),
+            ]
+        )
+
+        self.assertEqual(matcher.match("/a/a"), ("http://a.test/", True))
+        self.assertIsNone(matcher.match("/a/b"))
+        self.assertEqual(matcher.match("/1"), ("http://id.test/", True))
+        self.assertEqual(matcher.match("/x/1"), ("http://x.test/", True))
+
+    def test_order_is_kept_across_wildcards_and_regexes(self):
+        matcher = RuleMatcher(
+            [
+                (RedirectRule.WILDCARD, "/a/*/b", "http://first.test/", True),
+                (RedirectRule.REGEX, "^/a/.*$", "http://second.test/", True),
+                (RedirectRule.WILDCARD, "/a/*", "http://third.test/", True),
+            ]
+        )
+
+        self.assertEqual(matcher.match("/a/x/b"), ("http://first.test/", True))
+        self.assertEqual(matcher.match("/a/x"), ("http://second.test/", True))
+
+    def test_invalid_stored_pattern_is_skipped(self):
+        with self.assertLogs("wagtail_redirect_importer.rules", "WARNING"):
+            matcher = RuleMatcher(
+                [
+                    (RedirectRule.REGEX, "^/(a$", "http://broken.test/", True),
+                    (RedirectRule.REGEX, "^/b$", "http://b.test/", True),
+                ]
+            )
+
+        self.assertEqual(matcher.match("/b"), ("http://b.test/", True))
+
+
+class ValidateRuleTest(TestCase):
+    def test_valid_rule(self):
+        rule, error = RedirectValidator().validate_rule("/blog/*", "http://a.test/")
+
+        self.assertIsNone(error)
+        self.assertEqual(rule.pattern, "/blog/")
+        self.assertEqual(rule.match_type, RedirectRule.PREFIX)
+        self.assertEqual(rule.redirect_link, "http://a.test/")
+
+    def test_invalid_rules(self):
+        validator = RedirectValidator()
+
+        rule, error = validator.validate_rule("^/news/(\\d+$", "http://a.test/")
+        self.assertIn("Invalid pattern", error)
+
+        rule, error = validator.validate_rule("^/a/(?i)b$", "http://a.test/")
+        self.assertIn("Invalid pattern", error)
+
+        for pattern in ["^/(\\d+)/$", "^/news/", "^/news\\/\\Z"]:
+            rule, error = validator.validate_rule(pattern, "http://a.test/")
+            self.assertIn("without their trailing slash", error)
+
+        rule, error = validator.validate_rule("^/$", "http://a.test/")
+        self.assertIsNone(error)
+
+        rule, error = validator.validate_rule("/blog/*", "")
+        self.assertEqual(error, "* redirect_link  * This field is required.")
+
+    def test_duplicate_rule(self):
+        RedirectRule.objects.create(
+            pattern="/blog/",
+            match_type=RedirectRule.PREFIX,
+            redirect_link="http://a.test/",
+        )
+
+        rule, error = RedirectValidator().validate_rule("/blog/*", "http://b.test/")
+
+        self.assertEqual(error, "* __all__  * A rule with this pattern already exists.")
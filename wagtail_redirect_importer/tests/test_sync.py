@@ -0,0 +1,179 @@
+from django.test import TestCase
+from wagtail.core.models import Site
+from wagtail.contrib.redirects.models import Redirect
+
+from ..signals import redirects_imported
+from ..sync import (
+    build_sync_entries,
+    compute_sync_diff,
+    iter_existing_redirects,
+    sync_redirects,
+)
+
+
+class BuildSyncEntriesTest(TestCase):
+    def test_entries_get_normalised_and_sorted(self):
+        entries, errors, invalid_paths = build_sync_entries(
+            [("/beta/", "http://beta.test/"), ("http://a.test/alpha", "http://a.test")],
+            True,
+        )
+
+        self.assertEqual(
+            entries,
+            [("/alpha", "http://a.test", True), ("/beta", "http://beta.test/", True)],
+        )
+        self.assertEqual(errors, [])
+
+    def test_first_duplicate_is_kept(self):
+        entries, errors, invalid_paths = build_sync_entries(
+            [("/alpha", "http://one.test/"), ("/alpha/", "http://two.test/")], True,
+        )
+
+        self.assertEqual(entries, [("/alpha", "http://one.test/", True)])
+        self.assertEqual(len(errors), 1)
+
+    def test_invalid_link_is_reported(self):
+        entries, errors, invalid_paths = build_sync_entries(
+            [("/alpha", "/omega")], True
+        )
+
+        self.assertEqual(entries, [])
+        self.assertIn("Enter a valid URL.", errors[0][2])
+        self.assertEqual(invalid_paths, {"/alpha"})
+
+
+class ComputeSyncDiffTest(TestCase):
+    def test_merge_join(self):
+        entries = [
+            ("/a", "http://a.test/", True),
+            ("/b", "http://b2.test/", True),
+            ("/c", "http://c.test/", True),
+        ]
+        existing = [
+            (1, "/0", "http://0.test/", True, None),
+            (2, "/b", "http://b.test/", True, None),
+            (3, "/c", "http://c.test/", True, None),
+            (4, "/d", "http://d.test/", True, None),
+        ]
+
+        diff = compute_sync_diff(entries, iter(existing))
+
+        self.assertEqual(diff.adds, [entries[0]])
+        self.assertEqual(diff.updates, [(2, entries[1])])
+        self.assertEqual(diff.deletes, [1, 4])
+        self.assertEqual(diff.unchanged, 1)
+
+    def test_page_redirect_gets_updated(self):
+        entries = [("/a", "http://a.test/", True)]
+        existing = [(1, "/a", "http://a.test/", True, 5)]
+
+        diff = compute_sync_diff(entries, iter(existing))
+
+        self.assertEqual(diff.updates, [(1, entries[0])])
+
+    def test_kept_paths_are_not_deleted(self):
+        existing = [
+            (1, "/a", "http://a.test/", True, None),
+            (2, "/b", "http://b.test/", True, None),
+            (3, "/c", "http://c.test/", True, None),
+        ]
+
+        diff = compute_sync_diff(
+            [("/b", "http://b.test/", True)], iter(existing), keep_paths={"/a", "/c"}
+        )
+
+        self.assertEqual(diff.deletes, [])
+        self.assertEqual(diff.unchanged, 1)
+
+    def test_unsorted_existing_raises_error(self):
+        existing = [(1, "/b", "", True, None), (2, "/a", "", True, None)]
+
+        with self.assertRaises(ValueError):
+            compute_sync_diff([], iter(existing))
+
+
+class SyncRedirectsTest(TestCase):
+    def setUp(self):
+        self.site = Site.objects.first()
+
+    def test_existing_redirects_are_streamed_in_code_point_order(self):
+        for path in ["/b", "/B", "/a", "/å"]:
+            Redirect.objects.create(old_path=path, site=self.site)
+
+        paths = [row[1] for row in iter_existing_redirects(self.site)]
+
+        self.assertEqual(paths, ["/B", "/a", "/b", "/å"])
+
+    def test_only_site_redirects_are_affected(self):
+        Redirect.objects.create(old_path="/other", redirect_link="http://o.test/")
+        Redirect.objects.create(
+            old_path="/remove", redirect_link="http://r.test/", site=self.site
+        )
+        Redirect.objects.create(
+            old_path="/update", redirect_link="http://u.test/", site=self.site
+        )
+
+        diff, errors = sync_redirects(
+            [("/update", "http://u2.test/"), ("/add", "http://a.test/")],
+            self.site,
+            False,
+        )
+
+        self.assertEqual(
+            diff.get_counts(), {"adds": 1, "updates": 1, "deletes": 1, "unchanged": 0},
+        )
+        self.assertEqual(
+            set(Redirect.objects.values_list("old_path", "site")),
+            {("/other", None), ("/update", self.site.pk), ("/add", self.site.pk)},
+        )
+        updated = Redirect.objects.get(old_path="/update")
+        self.assertEqual(updated.redirect_link, "http://u2.test/")
+        self.assertFalse(updated.is_permanent)
+
+    def test_dry_run_does_not_change_anything(self):
+        Redirect.objects.create(old_path="/remove", site=self.site)
+
+        sync_redirects([("/add", "http://a.test/")], self.site, True, dry_run=True)
+
+        self.assertEqual(
+            list(Redirect.objects.values_list("old_path", flat=True)), ["/remove"]
+        )
+
+    def test_changes_are_sent_in_one_signal(self):
+        remove = Redirect.objects.create(old_path="/remove", site=self.site)
+        update = Redirect.objects.create(old_path="/update", site=self.site)
+        calls = []
+
+        def on_import(sender, **kwargs):
+            calls.append(kwargs)
+
+        redirects_imported.connect(on_import, weak=False)
+        self.addCleanup(redirects_imported.disconnect, on_import)
+
+        sync_redirects(
+            [("/update", "http://u.test/"), ("/add", "http://a.test/")],
+            self.site,
+            True,
+        )
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(
+            calls[0]["created"], [Redirect.objects.get(old_path="/add").pk]
+        )
+        self.assertEqual(calls[0]["updated"], [update.pk])
+        self.assertEqual(calls[0]["deleted"], [remove.pk])
+
+    def test_redirects_of_invalid_rows_are_kept(self):
+        Redirect.objects.create(
+            old_path="/typo", redirect_link="http://t.test/", site=self.site
+        )
+
+        diff, errors = sync_redirects(
+            [("/typo", "not a url"), ("/add", "http://a.test/")], self.site, True
+        )
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(diff.deletes, [])
+        self.assertEqual(
+            Redirect.objects.get(old_path="/typo").redirect_link, "http://t.test/"
+        )
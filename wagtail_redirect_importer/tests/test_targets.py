@@ -0,0 +1,137 @@
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from socketserver import ThreadingMixIn
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..targets import TargetChecker, get_external_targets
+
+
+class TargetHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_HEAD(self):
+        self.requests.append(("HEAD", self.path))
+        if self.path == "/slow/":
+            time.sleep(0.5)
+        if self.path == "/get-only/":
+            self.send_response(405)
+        elif self.path == "/missing/":
+            self.send_response(404)
+        else:
+            self.send_response(200)
+        self.end_headers()
+
+    def do_GET(self):
+        self.requests.append(("GET", self.path))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TargetServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class TargetCheckerTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = TargetServer(("127.0.0.1", 0), TargetHandler)
+        cls.base_url = "http://127.0.0.1:{}".format(cls.server.server_port)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        TargetHandler.requests = []
+
+    def url(self, path):
+        return self.base_url + path
+
+    def test_targets_are_checked(self):
+        urls = [self.url(path) for path in ["/ok/", "/missing/", "/get-only/"]]
+
+        results = TargetChecker(host_interval=0).check(urls)
+
+        self.assertEqual(
+            results,
+            {
+                self.url("/ok/"): None,
+                self.url("/missing/"): "HTTP 404",
+                self.url("/get-only/"): None,
+            },
+        )
+        self.assertIn(("GET", "/get-only/"), TargetHandler.requests)
+
+    def test_slow_targets_time_out(self):
+        results = TargetChecker(timeout=0.1).check([self.url("/slow/")])
+
+        self.assertEqual(results, {self.url("/slow/"): "Timed out"})
+
+    def test_unreachable_targets_fail(self):
+        results = TargetChecker().check(["http://127.0.0.1:1/"])
+
+        self.assertTrue(results["http://127.0.0.1:1/"].startswith("Connection failed"))
+
+    def test_results_are_cached_by_url(self):
+        TargetChecker(host_interval=0).check([self.url("/ok/")])
+        TargetChecker(host_interval=0).check([self.url("/ok/"), self.url("/ok/")])
+
+        self.assertEqual(TargetHandler.requests, [("HEAD", "/ok/")])
+
+    def test_requests_to_a_host_are_spaced_out(self):
+        urls = [self.url("/ok/{}/".format(i)) for i in range(3)]
+
+        started = time.monotonic()
+        TargetChecker(host_interval=0.1).check(urls)
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+    def test_site_and_relative_targets_are_skipped(self):
+        self.assertEqual(
+            get_external_targets(
+                [
+                    "http://localhost/page/",
+                    "/relative/",
+                    None,
+                    self.url("/ok/"),
+                    " {} ".format(self.url("/ok/")),
+                ]
+            ),
+            [self.url("/ok/")],
+        )
+
+    def test_command_reports_dead_targets(self):
+        source = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        source.write("from,to\n")
+        source.write("/alpha,{}\n".format(self.url("/ok/")))
+        source.write("/beta,{}\n".format(self.url("/missing/")))
+        source.seek(0)
+
+        out = StringIO()
+        call_command(
+            "import_redirects",
+            src=source.name,
+            format="csv",
+            check_targets=True,
+            stdout=out,
+        )
+
+        self.assertIn("Checking 2 targets", out.getvalue())
+        self.assertIn(
+            "Dead target: {} (HTTP 404)".format(self.url("/missing/")), out.getvalue()
+        )
+        self.assertIn("Dead targets: 1", out.getvalue())
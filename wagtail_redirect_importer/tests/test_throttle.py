@@ -0,0 +1,121 @@
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from wagtail.contrib.redirects.models import Redirect
+
+from ..importer import RedirectWriter
+from ..throttle import Throttle
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ThrottleTest(SimpleTestCase):
+    def get_throttle(self, **kwargs):
+        self.clock = FakeClock()
+        return Throttle(clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def test_rows_are_limited_to_rate(self):
+        throttle = self.get_throttle(rate=10)
+
+        for _ in range(30):
+            throttle.acquire()
+
+        # The first second of rows is a burst, the rest waits for tokens
+        self.assertAlmostEqual(self.clock.now, 2.0)
+
+    def test_idle_time_refills_the_bucket(self):
+        throttle = self.get_throttle(rate=10)
+        throttle.acquire(10)
+        self.clock.now += 1
+
+        throttle.acquire(10)
+
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_no_rate_does_not_sleep(self):
+        throttle = self.get_throttle()
+
+        for _ in range(1000):
+            throttle.acquire()
+
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_slow_commits_halve_the_rate(self):
+        throttle = self.get_throttle(rate=100, adaptive=True, max_latency=0.5)
+
+        throttle.record_commit(1.0, 100)
+        self.assertEqual(throttle.current_rate, 50)
+
+        throttle.record_commit(0.1, 100)
+        self.assertEqual(throttle.current_rate, 62.5)
+
+        for _ in range(10):
+            throttle.record_commit(0.1, 100)
+        self.assertEqual(throttle.current_rate, 100)
+
+    def test_adaptive_without_rate_starts_at_half_the_throughput(self):
+        throttle = self.get_throttle(adaptive=True, max_latency=0.5)
+
+        throttle.record_commit(0.1, 100)
+        self.assertIsNone(throttle.current_rate)
+
+        throttle.record_commit(2.0, 100)
+        self.assertEqual(throttle.current_rate, 25)
+
+    def test_row_commits_are_averaged(self):
+        throttle = self.get_throttle(rate=100, adaptive=True, max_latency=0.5)
+
+        throttle.record_commit(10.0, 100, commits=100)
+
+        self.assertEqual(throttle.current_rate, 100)
+
+    def test_rate_is_kept_without_adaptive(self):
+        throttle = self.get_throttle(rate=100)
+
+        throttle.record_commit(10.0, 100)
+
+        self.assertEqual(throttle.current_rate, 100)
+
+
+class ThrottledImportTest(TestCase):
+    def test_writer_reports_commits(self):
+        throttle = Throttle(rate=1000, adaptive=True, max_latency=0)
+
+        with RedirectWriter(bulk=True, batch_size=2, throttle=throttle) as writer:
+            for path in ["/a", "/b", "/c"]:
+                writer.add(Redirect(old_path=path, redirect_link="http://a.test/"))
+
+        self.assertEqual(Redirect.objects.count(), 3)
+        self.assertEqual(throttle.current_rate, 250)
+
+    def test_command_throttles_writes(self):
+        source = tempfile.NamedTemporaryFile(mode="w+", encoding="utf-8")
+        source.write("from,to\n")
+        for i in range(5):
+            source.write("/{},http://omega.test/\n".format(i))
+        source.seek(0)
+
+        out = StringIO()
+        call_command(
+            "import_redirects",
+            src=source.name,
+            format="csv",
+            max_rows_per_second=1000,
+            adaptive_throttle=True,
+            stdout=out,
+        )
+
+        self.assertIn("Created: 5", out.getvalue())
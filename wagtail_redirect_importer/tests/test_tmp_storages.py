@@ -0,0 +1,156 @@
+from io import StringIO
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..tmp_storages import CacheStorage, ChunkedCacheStorage, TempFolderStorage
+from ..utils import cleanup_tmp_storage, get_tmp_storage_class
+
+
+class SmallChunkedCacheStorage(ChunkedCacheStorage):
+    CHUNK_SIZE = 4
+
+
+class CacheStorageTest(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def test_remove_deletes_prefixed_key(self):
+        storage = CacheStorage()
+        storage.save(b"from,to")
+        storage.remove()
+
+        self.assertIsNone(cache.get(CacheStorage.CACHE_PREFIX + storage.name))
+
+
+class ChunkedCacheStorageTest(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def test_data_is_split_over_several_keys(self):
+        storage = SmallChunkedCacheStorage()
+        storage.save(b"from,to\n/alpha,http://omega.test/")
+
+        self.assertEqual(cache.get(storage.get_chunk_key(0)), b"from")
+        self.assertEqual(cache.get(storage.get_manifest_key())["chunks"], 9)
+
+    def test_data_is_read_back(self):
+        data = b"from,to\n/alpha,http://omega.test/"
+        storage = SmallChunkedCacheStorage()
+        storage.save(data)
+
+        storage = SmallChunkedCacheStorage(name=storage.name)
+        self.assertEqual(storage.read(), data)
+
+    def test_text_data_is_read_back(self):
+        storage = SmallChunkedCacheStorage()
+        storage.save("from,to")
+        self.assertEqual(storage.read(), "from,to")
+
+    def test_empty_data_is_read_back(self):
+        storage = SmallChunkedCacheStorage()
+        storage.save(b"")
+        self.assertEqual(storage.read(), b"")
+
+    def test_evicted_chunk_returns_none(self):
+        storage = SmallChunkedCacheStorage()
+        storage.save(b"from,to\n/alpha,http://omega.test/")
+        cache.delete(storage.get_chunk_key(3))
+
+        self.assertIsNone(storage.read())
+
+    def test_remove_deletes_all_keys(self):
+        storage = SmallChunkedCacheStorage()
+        storage.save(b"from,to\n/alpha,http://omega.test/")
+        keys = [storage.get_manifest_key()] + storage.get_chunk_keys(9)
+        storage.remove()
+
+        self.assertEqual(cache.get_many(keys), {})
+
+
+class TmpStorageClassTest(TestCase):
+    @override_settings(
+        WAGTAIL_REDIRECT_IMPORTER_TMP_STORAGE_CLASS=(
+            "wagtail_redirect_importer.tmp_storages.ChunkedCacheStorage"
+        )
+    )
+    def test_storage_class_can_be_configured(self):
+        self.assertIs(get_tmp_storage_class(), ChunkedCacheStorage)
+
+
+class TempFolderStorageCleanupTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        patcher = patch("tempfile.tempdir", self.tmp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def create_file(self, size, age):
+        storage = TempFolderStorage()
+        storage.save(b"x" * size, mode="wb")
+        mtime = time.time() - age
+        os.utime(storage.get_full_path(), (mtime, mtime))
+        return storage.get_full_path()
+
+    def test_files_get_created_with_prefix(self):
+        path = self.create_file(1, 0)
+        self.assertTrue(
+            os.path.basename(path).startswith(TempFolderStorage.FILE_PREFIX)
+        )
+
+    def test_old_files_are_removed(self):
+        old = self.create_file(1, 100)
+        new = self.create_file(1, 0)
+
+        removed = TempFolderStorage.cleanup(max_age=50)
+
+        self.assertEqual(removed, [old])
+        self.assertTrue(os.path.exists(new))
+
+    def test_oldest_files_are_removed_above_max_size(self):
+        oldest = self.create_file(10, 30)
+        older = self.create_file(10, 20)
+        new = self.create_file(10, 10)
+
+        removed = TempFolderStorage.cleanup(max_size=15)
+
+        self.assertEqual(removed, [oldest, older])
+        self.assertTrue(os.path.exists(new))
+
+    def test_other_files_are_left_alone(self):
+        other = os.path.join(self.tmp_dir.name, "other.csv")
+        with open(other, "w") as f:
+            f.write("from,to")
+        os.utime(other, (0, 0))
+
+        TempFolderStorage.cleanup(max_age=0, max_size=0)
+
+        self.assertTrue(os.path.exists(other))
+
+    def test_cleanup_command(self):
+        old = self.create_file(1, 100)
+
+        out = StringIO()
+        call_command("cleanup_redirect_imports", max_age=50, stdout=out)
+
+        self.assertFalse(os.path.exists(old))
+        self.assertIn("Removed 1 files", out.getvalue())
+
+    @override_settings(WAGTAIL_REDIRECT_IMPORTER_TMP_MAX_AGE=50)
+    def test_cleanup_uses_settings(self):
+        old = self.create_file(1, 100)
+        self.assertEqual(cleanup_tmp_storage(), [old])
+
+    @override_settings(
+        WAGTAIL_REDIRECT_IMPORTER_TMP_STORAGE_CLASS=(
+            "wagtail_redirect_importer.tmp_storages.CacheStorage"
+        )
+    )
+    def test_cleanup_is_skipped_for_storages_without_support(self):
+        self.assertEqual(cleanup_tmp_storage(), [])
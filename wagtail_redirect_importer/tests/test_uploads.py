@@ -0,0 +1,186 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.tests.utils import WagtailTestUtils
+
+from ..uploads import ChunkedUpload, ChunkTooLarge
+from ..utils import get_import_formats
+
+
+DATA = b"from,to\n/alpha,http://alpha.test/\n/beta,http://beta.test/\n"
+
+
+class ChunkedUploadTest(SimpleTestCase):
+    def setUp(self):
+        self.upload = ChunkedUpload.create()
+        self.addCleanup(self.upload.remove)
+
+    def test_body_larger_than_max_size_is_dropped(self):
+        self.upload.append(0, BytesIO(DATA[:16]), max_size=16)
+
+        with self.assertRaises(ChunkTooLarge):
+            self.upload.append(16, BytesIO(DATA[16:33]), max_size=16, chunk_size=4)
+
+        self.assertEqual(self.upload.get_offset(), 16)
+
+
+@override_settings(WAGTAIL_REDIRECT_IMPORTER_UPLOAD_CHUNK_SIZE=16)
+class ChunkedUploadViewTest(TestCase, WagtailTestUtils):
+    def setUp(self):
+        self.login()
+        response = self.client.post(reverse("wagtailredirectimporter:start_upload"))
+        self.assertEqual(response.status_code, 201)
+        self.state = response.json()
+        self.addCleanup(self.remove_upload)
+
+    def remove_upload(self):
+        upload = ChunkedUpload(self.state["upload_id"])
+        if upload.exists():
+            upload.remove()
+
+    def send(self, offset, data):
+        return self.client.post(
+            "{}?offset={}".format(self.state["chunk_url"], offset),
+            data,
+            content_type="application/octet-stream",
+        )
+
+    def send_all(self, start=0):
+        for offset in range(start, len(DATA), 16):
+            response = self.send(offset, DATA[offset : offset + 16])
+            self.assertEqual(response.json()["offset"], min(offset + 16, len(DATA)))
+
+    def complete(self, checksum=None):
+        input_format = [f.__name__ for f in get_import_formats()].index("CSV")
+        return self.client.post(
+            self.state["complete_url"],
+            {
+                "input_format": input_format,
+                "file_name": "redirects.csv",
+                "checksum": checksum or hashlib.sha256(DATA).hexdigest(),
+            },
+        )
+
+    def test_chunks_are_appended(self):
+        self.assertEqual(self.state["offset"], 0)
+        self.assertEqual(self.state["chunk_size"], 16)
+
+        self.send_all()
+
+        response = self.complete()
+
+        self.assertEqual(
+            response.templates[0].name, "wagtail_redirect_importer/confirm_import.html"
+        )
+        self.assertEqual(
+            response.context["form"].initial["original_file_name"], "redirects.csv"
+        )
+
+        import_response = self.client.post(
+            reverse("wagtailredirectimporter:import"),
+            {**response.context["form"].initial, "from_index": 0, "to_index": 1},
+        )
+
+        self.assertEqual(
+            import_response.templates[0].name,
+            "wagtail_redirect_importer/import_summary.html",
+        )
+        self.assertEqual(Redirect.objects.count(), 2)
+
+    def test_upload_resumes_from_server_offset(self):
+        self.send(0, DATA[:16])
+        # The response to this chunk got lost, but part of it arrived
+        self.send(16, DATA[16:24])
+
+        response = self.send(16, DATA[16:32])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["offset"], 24)
+
+        response = self.client.get(self.state["chunk_url"])
+        self.assertEqual(response.json()["offset"], 24)
+
+        self.send_all(24)
+
+        response = self.complete()
+
+        self.assertEqual(
+            response.templates[0].name, "wagtail_redirect_importer/confirm_import.html"
+        )
+
+    def test_large_chunks_are_rejected(self):
+        response = self.send(0, DATA[:17])
+
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.client.get(self.state["chunk_url"]).json()["offset"], 0)
+
+    def test_checksum_mismatch_is_rejected(self):
+        self.send(0, DATA[:16])
+
+        response = self.complete()
+
+        self.assertRedirects(
+            response,
+            reverse("wagtailredirectimporter:start"),
+            fetch_redirect_response=False,
+        )
+        self.assertContains(self.client.get(response.url), "corrupted")
+        self.assertFalse(ChunkedUpload(self.state["upload_id"]).exists())
+
+    def test_malformed_content_length_is_rejected(self):
+        response = self.client.post(
+            "{}?offset=0".format(self.state["chunk_url"]),
+            DATA[:16],
+            content_type="application/octet-stream",
+            CONTENT_LENGTH="sixteen",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(self.state["chunk_url"]).json()["offset"], 0)
+
+    def test_invalid_complete_form_redirects_with_errors(self):
+        self.send_all()
+
+        response = self.client.post(
+            self.state["complete_url"],
+            {
+                "file_name": "redirects.csv",
+                "checksum": hashlib.sha256(DATA).hexdigest(),
+            },
+        )
+
+        self.assertRedirects(
+            response,
+            reverse("wagtailredirectimporter:start"),
+            fetch_redirect_response=False,
+        )
+        self.assertContains(
+            self.client.get(response.url), "Format: This field is required."
+        )
+        self.assertFalse(ChunkedUpload(self.state["upload_id"]).exists())
+
+    def test_unknown_upload_is_not_found(self):
+        url = reverse("wagtailredirectimporter:upload_chunk", args=["0" * 32])
+
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    @override_settings(
+        WAGTAIL_REDIRECT_IMPORTER_TMP_STORAGE_CLASS=(
+            "wagtail_redirect_importer.tmp_storages.ChunkedCacheStorage"
+        )
+    )
+    def test_upload_is_moved_to_configured_storage(self):
+        self.send_all()
+
+        response = self.complete()
+
+        self.assertEqual(
+            response.templates[0].name, "wagtail_redirect_importer/confirm_import.html"
+        )
+        self.assertFalse(ChunkedUpload(self.state["upload_id"]).exists())
+        self.assertFalse(
+            os.path.isabs(response.context["form"].initial["import_file_name"])
+        )
@@ -0,0 +1,69 @@
+from django.test import TestCase
+from wagtail.contrib.redirects.forms import RedirectForm
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.core.models import Site
+
+from ..validation import RedirectValidator
+
+
+class RedirectValidatorTest(TestCase):
+    def get_form_result(self, from_link, to_link, site=None):
+        data = {"old_path": from_link, "redirect_link": to_link, "is_permanent": True}
+        if site:
+            data["site"] = site.pk
+
+        form = RedirectForm(data)
+        if not form.is_valid():
+            return None, form.errors.as_text().replace("\n", "")
+
+        return (form.instance.old_path, form.instance.redirect_link), None
+
+    def get_validator_result(self, from_link, to_link, site=None):
+        old_path, redirect_link, error = RedirectValidator().validate(
+            from_link, to_link, site
+        )
+        if error:
+            return None, error
+
+        return (old_path, redirect_link), None
+
+    def assertSameAsForm(self, from_link, to_link, site=None):
+        self.assertEqual(
+            self.get_validator_result(from_link, to_link, site),
+            self.get_form_result(from_link, to_link, site),
+        )
+
+    def test_valid_rows(self):
+        self.assertSameAsForm("/alpha", "http://a.test/")
+        self.assertSameAsForm("alpha/?b=2&a=1", "http://a.test/path?query=1")
+        self.assertSameAsForm(" /alpha ", " a.test/alpha ")
+        self.assertSameAsForm("/alpha", "")
+
+    def test_invalid_rows(self):
+        self.assertSameAsForm("", "http://a.test/")
+        self.assertSameAsForm("/alpha", "not a url")
+        self.assertSameAsForm("", "/relative/")
+        self.assertSameAsForm("/" + "a" * 255, "http://a.test/")
+        self.assertSameAsForm("/alpha", "http://a.test/" + "a" * 255)
+
+    def test_duplicate_rows(self):
+        site = Site.objects.first()
+        Redirect.objects.create(old_path="/alpha")
+        Redirect.objects.create(old_path="/beta", site=site)
+
+        self.assertSameAsForm("/alpha", "http://a.test/")
+        self.assertSameAsForm("/alpha/", "not a url")
+        self.assertSameAsForm("/beta", "http://a.test/", site)
+        self.assertSameAsForm("/beta", "http://a.test/")
+
+    def test_duplicates_are_checked_without_queries(self):
+        validator = RedirectValidator()
+        validator.index.add(None, "/alpha")
+
+        with self.assertNumQueries(0):
+            old_path, redirect_link, error = validator.validate(
+                "/alpha", "http://a.test/"
+            )
+
+        self.assertEqual(old_path, "/alpha")
+        self.assertIsNotNone(error)
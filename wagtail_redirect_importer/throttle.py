@@ -0,0 +1,75 @@
+import time
+
+
+class Throttle:
+    """
+    Token bucket that limits writes to rate rows per second, with bursts of
+    up to one second of rows. In adaptive mode the rate is halved whenever
+    a commit takes longer than max_latency seconds, and grows by a quarter
+    after every fast commit until it's back at rate. Without a rate,
+    adaptive mode starts limiting at half the throughput of the first slow
+    commit.
+    """
+
+    def __init__(
+        self,
+        rate=None,
+        adaptive=False,
+        max_latency=0.5,
+        min_rate=1.0,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.rate = rate
+        self.current_rate = rate
+        self.adaptive = adaptive
+        self.max_latency = max_latency
+        self.min_rate = min_rate
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.get_capacity()
+        self.updated_at = clock()
+
+    def get_capacity(self):
+        if self.current_rate is None:
+            return 0
+        return max(1.0, self.current_rate)
+
+    def acquire(self, count=1):
+        """
+        Blocks until count rows may be written.
+        """
+        if self.current_rate is None:
+            return
+
+        now = self.clock()
+        self.tokens = min(
+            self.get_capacity(),
+            self.tokens + (now - self.updated_at) * self.current_rate,
+        )
+        self.tokens -= count
+        self.updated_at = now
+
+        if self.tokens < 0:
+            wait = -self.tokens / self.current_rate
+            self.sleep(wait)
+            self.tokens = 0
+            self.updated_at = now + wait
+
+    def record_commit(self, seconds, rows, commits=1):
+        """
+        Adapts the rate to how long the last commits of rows took.
+        """
+        if not self.adaptive or not commits:
+            return
+
+        if seconds / commits > self.max_latency:
+            if self.current_rate is None:
+                self.current_rate = rows / seconds
+            self.current_rate = max(self.min_rate, self.current_rate / 2)
+        elif self.current_rate is not None:
+            self.current_rate *= 1.25
+            if self.rate is not None:
+                self.current_rate = min(self.rate, self.current_rate)
+
+        self.tokens = min(self.tokens, self.get_capacity())
@@ -26,6 +26,7 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 # Copied from: https://raw.githubusercontent.com/django-import-export/django-import-export/5795e114210adf250ac6e146db2fa413f38875de/import_export/tmp_storages.py
 import os
 import tempfile
+import time
 from uuid import uuid4
 
 from django.core.cache import cache
@@ -49,12 +50,15 @@ class BaseStorage:
 
 
 class TempFolderStorage(BaseStorage):
+    FILE_PREFIX = 'wagtail-redirect-importer-'
 
     def open(self, mode='r'):
         if self.name:
             return open(self.get_full_path(), mode)
         else:
-            tmp_file = tempfile.NamedTemporaryFile(delete=False)
+            tmp_file = tempfile.NamedTemporaryFile(
+                prefix=self.FILE_PREFIX, delete=False
+            )
             self.name = tmp_file.name
             return tmp_file
 
@@ -75,6 +79,48 @@ class TempFolderStorage(BaseStorage):
             self.name
         )
 
+    @classmethod
+    def cleanup(cls, max_age=None, max_size=None):
+        """
+        Removes files created by this storage that are older than max_age
+        seconds, then removes the oldest remaining files until their total
+        size is at most max_size bytes. Returns the removed paths.
+        """
+        files = []
+        for entry in os.scandir(tempfile.gettempdir()):
+            if not entry.name.startswith(cls.FILE_PREFIX):
+                continue
+            try:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        # Oldest files first, everything before `cutoff` gets removed
+        files.sort()
+        cutoff = 0
+        if max_age is not None:
+            oldest_allowed = time.time() - max_age
+            while cutoff < len(files) and files[cutoff][0] < oldest_allowed:
+                cutoff += 1
+
+        if max_size is not None:
+            total_size = sum(size for _, size, _ in files[cutoff:])
+            while cutoff < len(files) and total_size > max_size:
+                total_size -= files[cutoff][1]
+                cutoff += 1
+
+        removed = []
+        for _, _, path in files[:cutoff]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            removed.append(path)
+        return removed
+
 
 class CacheStorage(BaseStorage):
     """
@@ -92,7 +138,61 @@ class CacheStorage(BaseStorage):
         return cache.get(self.CACHE_PREFIX + self.name)
 
     def remove(self):
-        cache.delete(self.name)
+        cache.delete(self.CACHE_PREFIX + self.name)
+
+
+class ChunkedCacheStorage(CacheStorage):
+    """
+    Splits data over several cache keys, tracked by a manifest key, so files
+    larger than the maximum size of a single cache value can be stored.
+    """
+    CHUNK_SIZE = 512 * 1024
+
+    def save(self, data, mode=None):
+        if not self.name:
+            self.name = uuid4().hex
+
+        chunks = {}
+        for index, offset in enumerate(range(0, len(data), self.CHUNK_SIZE)):
+            chunks[self.get_chunk_key(index)] = data[offset:offset + self.CHUNK_SIZE]
+
+        cache.set_many(chunks, self.CACHE_LIFETIME)
+        cache.set(
+            self.get_manifest_key(),
+            {"chunks": len(chunks), "binary": isinstance(data, bytes)},
+            self.CACHE_LIFETIME,
+        )
+
+    def read(self, read_mode='r'):
+        manifest = cache.get(self.get_manifest_key())
+        if manifest is None:
+            return None
+
+        keys = self.get_chunk_keys(manifest["chunks"])
+        chunks = cache.get_many(keys)
+
+        # If any chunk has been evicted the data can not be trusted
+        if len(chunks) != len(keys):
+            return None
+
+        empty = b"" if manifest["binary"] else ""
+        return empty.join(chunks[key] for key in keys)
+
+    def remove(self):
+        manifest = cache.get(self.get_manifest_key())
+        keys = [self.get_manifest_key()]
+        if manifest is not None:
+            keys += self.get_chunk_keys(manifest["chunks"])
+        cache.delete_many(keys)
+
+    def get_manifest_key(self):
+        return self.CACHE_PREFIX + self.name
+
+    def get_chunk_key(self, index):
+        return "{}{}-{}".format(self.CACHE_PREFIX, self.name, index)
+
+    def get_chunk_keys(self, count):
+        return [self.get_chunk_key(index) for index in range(count)]
 
 
 class MediaStorage(BaseStorage):
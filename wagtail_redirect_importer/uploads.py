@@ -0,0 +1,97 @@
+import hashlib
+import os
+import re
+import tempfile
+from uuid import uuid4
+
+from .tmp_storages import TempFolderStorage
+from .utils import get_tmp_storage_class
+
+
+UPLOAD_PREFIX = TempFolderStorage.FILE_PREFIX + "upload-"
+DEFAULT_CHUNK_SIZE = 5 * 1024 * 1024
+UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class OffsetMismatch(Exception):
+    def __init__(self, offset):
+        super().__init__("Upload is at offset {}".format(offset))
+        self.offset = offset
+
+
+class ChunkTooLarge(Exception):
+    pass
+
+
+class ChunkedUpload:
+    """
+    A file uploaded in chunks to the temporary folder. The offset is the
+    number of bytes received so far, so an interrupted upload is resumed
+    by sending the rest of the file from there.
+    """
+
+    def __init__(self, upload_id):
+        if not UPLOAD_ID_RE.match(upload_id):
+            raise ValueError("Invalid upload id '{}'".format(upload_id))
+
+        self.upload_id = upload_id
+        self.name = UPLOAD_PREFIX + upload_id
+        self.path = os.path.join(tempfile.gettempdir(), self.name)
+
+    @classmethod
+    def create(cls):
+        upload = cls(uuid4().hex)
+        open(upload.path, "xb").close()
+        return upload
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    def get_offset(self):
+        return os.path.getsize(self.path)
+
+    def append(self, offset, stream, max_size=None, chunk_size=65536):
+        """
+        Appends the data read from stream, if the upload is at offset.
+        Whatever arrives before the stream breaks off is kept, unless there
+        is more than max_size bytes of it, then nothing is.
+        """
+        with open(self.path, "ab") as fh:
+            if fh.tell() != offset:
+                raise OffsetMismatch(fh.tell())
+
+            size = 0
+            for chunk in iter(lambda: stream.read(chunk_size), b""):
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    fh.truncate(offset)
+                    raise ChunkTooLarge
+                fh.write(chunk)
+
+    def get_checksum(self, chunk_size=65536):
+        checksum = hashlib.sha256()
+        with open(self.path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(chunk_size), b""):
+                checksum.update(chunk)
+        return checksum.hexdigest()
+
+    def to_tmp_storage(self, input_format):
+        """
+        Returns the upload as a temporary storage for the confirm step,
+        moving the file into the configured storage if it isn't the
+        temporary folder.
+        """
+        tmp_storage_class = get_tmp_storage_class()
+        if issubclass(tmp_storage_class, TempFolderStorage):
+            return tmp_storage_class(name=self.name)
+
+        with open(self.path, "rb") as fh:
+            data = fh.read()
+
+        tmp_storage = tmp_storage_class()
+        tmp_storage.save(data, input_format.get_read_mode())
+        self.remove()
+        return tmp_storage
+
+    def remove(self):
+        os.remove(self.path)
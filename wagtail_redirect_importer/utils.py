@@ -1,16 +1,71 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, router
+from django.utils.module_loading import import_string
+
 from .tmp_storages import TempFolderStorage
 from .base_formats import DEFAULT_FORMATS
 
 
+def get_tmp_storage_class():
+    tmp_storage_class = getattr(
+        settings, "WAGTAIL_REDIRECT_IMPORTER_TMP_STORAGE_CLASS", TempFolderStorage
+    )
+    if isinstance(tmp_storage_class, str):
+        tmp_storage_class = import_string(tmp_storage_class)
+    return tmp_storage_class
+
+
+def cleanup_tmp_storage(max_age=None, max_size=None):
+    """
+    Removes abandoned uploads from the temporary storage, if it supports it.
+    Limits default to the WAGTAIL_REDIRECT_IMPORTER_TMP_MAX_AGE and
+    WAGTAIL_REDIRECT_IMPORTER_TMP_MAX_SIZE settings.
+    """
+    tmp_storage_class = get_tmp_storage_class()
+    if not hasattr(tmp_storage_class, "cleanup"):
+        return []
+
+    if max_age is None:
+        max_age = getattr(settings, "WAGTAIL_REDIRECT_IMPORTER_TMP_MAX_AGE", 86400)
+    if max_size is None:
+        max_size = getattr(settings, "WAGTAIL_REDIRECT_IMPORTER_TMP_MAX_SIZE", None)
+
+    return tmp_storage_class.cleanup(max_age=max_age, max_size=max_size)
+
+
 def write_to_tmp_storage(import_file, input_format):
-    tmp_storage = TempFolderStorage()
-    data = bytes()
-    for chunk in import_file.chunks():
-        data += chunk
+    tmp_storage = get_tmp_storage_class()()
+    if isinstance(tmp_storage, TempFolderStorage):
+        # Write the upload chunk by chunk instead of holding it in memory
+        with tmp_storage.open("wb") as fh:
+            for chunk in import_file.chunks():
+                fh.write(chunk)
+        return tmp_storage
 
-    tmp_storage.save(data, input_format.get_read_mode())
+    tmp_storage.save(b"".join(import_file.chunks()), input_format.get_read_mode())
     return tmp_storage
 
 
+def get_read_database():
+    """
+    The database alias used for the importer's read-only queries, from the
+    WAGTAIL_REDIRECT_IMPORTER_READ_DATABASE setting.
+    """
+    return getattr(
+        settings, "WAGTAIL_REDIRECT_IMPORTER_READ_DATABASE", DEFAULT_DB_ALIAS
+    )
+
+
+def iter_read_only(queryset):
+    """
+    Yields the objects of queryset loaded from the read database, but bound
+    to the database they are written to, so redirects saved with them don't
+    follow them to the read database.
+    """
+    for obj in queryset.using(get_read_database()):
+        obj._state.db = router.db_for_write(obj.__class__)
+        yield obj
+
+
 def get_import_formats():
     return [f for f in DEFAULT_FORMATS if f().can_import()]
@@ -0,0 +1,123 @@
+import re
+
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.utils.translation import gettext as _
+from wagtail.contrib.redirects.models import Redirect
+
+from .importer import ExistingRedirectIndex, format_errors, get_duplicate_message
+from .models import RedirectRule
+from .rules import compile_rule, parse_rule, requires_trailing_slash
+from .utils import get_read_database
+
+
+class RedirectValidator:
+    """
+    Validates rows with the same rules and error messages as RedirectForm,
+    without building a form and querying for duplicates per row. The form
+    fields are created once and duplicates are checked against an
+    ExistingRedirectIndex.
+    """
+
+    def __init__(self, index=None):
+        if index is None:
+            index = ExistingRedirectIndex()
+        self.index = index
+        self.old_path_field = Redirect._meta.get_field("old_path").formfield()
+        self.redirect_link_field = Redirect._meta.get_field("redirect_link").formfield()
+        self.rule_keys = None
+
+    def validate(self, from_link, to_link, site=None, check_duplicates=True):
+        """
+        Returns (old_path, redirect_link, error), where error is None for
+        valid rows and formatted like form.errors.as_text() otherwise.
+        """
+        errors = []
+
+        try:
+            old_path = Redirect.normalise_path(self.old_path_field.clean(from_link))
+        except ValidationError as e:
+            old_path = None
+            errors.append(("old_path", e.messages))
+
+        try:
+            redirect_link = self.redirect_link_field.clean(to_link)
+        except ValidationError as e:
+            redirect_link = None
+            errors.append(("redirect_link", e.messages))
+
+        if (
+            check_duplicates
+            and old_path is not None
+            and self.index.contains(site, old_path)
+        ):
+            errors.append((NON_FIELD_ERRORS, [get_duplicate_message(site)]))
+
+        if errors:
+            return old_path, redirect_link, format_errors(errors)
+
+        return old_path, redirect_link, None
+
+    def validate_rule(self, from_link, to_link, site=None, is_permanent=True):
+        """
+        Returns (rule, error) for a row where from_link is a rule pattern,
+        rule is an unsaved RedirectRule.
+        """
+        match_type, pattern = parse_rule(from_link)
+        errors = []
+
+        try:
+            self.old_path_field.clean(pattern)
+            if match_type != RedirectRule.PREFIX:
+                compile_rule(match_type, pattern)
+            if match_type == RedirectRule.REGEX and requires_trailing_slash(pattern):
+                raise ValidationError(
+                    _(
+                        "Paths are matched without their trailing slash, "
+                        "remove the slash at the end of the pattern."
+                    )
+                )
+        except ValidationError as e:
+            errors.append(("old_path", e.messages))
+        except re.error as e:
+            errors.append(
+                ("old_path", [_("Invalid pattern: %(error)s") % {"error": e}])
+            )
+
+        try:
+            redirect_link = self.redirect_link_field.clean(to_link)
+            if not redirect_link:
+                raise ValidationError(
+                    self.redirect_link_field.error_messages["required"]
+                )
+        except ValidationError as e:
+            errors.append(("redirect_link", e.messages))
+
+        site_id = site.pk if site else None
+        if not errors and (site_id, match_type, pattern) in self.get_rule_keys():
+            errors.append(
+                (NON_FIELD_ERRORS, [_("A rule with this pattern already exists.")])
+            )
+
+        if errors:
+            return None, format_errors(errors)
+
+        rule = RedirectRule(
+            pattern=pattern,
+            match_type=match_type,
+            site=site,
+            redirect_link=redirect_link,
+            is_permanent=is_permanent,
+        )
+        return rule, None
+
+    def get_rule_keys(self):
+        if self.rule_keys is None:
+            self.rule_keys = set(
+                RedirectRule.objects.using(get_read_database()).values_list(
+                    "site_id", "match_type", "pattern"
+                )
+            )
+        return self.rule_keys
+
+    def add_rule(self, rule):
+        self.get_rule_keys().add((rule.site_id, rule.match_type, rule.pattern))